@@ -0,0 +1,293 @@
+"""Benchmark the acquisition hot path: `Run.start`, `EEGInstrument.read` and EDF
+writing, driven by a `SyntheticDevice` that delivers blocks as fast as they are
+read.
+
+Usage:
+    python benchmarks/bench_acquisition.py --channels 8 64 --rates 250 1000
+
+For every combination of channel count, sampling rate and record duration the
+benchmark reports the sustained throughput in samples per second (summed over
+channels), the CPU time used per second of recorded data, the worst-case and
+99th percentile time spent in a single iteration of the run loop, and an
+analytic estimate of the number of bytes copied per sample on its way from the
+device to the storage backend. The estimate is derived from the configuration
+of the instrument, not measured.
+
+With `--digital`, the device produces integer samples of type `--dtype`
+(int16 by default) that are written to the file as digital values.
+
+With `--storage`, every combination is also benchmarked for each of the given
+storage formats (edf, bdf or brainvision).
+
+With `--spool-duration`, runs are recorded to a raw spool and converted to the
+storage format when they stop, so the loop latency only covers copying blocks
+into the spool while the throughput includes the conversion.
+
+With `--replay`, a recorded edf file is replayed through the run instead, at
+`--speed` times real time or as fast as possible:
+    python benchmarks/bench_acquisition.py --replay sub-01_eeg.edf --speed 4
+"""
+
+import argparse
+import json
+import shutil
+import tempfile
+import time
+
+from datetime import timedelta
+from itertools import product
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np  # type: ignore
+
+from libbids import Dataset
+from libbids.clibbids import Session  # type: ignore
+from libbids.devices import BlockDevice, ReplayDevice, SyntheticDevice
+from libbids.event import Event
+from libbids.instruments import EEGInstrument
+from libbids.metrics import RunMetrics
+from libbids.run import Run
+from libbids.task import Task
+
+
+class BenchmarkTask(Task):
+    def on_event_start(self, event: Event):
+        pass
+
+    def on_event_end(self, event: Event):
+        pass
+
+    def on_new_run(self, run: Run) -> None:
+        pass
+
+    def process(self, remainder: bool = False) -> np.ndarray:
+        return self.primary_instrument.read(remainder)
+
+
+def make_session(root: Path) -> Session:
+    """Create a dataset with a single subject and return its first session"""
+    root.joinpath("sub-01").mkdir()
+    # The dataset only reads participants whose columns its sidecar describes
+    root.joinpath("participants.tsv").write_text("participant_id\tname\nsub-01\tJohn\n")
+    root.joinpath("participants.json").write_text(
+        '{"name": {"Description": "Name of participant"}}\n'
+    )
+    dataset: Dataset = Dataset(root, True)
+    return Session(dataset.get_subject(1), 1)
+
+
+def bench(
+    device: BlockDevice,
+    electrodes: List[str],
+    record_duration: float,
+    seconds: float,
+    read_into: bool,
+    digital: bool,
+    writer_queue_size: Optional[int],
+    storage: str,
+    spool_duration: Optional[float],
+    run_kwargs: Dict[str, Any],
+) -> Dict[str, Any]:
+    root: Path = Path(tempfile.mkdtemp())
+    n_channels: int = device.n_channels
+    sfreq: int = device.sfreqs[0]
+    try:
+        session: Session = make_session(root)
+        instrument: EEGInstrument = EEGInstrument(
+            session,
+            device,
+            device.sfreqs if len(set(device.sfreqs)) > 1 else sfreq,
+            electrodes,
+            record_duration=record_duration,
+            init_read_fn=device.start,
+            read_fn=device.read,
+            stop_fn=device.stop,
+            read_into_fn=device.read_into if read_into else None,
+            is_digital=digital,
+            dtype=getattr(device, "dtype", None),
+            writer_queue_size=writer_queue_size,
+            storage=storage,
+            spool_duration=spool_duration,
+        )
+        task: BenchmarkTask = BenchmarkTask(
+            session, "bench", [instrument], [], timedelta(seconds=seconds)
+        )
+        run: Run = task.add_run(metrics=True, **run_kwargs)
+
+        wall: float = time.perf_counter()
+        cpu: float = time.process_time()
+        run.start()
+        instrument.finish_conversions()
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+
+        metrics: RunMetrics = run.metrics  # type: ignore
+        data_seconds: float = run.n_samples / sfreq
+        return {
+            "channels": n_channels,
+            "sfreq": sfreq,
+            "record_duration": record_duration,
+            "storage": storage,
+            "samples_per_s": n_channels * run.n_samples / wall,
+            "cpu_per_data_s": cpu / data_seconds,
+            "max_loop_latency": metrics.process.max,
+            "p99_loop_latency": metrics.process.quantile(0.99),
+            "estimated_bytes_per_sample": estimate_bytes_per_sample(instrument),
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def estimate_bytes_per_sample(instrument: EEGInstrument) -> int:
+    """Estimate the number of bytes copied per sample between the device and
+    the file from the configuration of the instrument, without measuring them:
+    the device producing the block, copying it into the record buffer unless
+    it is read straight into it, copying records for the background writer if
+    there is one, and interleaving the samples in the type the storage backend
+    writes. When spooling, the spool takes the place of the record buffer and
+    there is no background writer"""
+    itemsize: int = instrument.dtype.itemsize
+    copies: int = itemsize
+    if instrument.read_into_fn is None:
+        copies += itemsize
+    if instrument.spool_duration is None and instrument.writer_queue_size is not None:
+        copies += itemsize
+    return copies + instrument.storage.record_dtype.itemsize
+
+
+def devices(
+    args: argparse.Namespace,
+) -> Iterator[Tuple[BlockDevice, List[str], float, float]]:
+    """Generate the devices to benchmark, with their electrodes, record
+    duration and the number of seconds of data to acquire"""
+    if args.replay is not None:
+        for record_duration in args.record_durations:
+            # Loop the recording so that the block discarded when the run
+            # flushes its instruments does not leave the run short of data
+            replay: ReplayDevice = ReplayDevice(
+                args.replay,
+                speed=args.speed,
+                jitter=args.jitter,
+                digital=args.digital,
+                loop=True,
+            )
+            replay.block_sizes = [max(int(replay.sfreqs[0] * args.block_duration), 1)]
+            seconds: float = int(replay.n_times[0]) / replay.sfreqs[0]
+            yield replay, replay.electrodes, record_duration, seconds
+        return
+
+    for n_channels, sfreq, record_duration in product(
+        args.channels, args.rates, args.record_durations
+    ):
+        block_size: int = min(max(int(sfreq * args.block_duration), 1), sfreq)
+        synthetic: SyntheticDevice = SyntheticDevice(
+            n_channels,
+            sfreq,
+            block_size,
+            jitter=args.jitter,
+            paced=args.paced,
+            dtype=args.dtype or ("int16" if args.digital else "float64"),
+        )
+        electrodes: List[str] = [f"E{i}" for i in range(n_channels)]
+        yield synthetic, electrodes, record_duration, args.seconds
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--channels", type=int, nargs="+", default=[8, 64, 256, 1024])
+    parser.add_argument(
+        "--rates", type=int, nargs="+", default=[250, 1000, 5000, 20000]
+    )
+    parser.add_argument(
+        "--record-durations", type=float, nargs="+", default=[0.25, 1.0]
+    )
+    parser.add_argument(
+        "--seconds", type=float, default=5.0, help="Seconds of data per run"
+    )
+    parser.add_argument(
+        "--block-duration",
+        type=float,
+        default=1 / 32,
+        help="Seconds of data the device delivers per read",
+    )
+    parser.add_argument(
+        "--paced", action="store_true", help="Deliver blocks in real time"
+    )
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--threaded", action="store_true")
+    parser.add_argument(
+        "--read-into",
+        action="store_true",
+        help="Read samples straight into the record buffer with `read_into`",
+    )
+    parser.add_argument("--digital", action="store_true", help="Write digital samples")
+    parser.add_argument("--dtype", help="The type of the generated samples")
+    parser.add_argument(
+        "--writer-queue-size",
+        type=int,
+        help="Write records from a background writer with a queue this long",
+    )
+    parser.add_argument(
+        "--storage",
+        nargs="+",
+        default=["edf"],
+        choices=["edf", "bdf", "brainvision"],
+        help="The storage formats to write",
+    )
+    parser.add_argument(
+        "--spool-duration",
+        type=float,
+        help="Record to a spool preallocated this many seconds at a time and "
+        "convert it when the run stops",
+    )
+    parser.add_argument("--replay", type=Path, help="An edf file to replay")
+    parser.add_argument(
+        "--speed",
+        type=float,
+        help="Replay this many times faster than real time instead of as fast "
+        "as possible",
+    )
+    parser.add_argument("--json", type=Path, help="Also write the results here")
+    args: argparse.Namespace = parser.parse_args()
+
+    header: str = (
+        f"{'channels':>8} {'sfreq':>6} {'record':>6} {'storage':>11} "
+        f"{'samples/s':>12} "
+        f"{'cpu/s':>7} {'max loop':>9} {'p99 loop':>9} {'est. bytes/sample':>18}"
+    )
+    print(header)
+    results: List[Dict[str, Any]] = []
+    for (device, electrodes, record_duration, seconds), storage in product(
+        devices(args), args.storage
+    ):
+        result: Dict[str, Any] = bench(
+            device,
+            electrodes,
+            record_duration,
+            seconds,
+            args.read_into,
+            args.digital,
+            args.writer_queue_size,
+            storage,
+            args.spool_duration,
+            {"threaded": args.threaded},
+        )
+        results.append(result)
+        n_channels: int = result["channels"]
+        sfreq: int = result["sfreq"]
+        print(
+            f"{n_channels:>8} {sfreq:>6} {record_duration:>6} {storage:>11} "
+            f"{result['samples_per_s']:>12.4g} {result['cpu_per_data_s']:>7.4f} "
+            f"{result['max_loop_latency'] * 1e3:>7.2f}ms "
+            f"{result['p99_loop_latency'] * 1e3:>7.2f}ms "
+            f"{result['estimated_bytes_per_sample']:>18}",
+            flush=True,
+        )
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
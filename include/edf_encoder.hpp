@@ -0,0 +1,148 @@
+#ifndef INCLUDE_EDF_ENCODER_HPP_
+#define INCLUDE_EDF_ENCODER_HPP_
+
+#include <cstddef>
+#include <cstdint>
+#include <cstdio>
+#include <ctime>
+#include <deque>
+#include <filesystem>
+#include <mutex>
+#include <string>
+#include <vector>
+
+/**
+ * @brief Describes one signal of an EDF/BDF file.
+ */
+struct EdfSignal {
+  std::string label;
+  std::string dimension;
+  std::string prefilter;
+  int samples_per_record;
+  double physical_min;
+  double physical_max;
+  int digital_min;
+  int digital_max;
+};
+
+/**
+ * @brief An annotation waiting to be written to the annotation signal.
+ */
+struct EdfAnnotation {
+  double onset;
+  double duration;
+  std::string description;
+};
+
+/**
+ * @brief Encodes samples into the data records of an EDF+ or BDF+ file.
+ *
+ * Samples are scaled to digital values, interleaved into data records and
+ * written without touching the Python interpreter, so the Python bindings
+ * release the GIL while writing. Each data record carries an annotation
+ * signal with its time-keeping annotation followed by as many pending
+ * annotations as fit.
+ */
+class EdfEncoder {
+ public:
+  /**
+   * @brief Creates the file and writes its header.
+   *
+   * @param path The path of the file.
+   * @param bdf Whether to write 24 bit BDF+ rather than 16 bit EDF+.
+   * @param signals The signals in the file, in order.
+   * @param record_duration The duration of a data record in seconds.
+   * @param patient The EDF+ patient identification subfields.
+   * @param recording The EDF+ recording identification subfields that follow
+   *        the start date.
+   * @param annotation_bytes The number of bytes of annotations per record.
+   */
+  EdfEncoder(std::filesystem::path const& path, bool bdf,
+             std::vector<EdfSignal> const& signals, double record_duration,
+             std::string patient = "X X X X", std::string recording = "X X X",
+             int annotation_bytes = 120);
+  ~EdfEncoder();
+
+  EdfEncoder(EdfEncoder const&) = delete;
+  EdfEncoder& operator=(EdfEncoder const&) = delete;
+
+  /**
+   * @brief Queues an annotation for the next data record written.
+   *
+   * May be called from another thread while samples are being written.
+   *
+   * @param onset The time of the annotation in seconds from the start.
+   * @param duration The duration in seconds, or a negative value if unknown.
+   * @param description The text of the annotation.
+   */
+  void annotate(double onset, double duration, std::string const& description);
+
+  /**
+   * @brief Writes any remaining annotations and the final header, then
+   * closes the file.
+   */
+  void close(void);
+
+  /**
+   * @brief Sets the start date and time of the recording.
+   *
+   * The fraction of a second is kept in the time-keeping annotation of the
+   * first data record, as EDF+ specifies, and annotation onsets are shifted
+   * by it so that they remain relative to the start of the recording.
+   */
+  void set_start(int year, int month, int day, int hour, int minute,
+                 int second, int microsecond = 0);
+
+  /**
+   * @brief Encodes and writes samples as data records.
+   *
+   * Channel `c` holds `lengths[c]` samples, `strides[c]` elements apart. The
+   * number of records written is set by the first channel, and channels
+   * shorter than that many records are padded with zeros, so a trailing
+   * partial record should only be written last.
+   *
+   * @param channels A pointer to the first sample of each channel.
+   * @param strides The distance between samples of each channel.
+   * @param lengths The number of samples of each channel.
+   * @param digital Whether samples are digital values rather than physical
+   *        values that must be scaled.
+   */
+  template <typename T>
+  void write(std::vector<T const*> const& channels,
+             std::vector<std::ptrdiff_t> const& strides,
+             std::vector<std::size_t> const& lengths, bool digital);
+
+  bool bdf(void) const;
+  std::size_t n_dropped_annotations(void) const;
+  std::size_t n_records(void) const;
+  std::size_t record_bytes(void) const;
+
+ private:
+  void encode_annotations(char* slot, std::size_t record);
+  void set_start_fields(std::tm const& start);
+  void write_header(bool final);
+  void write_sample(char* out, int value) const;
+
+  std::FILE* file_;
+  bool bdf_;
+  std::vector<EdfSignal> signals_;
+  double record_duration_;
+  std::string patient_;
+  std::string recording_;
+  int annotation_bytes_;
+  int sample_bytes_;
+  std::size_t header_bytes_;
+  std::size_t record_bytes_;
+  std::size_t n_records_;
+  std::size_t n_dropped_annotations_;
+  int start_[6];
+  double start_subsecond_;
+  std::vector<double> gains_;
+  std::vector<double> offsets_;
+  std::vector<std::uint16_t> annotation_used_;
+  std::vector<char> buffer_;
+  std::deque<EdfAnnotation> pending_;
+  std::mutex pending_mutex_;
+};
+
+#endif /* INCLUDE_EDF_ENCODER_HPP_ */
@@ -0,0 +1,217 @@
+import queue
+import threading
+import numpy as np  # type: ignore
+
+from typing import Any, Dict, List, Optional
+
+from .instruments import ReadInstrument
+
+
+class InstrumentChannel:
+    def __init__(self, instrument: ReadInstrument, queue_size: int):
+        """The queues and counters that connect a reader thread for an
+        instrument to the writer thread
+
+        Parameters
+        ----------
+        instrument : ReadInstrument
+            The instrument read by this channel
+        queue_size : int
+            The maximum number of blocks waiting to be written
+        """
+        self.instrument: ReadInstrument = instrument
+        self.name: str = ""
+        self.pending: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.delivered: queue.Queue = queue.Queue()
+        self.consumed: bool = False
+        self.n_read: int = 0
+        self.n_written: int = 0
+        self.max_depth: int = 0
+        self.overruns: int = 0
+        self.reader: threading.Thread
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queue_depth": self.pending.qsize(),
+            "max_queue_depth": self.max_depth,
+            "overruns": self.overruns,
+            "blocks_read": self.n_read,
+            "blocks_written": self.n_written,
+        }
+
+
+class AcquisitionEngine:
+    def __init__(
+        self,
+        instruments: List[ReadInstrument],
+        queue_size: int = 64,
+        poll_timeout: float = 0.1,
+        idle_wait: float = 0.001,
+    ):
+        """A producer/consumer engine that reads each instrument on a dedicated
+        thread and stores the data from a separate writer thread, so that slow
+        disk writes never delay reading from a device
+
+        Parameters
+        ----------
+        instruments : List[ReadInstrument]
+            The instruments to read from. The first is the run's primary
+            instrument, whose blocks are all delivered to `collect` from the
+            moment the engine starts because they clock the run. Blocks of the
+            other instruments are only delivered once they are first collected
+        queue_size : int
+            The maximum number of blocks that may wait to be written for each
+            instrument. A reader that finds its queue full counts an overrun
+            and waits for the writer to catch up
+        poll_timeout : float
+            The maximum time in seconds that a thread waits before checking
+            whether the engine is stopping
+        idle_wait : float
+            The time in seconds a reader waits after a read that returned no
+            samples, when its instrument has no wait strategy to wait for the
+            device. Reads without samples are neither counted nor queued
+        """
+        self.channels: List[InstrumentChannel] = [
+            InstrumentChannel(ins, queue_size) for ins in instruments
+        ]
+        if self.channels:
+            self.channels[0].consumed = True
+        self.poll_timeout: float = poll_timeout
+        self.idle_wait: float = idle_wait
+        self.error: Optional[BaseException] = None
+        self._has_pending: threading.Event = threading.Event()
+        self._stopping: threading.Event = threading.Event()
+        self._writer: threading.Thread
+
+    def collect(self, instrument: ReadInstrument) -> List[Any]:
+        """Retrieve the blocks of an instrument that were written since the
+        last call. Waits up to `poll_timeout` for at least one block
+
+        Parameters
+        ----------
+        instrument : ReadInstrument
+            The instrument to collect blocks from
+
+        Returns
+        -------
+        List[Any]
+            The blocks in the order they were read from the device
+        """
+        self.raise_error()
+        channel: InstrumentChannel = self._channel(instrument)
+        channel.consumed = True
+        blocks: List[Any] = []
+        try:
+            blocks.append(channel.delivered.get(timeout=self.poll_timeout))
+            while True:
+                blocks.append(channel.delivered.get_nowait())
+        except queue.Empty:
+            pass
+        return blocks
+
+    def raise_error(self) -> None:
+        """Re-raise any exception that stopped a reader or the writer"""
+        if self.error is not None:
+            raise self.error
+
+    def start(self) -> None:
+        """Begin reading from every instrument"""
+        self._stopping.clear()
+        for channel in self.channels:
+            channel.reader = threading.Thread(
+                target=self._read_loop, args=(channel,), daemon=True
+            )
+            channel.instrument.acquisition = self
+            channel.name = channel.instrument.filename
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+        for channel in self.channels:
+            channel.reader.start()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Queue depth and overrun counters for each instrument
+
+        Returns
+        -------
+        Dict[str, Dict[str, int]]
+            The counters of each instrument keyed by the filename the instrument
+            was recording to
+        """
+        return {channel.name: channel.stats() for channel in self.channels}
+
+    def stop(self) -> None:
+        """Stop the readers and wait for the writer to store every block that
+        was read. Instruments are detached from the engine so that they may be
+        read directly again"""
+        self._stopping.set()
+        for channel in self.channels:
+            channel.reader.join()
+        self._has_pending.set()
+        self._writer.join()
+        for channel in self.channels:
+            channel.instrument.acquisition = None
+        self.raise_error()
+
+    def _channel(self, instrument: ReadInstrument) -> InstrumentChannel:
+        for channel in self.channels:
+            if channel.instrument is instrument:
+                return channel
+        raise Exception("Instrument is not read by this acquisition engine")
+
+    def _drain(self, channel: InstrumentChannel) -> None:
+        while True:
+            try:
+                block: Any = channel.pending.get_nowait()
+            except queue.Empty:
+                return
+            channel.instrument.store(block)
+            channel.n_written += 1
+            if channel.consumed:
+                channel.delivered.put(block)
+
+    def _enqueue(self, channel: InstrumentChannel, block: Any) -> None:
+        if channel.pending.full():
+            channel.overruns += 1
+        # The writer keeps draining until every reader has exited, so this
+        # only gives up if the writer failed
+        while self.error is None:
+            try:
+                channel.pending.put(block, timeout=self.poll_timeout)
+                break
+            except queue.Full:
+                continue
+        channel.max_depth = max(channel.max_depth, channel.pending.qsize())
+        self._has_pending.set()
+
+    def _read_loop(self, channel: InstrumentChannel) -> None:
+        try:
+            while not self._stopping.is_set():
+                channel.instrument.wait(self.poll_timeout)
+                block: Any = channel.instrument.device_read()
+                if len(block) == 0 or np.shape(block[0])[-1] == 0:
+                    # Without a wait strategy, back off rather than spin
+                    if channel.instrument.wait_strategy is None:
+                        self._stopping.wait(self.idle_wait)
+                    continue
+                channel.n_read += 1
+                self._enqueue(channel, block)
+        except BaseException as e:
+            self.error = e
+            self._stopping.set()
+
+    def _write_loop(self) -> None:
+        try:
+            while True:
+                self._has_pending.wait(self.poll_timeout)
+                self._has_pending.clear()
+                for channel in self.channels:
+                    self._drain(channel)
+                if self._stopping.is_set() and not any(
+                    channel.reader.is_alive() for channel in self.channels
+                ):
+                    for channel in self.channels:
+                        self._drain(channel)
+                    return
+        except BaseException as e:
+            self.error = e
+            self._stopping.set()
@@ -0,0 +1,246 @@
+import json
+import numpy as np  # type: ignore
+
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+
+class ClockTrace:
+    def __init__(self, sfreq: float, capacity: int = 1024):
+        """The time at which each block of an instrument's samples was read,
+        paired with the index of the block's last sample, for relating the
+        device's clock to the host's
+
+        Parameters
+        ----------
+        sfreq : float
+            The nominal sampling rate of the device
+        capacity : int
+            The number of blocks room is made for at first. The trace grows
+            as needed
+        """
+        self.sfreq: float = sfreq
+        self.times: np.ndarray = np.empty(capacity)
+        self.indices: np.ndarray = np.empty(capacity, dtype=np.int64)
+        self.n_blocks: int = 0
+        self.n_samples: int = 0
+
+    def fit(self) -> Optional["ClockFit"]:
+        """Estimate the device's sampling period and the time of its first
+        sample on the host's clock, by a least squares fit of the times
+        against the sample indices. A block's time is only ever delayed by
+        the latency of reading it, so the fit is refined on the half of the
+        blocks that arrived with the least delay
+
+        Returns
+        -------
+        Optional[ClockFit]
+            The fit, or None if no block was read
+        """
+        if self.n_blocks == 0:
+            return None
+        times: np.ndarray = self.times[: self.n_blocks]
+        indices: np.ndarray = self.indices[: self.n_blocks]
+        if self.n_blocks < 4:
+            # Too few blocks to estimate the rate
+            period: float = 1 / self.sfreq
+            start: float = float(np.min(times - indices * period))
+            return ClockFit(start, period, self.sfreq, self.n_blocks, 0.0, 0.0)
+
+        # Centered, so that large times and indices keep their precision
+        t0: float = float(times[0])
+        i0: int = int(indices[0])
+        x: np.ndarray = (indices - i0).astype(np.float64)
+        y: np.ndarray = times - t0
+        slope, intercept = _line(x, y, np.ones(len(x), dtype=bool))
+        residuals: np.ndarray = y - (intercept + slope * x)
+        slope, intercept = _line(x, y, residuals <= np.median(residuals))
+        residuals = y - (intercept + slope * x)
+        # The blocks that arrived first were read without delay
+        intercept += float(residuals.min())
+        residuals -= residuals.min()
+        return ClockFit(
+            t0 + intercept - i0 * slope,
+            slope,
+            self.sfreq,
+            self.n_blocks,
+            float(np.median(residuals)),
+            float(residuals.max()),
+        )
+
+    def record(self, time: float, n_samples: int) -> None:
+        """Add a block
+
+        Parameters
+        ----------
+        time : float
+            When the block was read, on the host's clock
+        n_samples : int
+            The number of samples in the block
+        """
+        if n_samples == 0:
+            return
+        if self.n_blocks == len(self.times):
+            self.times = np.resize(self.times, 2 * len(self.times))
+            self.indices = np.resize(self.indices, 2 * len(self.indices))
+        self.n_samples += n_samples
+        self.times[self.n_blocks] = time
+        self.indices[self.n_blocks] = self.n_samples - 1
+        self.n_blocks += 1
+
+    def reset(self) -> None:
+        """Forget the blocks recorded, at the start of a run"""
+        self.n_blocks = 0
+        self.n_samples = 0
+
+
+class ClockFit:
+    def __init__(
+        self,
+        start: float,
+        period: float,
+        nominal_sfreq: float,
+        n_blocks: int,
+        latency: float,
+        max_latency: float,
+    ):
+        """A linear relation between the indices of a device's samples and the
+        host's clock
+
+        Parameters
+        ----------
+        start : float
+            The time of the device's first sample on the host's clock
+        period : float
+            The time between samples on the host's clock
+        nominal_sfreq : float
+            The sampling rate the device was configured for
+        n_blocks : int
+            The number of blocks the relation was fit to. Zero when only the
+            time the device started is known, and it is assumed to sample at
+            its nominal rate
+        latency : float
+            The median delay of a block after the earliest it could have been
+            read
+        max_latency : float
+            The largest such delay
+        """
+        self.start: float = start
+        self.period: float = period
+        self.nominal_sfreq: float = nominal_sfreq
+        self.n_blocks: int = n_blocks
+        self.latency: float = latency
+        self.max_latency: float = max_latency
+
+    def mapping_to(self, other: "ClockFit") -> Tuple[float, float]:
+        """The relation between the indices of this device's samples and those
+        of another device
+
+        Parameters
+        ----------
+        other : ClockFit
+            The fit of the other device
+
+        Returns
+        -------
+        Tuple[float, float]
+            The scale and offset such that sample `i` of this device was taken
+            at the same time as sample `offset + scale * i` of the other
+        """
+        return (
+            self.period / other.period,
+            (self.start - other.start) / other.period,
+        )
+
+    def to_dict(self, origin: float = 0.0) -> Dict[str, Any]:
+        """Summarize the fit
+
+        Parameters
+        ----------
+        origin : float
+            A time on the host's clock that `start` is reported relative to
+        """
+        return {
+            "nominal_sfreq": self.nominal_sfreq,
+            "sfreq": self.sfreq,
+            "drift_ppm": self.drift_ppm,
+            "start": self.start - origin,
+            "n_blocks": self.n_blocks,
+            "latency": self.latency,
+            "max_latency": self.max_latency,
+        }
+
+    def to_index(self, times: np.ndarray) -> np.ndarray:
+        """The fractional indices of the samples read at times on the host's
+        clock"""
+        return (np.asarray(times) - self.start) / self.period
+
+    def to_time(self, indices: np.ndarray) -> np.ndarray:
+        """The earliest times on the host's clock at which samples could have
+        been read"""
+        return self.start + np.asarray(indices) * self.period
+
+    @property
+    def drift_ppm(self) -> float:
+        """How much faster the device samples than its nominal rate, in parts
+        per million"""
+        return (self.sfreq / self.nominal_sfreq - 1) * 1e6
+
+    @property
+    def sfreq(self) -> float:
+        """The sampling rate measured on the host's clock"""
+        return 1 / self.period
+
+
+def write_alignment(
+    path: Path,
+    fits: Dict[str, Optional[ClockFit]],
+    primary: str,
+    origin: float = 0.0,
+) -> Dict[str, Any]:
+    """Write, as a JSON sidecar, the fit of the clock of every instrument and
+    how the indices of its samples map to those of the primary instrument
+
+    Parameters
+    ----------
+    path : Path
+        The path of the JSON file
+    fits : Dict[str, Optional[ClockFit]]
+        The fit of each instrument, keyed by a label. Instruments without a
+        fit are left out
+    primary : str
+        The label of the primary instrument
+    origin : float
+        A time on the host's clock, such as the start of the run, that the
+        start of each instrument is reported relative to
+
+    Returns
+    -------
+    Dict[str, Any]
+        What was written
+    """
+    reference: Optional[ClockFit] = fits.get(primary)
+    instruments: Dict[str, Any] = {}
+    for label, fit in fits.items():
+        if fit is None:
+            continue
+        instruments[label] = fit.to_dict(origin)
+        if reference is not None:
+            scale, offset = fit.mapping_to(reference)
+            instruments[label]["to_primary"] = {"scale": scale, "offset": offset}
+    alignment: Dict[str, Any] = {"primary": primary, "instruments": instruments}
+    with open(path, "w") as fh:
+        json.dump(alignment, fh, indent=2)
+    return alignment
+
+
+def _line(x: np.ndarray, y: np.ndarray, mask: np.ndarray) -> Tuple[float, float]:
+    """The slope and intercept of the least squares line through the masked
+    points"""
+    xm: np.ndarray = x[mask]
+    ym: np.ndarray = y[mask]
+    x_mean: float = float(xm.mean())
+    y_mean: float = float(ym.mean())
+    dx: np.ndarray = xm - x_mean
+    slope: float = float(dx @ (ym - y_mean) / (dx @ dx))
+    return slope, y_mean - slope * x_mean
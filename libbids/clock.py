@@ -0,0 +1,108 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+class Clock(ABC):
+    """A source of time for runs, instruments, devices and wait strategies.
+    Times are in seconds from an arbitrary origin and never go backwards"""
+
+    @abstractmethod
+    def now(self) -> float:
+        """The current time"""
+        raise Exception("Not Implemented")
+
+    def sleep(
+        self, seconds: float, interrupt: Optional[threading.Event] = None
+    ) -> None:
+        """Sleep for a number of seconds
+
+        Parameters
+        ----------
+        seconds : float
+            How long to sleep
+        interrupt : Optional[threading.Event]
+            If supplied, setting this event ends the sleep early
+        """
+        self.sleep_until(self.now() + seconds, interrupt)
+
+    @abstractmethod
+    def sleep_until(
+        self, deadline: float, interrupt: Optional[threading.Event] = None
+    ) -> None:
+        """Sleep until the clock reaches a deadline
+
+        Parameters
+        ----------
+        deadline : float
+            The time to wake up at
+        interrupt : Optional[threading.Event]
+            If supplied, setting this event ends the sleep early
+        """
+        raise Exception("Not Implemented")
+
+    @property
+    def is_virtual(self) -> bool:
+        return False
+
+
+class MonotonicClock(Clock):
+    """The system's monotonic performance counter. Sleeping blocks the calling
+    thread in real time"""
+
+    def now(self) -> float:
+        return time.perf_counter()
+
+    def sleep_until(
+        self, deadline: float, interrupt: Optional[threading.Event] = None
+    ) -> None:
+        delay: float = deadline - time.perf_counter()
+        if delay <= 0:
+            return
+        if interrupt is not None:
+            interrupt.wait(delay)
+        else:
+            time.sleep(delay)
+
+
+class VirtualClock(Clock):
+    def __init__(self, start: float = 0.0):
+        """A clock that only moves when it is advanced. Sleeping jumps the
+        clock forward to the deadline instead of blocking, so a run using it
+        proceeds as fast as its instruments can produce samples. Used to
+        simulate a run, together with devices that generate or replay samples
+        on demand
+
+        Parameters
+        ----------
+        start : float
+            The initial time
+        """
+        self.time: float = start
+        self._lock: threading.Lock = threading.Lock()
+
+    def advance(self, seconds: float) -> None:
+        """Move the clock forward by a number of seconds"""
+        with self._lock:
+            self.time += max(seconds, 0.0)
+
+    def advance_to(self, deadline: float) -> None:
+        """Move the clock forward to a time, if it is not already past it"""
+        with self._lock:
+            if deadline > self.time:
+                self.time = deadline
+
+    def now(self) -> float:
+        return self.time
+
+    def sleep_until(
+        self, deadline: float, interrupt: Optional[threading.Event] = None
+    ) -> None:
+        if interrupt is not None and interrupt.is_set():
+            return
+        self.advance_to(deadline)
+
+    @property
+    def is_virtual(self) -> bool:
+        return True
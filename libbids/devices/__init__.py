@@ -0,0 +1,7 @@
+from .block_device import BlockDevice
+from .replay_device import ReplayDevice
+from .synthetic_device import SyntheticDevice
+
+BlockDevice
+ReplayDevice
+SyntheticDevice
@@ -0,0 +1,212 @@
+import numpy as np  # type: ignore
+
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence, Union, cast
+
+from ..clock import Clock, MonotonicClock
+
+
+class BlockDevice(ABC):
+    def __init__(
+        self,
+        sfreqs: List[int],
+        block_size: int = 16,
+        block_sizes: Optional[Sequence[int]] = None,
+        speed: Optional[float] = 1.0,
+        jitter: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        """A device that delivers samples in blocks on a schedule, either in
+        real time, faster than real time or as fast as they are read. Time is
+        kept on the device's `clock`, so a paced device driven by a
+        `VirtualClock` generates samples on demand
+
+        Parameters
+        ----------
+        sfreqs : List[int]
+            The sampling rate of each channel
+        block_size : int
+            The number of samples per block on the first channel. Channels with
+            other sampling rates deliver the number of samples covering the
+            same time span
+        block_sizes : Optional[Sequence[int]]
+            If supplied, the sizes of successive blocks on the first channel,
+            repeated as needed, instead of a fixed `block_size`
+        speed : Optional[float]
+            How many times faster than real time blocks become available. If
+            None, every read returns the next block immediately
+        jitter : float
+            The standard deviation, in seconds, of a random delay added to the
+            time at which each block becomes available. Delays do not
+            accumulate, so the device does not drift
+        seed : Optional[int]
+            The seed for the jitter's random number generator
+        """
+        self.sfreqs: List[int] = sfreqs
+        self.n_channels: int = len(sfreqs)
+        self.block_sizes: List[int] = (
+            [block_size] if block_sizes is None else list(block_sizes)
+        )
+        self.speed: Optional[float] = speed
+        self.jitter: float = jitter
+        self.n_blocks: int = 0
+        self.n_samples: int = 0
+        self.start_time: Optional[float] = None
+        self.clock: Clock = MonotonicClock()
+        self._next_due: float = 0.0
+        self._rates: np.ndarray = np.asarray(sfreqs, dtype=np.int64)
+        self._rng: np.random.Generator = np.random.default_rng(seed)
+
+    def block_lengths(self, n_samples: int, block_size: int) -> np.ndarray:
+        """The number of samples each channel delivers in a block
+
+        Parameters
+        ----------
+        n_samples : int
+            The number of samples of the first channel delivered before the
+            block
+        block_size : int
+            The number of samples of the first channel in the block
+
+        Returns
+        -------
+        np.ndarray
+            The number of samples of each channel
+        """
+        base: int = self.sfreqs[0]
+        end: np.ndarray = (n_samples + block_size) * self._rates // base
+        return end - n_samples * self._rates // base
+
+    def read(self) -> Union[np.ndarray, List[np.ndarray]]:
+        """Read the next block of samples, waiting until it is due if the
+        device is paced
+
+        Returns
+        -------
+        Union[np.ndarray, List[np.ndarray]]
+            A (channels, time) array if all channels share the same sampling
+            rate, else a list with an array per channel
+        """
+        if self.start_time is None:
+            self.start()
+        if self.speed is not None:
+            self.ready()
+
+        block_size: int = self.block_sizes[self.n_blocks % len(self.block_sizes)]
+        starts: np.ndarray = self.n_samples * self._rates // self.sfreqs[0]
+        lengths: np.ndarray = self.block_lengths(self.n_samples, block_size)
+        block: Union[np.ndarray, List[np.ndarray]] = self._generate(starts, lengths)
+        self.n_blocks += 1
+        self.n_samples += block_size
+        self._schedule()
+        return block
+
+    def read_into(self, out: np.ndarray) -> int:
+        """Read the next block of samples into an array, waiting until it is
+        due if the device is paced. Only supported when all channels share a
+        sampling rate
+
+        Parameters
+        ----------
+        out : np.ndarray
+            A writable (channels, time) array. If it is narrower than the
+            block, only as many samples as fit are read and the rest of the
+            block follows on the next read
+
+        Returns
+        -------
+        int
+            The number of samples read into the leading columns of `out`
+        """
+        if self.start_time is None:
+            self.start()
+        if self.speed is not None:
+            self.ready()
+
+        block_size: int = self.block_sizes[self.n_blocks % len(self.block_sizes)]
+        n: int = self._generate_into(
+            out, self.n_samples, min(block_size, out.shape[-1])
+        )
+        self.n_blocks += 1
+        self.n_samples += n
+        self._schedule()
+        return n
+
+    def ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until the next block is due or the timeout elapses. Suitable
+        as the callback of a `CallbackWait`
+
+        Parameters
+        ----------
+        timeout : Optional[float]
+            The maximum time in seconds to wait
+
+        Returns
+        -------
+        bool
+            Whether the next block is available
+        """
+        if self.start_time is None:
+            self.start()
+        if self.speed is None:
+            return True
+        if timeout is not None and self._next_due - self.clock.now() > timeout:
+            self.clock.sleep(max(timeout, 0.0))
+            return False
+        self.clock.sleep_until(self._next_due)
+        return True
+
+    def start(self) -> None:
+        """Begin delivering samples from the beginning"""
+        self.n_blocks = 0
+        self.n_samples = 0
+        self.start_time = self.clock.now()
+        self._schedule()
+
+    def stop(self) -> None:
+        """Stop delivering samples"""
+        self.start_time = None
+
+    @abstractmethod
+    def _generate(
+        self, starts: np.ndarray, lengths: np.ndarray
+    ) -> Union[np.ndarray, List[np.ndarray]]:
+        """Produce the samples of a block
+
+        Parameters
+        ----------
+        starts : np.ndarray
+            The index of the first sample of the block on each channel
+        lengths : np.ndarray
+            The number of samples of the block on each channel
+        """
+        raise Exception("Not Implemented")
+
+    def _generate_into(self, out: np.ndarray, start: int, n: int) -> int:
+        """Produce the samples of a block into the leading columns of an
+        array and return how many were produced. Devices override this to
+        avoid allocating the block
+
+        Parameters
+        ----------
+        out : np.ndarray
+            The (channels, time) array to fill
+        start : int
+            The index of the first sample of the block
+        n : int
+            The number of samples in the block
+        """
+        starts: np.ndarray = np.full(self.n_channels, start, dtype=np.int64)
+        lengths: np.ndarray = np.full(self.n_channels, n, dtype=np.int64)
+        block: np.ndarray = cast(np.ndarray, self._generate(starts, lengths))
+        out[:, : block.shape[-1]] = block
+        return block.shape[-1]
+
+    def _schedule(self) -> None:
+        """Determine when the next block becomes available"""
+        if self.speed is None:
+            return
+        block_size: int = self.block_sizes[self.n_blocks % len(self.block_sizes)]
+        due: float = (self.n_samples + block_size) / self.sfreqs[0] / self.speed
+        delay: float = abs(self._rng.normal(0.0, self.jitter)) if self.jitter else 0.0
+        self._next_due = cast(float, self.start_time) + due + delay
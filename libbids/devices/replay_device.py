@@ -0,0 +1,128 @@
+import numpy as np  # type: ignore
+
+from pathlib import Path
+from pyedflib import EdfReader  # type: ignore
+from typing import List, Optional, Sequence, Union
+
+from .block_device import BlockDevice
+
+
+class ReplayDevice(BlockDevice):
+    def __init__(
+        self,
+        path: Union[str, Path],
+        block_size: int = 16,
+        block_sizes: Optional[Sequence[int]] = None,
+        speed: Optional[float] = 1.0,
+        jitter: float = 0.0,
+        digital: bool = False,
+        loop: bool = False,
+        seed: Optional[int] = None,
+    ):
+        """A device that replays a recorded edf file, such as an `*_eeg.edf`
+        written by an `EEGInstrument`, in blocks. Use it with an
+        `EEGInstrument` as `EEGInstrument(session, device, device.sfreq,
+        device.electrodes, init_read_fn=device.start, read_fn=device.read,
+        stop_fn=device.stop)`
+
+        Parameters
+        ----------
+        path : Union[str, Path]
+            The edf file to replay. The whole file is loaded into memory so
+            that replaying it does not touch the disk
+        block_size : int
+            The number of samples per block on the first channel
+        block_sizes : Optional[Sequence[int]]
+            If supplied, the sizes of successive blocks on the first channel,
+            repeated as needed, so that the block pattern of a real device can
+            be reproduced
+        speed : Optional[float]
+            How many times faster than real time to replay. 1.0 replays in real
+            time, and None replays as fast as the samples are read
+        jitter : float
+            The standard deviation, in seconds, of a random delay added to the
+            time at which each block becomes available
+        digital : bool
+            Whether to replay the digital values stored in the file rather than
+            the physical values
+        loop : bool
+            Whether to start over from the beginning of the file once it has
+            been replayed. Otherwise reads past the end return empty blocks
+        seed : Optional[int]
+            The seed for the jitter's random number generator
+        """
+        self.path: Path = Path(path)
+        self.digital: bool = digital
+        self.loop: bool = loop
+        with EdfReader(str(self.path)) as reader:
+            n_signals: int = reader.signals_in_file
+            sfreqs: List[int] = [
+                int(round(reader.getSampleFrequency(i))) for i in range(n_signals)
+            ]
+            self.electrodes: List[str] = reader.getSignalLabels()
+            self.physical_dimension: str = reader.getPhysicalDimension(0)
+            self.physical_lim: tuple = (
+                reader.getPhysicalMinimum(0),
+                reader.getPhysicalMaximum(0),
+            )
+            self.signals: List[np.ndarray] = [
+                reader.readSignal(i, digital=digital) for i in range(n_signals)
+            ]
+        super(ReplayDevice, self).__init__(
+            sfreqs, block_size, block_sizes, speed, jitter, seed
+        )
+        self.sfreq: Union[int, List[int]] = (
+            sfreqs if len(set(sfreqs)) > 1 else sfreqs[0]
+        )
+        self.dtype: np.dtype = self.signals[0].dtype
+        # The number of samples of each channel in one pass over the file
+        self.n_times: np.ndarray = np.array([len(s) for s in self.signals])
+        if isinstance(self.sfreq, int):
+            self.data: Optional[np.ndarray] = np.stack(self.signals)
+        else:
+            self.data = None
+
+    @property
+    def exhausted(self) -> bool:
+        """Whether every sample of the file has been replayed"""
+        if self.loop:
+            return False
+        return self.n_samples >= self.n_times[0]
+
+    def _generate(
+        self, starts: np.ndarray, lengths: np.ndarray
+    ) -> Union[np.ndarray, List[np.ndarray]]:
+        if self.loop:
+            starts = starts % self.n_times
+        ends: np.ndarray = starts + lengths
+
+        if self.data is not None:
+            start: int = int(starts[0])
+            end: int = int(ends[0])
+            if end <= self.data.shape[1] or not self.loop:
+                return self.data[:, start:end].copy()
+            # Wrap around to the beginning of the file
+            return np.hstack(
+                [self.data[:, start:], self.data[:, : end - self.data.shape[1]]]
+            )
+
+        rows: List[np.ndarray] = []
+        for signal, start, end in zip(self.signals, starts.tolist(), ends.tolist()):
+            if end <= len(signal) or not self.loop:
+                rows.append(signal[start:end].copy())
+            else:
+                rows.append(np.hstack([signal[start:], signal[: end - len(signal)]]))
+        return rows
+
+    def _generate_into(self, out: np.ndarray, start: int, n: int) -> int:
+        data: np.ndarray = self.data  # type: ignore
+        length: int = data.shape[1]
+        if self.loop:
+            start %= length
+        else:
+            n = max(min(n, length - start), 0)
+        first: int = min(n, length - start)
+        out[:, :first] = data[:, start : start + first]
+        if n > first:
+            out[:, first:n] = data[:, : n - first]
+        return n
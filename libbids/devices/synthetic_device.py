@@ -0,0 +1,89 @@
+import numpy as np  # type: ignore
+
+from typing import List, Optional, Union
+
+from .block_device import BlockDevice
+
+
+class SyntheticDevice(BlockDevice):
+    def __init__(
+        self,
+        n_channels: int = 8,
+        sfreq: Union[int, List[int]] = 256,
+        block_size: int = 16,
+        jitter: float = 0.0,
+        paced: bool = True,
+        amplitude: float = 100.0,
+        dtype: np.dtype = np.dtype(np.float64),
+        seed: Optional[int] = None,
+    ):
+        """A device that generates sine waves in blocks, for exercising and
+        benchmarking acquisition without hardware. It can be used with an
+        `EEGInstrument` as `EEGInstrument(session, device, device.sfreq,
+        electrodes, init_read_fn=device.start, read_fn=device.read,
+        stop_fn=device.stop)`
+
+        Parameters
+        ----------
+        n_channels : int
+            The number of channels
+        sfreq : Union[int, List[int]]
+            The sampling rate of every channel, or a list with the sampling
+            rate of each channel
+        block_size : int
+            The number of samples per block on the first channel. Channels with
+            other sampling rates deliver the number of samples covering the
+            same time span
+        jitter : float
+            The standard deviation, in seconds, of a random delay added to the
+            time at which each block becomes available. Delays do not
+            accumulate, so the device does not drift
+        paced : bool
+            If true, `read` blocks until the next block is due in real time.
+            Otherwise every call returns the next block immediately
+        amplitude : float
+            The amplitude of the generated sine waves
+        dtype : np.dtype
+            The data type of the generated samples
+        seed : Optional[int]
+            The seed for the jitter's random number generator
+        """
+        self.sfreq: Union[int, List[int]] = sfreq
+        sfreqs: List[int] = (
+            [sfreq] * n_channels if isinstance(sfreq, int) else list(sfreq)
+        )
+        assert len(sfreqs) == n_channels, "A sampling rate is needed per channel"
+        assert block_size <= sfreqs[0], "Blocks may be at most a second long"
+        super(SyntheticDevice, self).__init__(
+            sfreqs, block_size, None, 1.0 if paced else None, jitter, seed
+        )
+        self.dtype: np.dtype = np.dtype(dtype)
+
+        # One second of signal per channel, repeated twice so that any block
+        # of up to a second can be sliced without wrapping
+        self._tables: List[np.ndarray] = []
+        for ch, rate in enumerate(self.sfreqs):
+            t: np.ndarray = np.arange(2 * rate) / rate
+            wave: np.ndarray = amplitude * np.sin(2 * np.pi * (ch % 40 + 1) * t)
+            self._tables.append(wave.astype(self.dtype))
+        self._is_multirate: bool = len(set(self.sfreqs)) > 1
+        if not self._is_multirate:
+            self._table: np.ndarray = np.stack(self._tables)
+
+    def _generate(
+        self, starts: np.ndarray, lengths: np.ndarray
+    ) -> Union[np.ndarray, List[np.ndarray]]:
+        if not self._is_multirate:
+            offset: int = int(starts[0]) % self.sfreqs[0]
+            return self._table[:, offset : offset + int(lengths[0])].copy()
+
+        rows: List[np.ndarray] = []
+        for ch, (start, length) in enumerate(zip(starts.tolist(), lengths.tolist())):
+            offset = start % self.sfreqs[ch]
+            rows.append(self._tables[ch][offset : offset + length].copy())
+        return rows
+
+    def _generate_into(self, out: np.ndarray, start: int, n: int) -> int:
+        offset: int = start % self.sfreqs[0]
+        out[:, :n] = self._table[:, offset : offset + n]
+        return n
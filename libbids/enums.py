@@ -12,3 +12,27 @@ class Modality(Enum):
     @property
     def is_primary(self) -> bool:
         return self.name not in ["PHYSIO", "STIM"]
+
+
+class BackpressurePolicy(Enum):
+    """What a bounded writer queue does when it is full"""
+
+    BLOCK = auto()
+    GROW = auto()
+    SPILL = auto()
+
+
+class StorageFormat(Enum):
+    """The file formats an instrument's recording can be stored in"""
+
+    EDF = auto()
+    BDF = auto()
+    BRAINVISION = auto()
+
+
+class TapPolicy(Enum):
+    """What a data tap does with a subscriber that falls behind"""
+
+    DROP = auto()
+    DECIMATE = auto()
+    DISCONNECT = auto()
@@ -3,14 +3,19 @@ import numpy as np
 from datetime import timedelta
 from typing import (
     Any,
+    Callable,
     Dict,
     Iterator,
     List,
     Optional,
+    TYPE_CHECKING,
     Union,
     cast,
 )
 
+if TYPE_CHECKING:
+    from .trigger import Trigger
+
 
 class Event:
     def __init__(
@@ -47,6 +52,10 @@ class Event:
         self.trial_type: Optional[str] = trial_type
         self.triggerable: bool = triggerable
         self.threading_event: threading.Event = threading.Event()
+        # Set by the run: called when the event is triggered, and the trigger
+        # that began the event
+        self.on_set: Optional[Callable[["Event"], Any]] = None
+        self.trigger: Optional["Trigger"] = None
 
     def __iter__(self) -> Iterator:
         keys: List[str] = ["onset", "duration", "trial_type"]
@@ -65,6 +74,8 @@ class Event:
 
     def set(self) -> None:
         if self.triggerable:
+            if self.on_set is not None:
+                self.on_set(self)
             self.threading_event.set()
 
     def to_dict(self) -> Dict[str, Any]:
@@ -0,0 +1,230 @@
+import mmap
+import os
+import struct
+import numpy as np  # type: ignore
+
+from datetime import timedelta
+from pathlib import Path
+from typing import List, Optional, Union
+
+from .clock import Clock, MonotonicClock
+from .event import Event
+
+
+class EventLog:
+    # The journal starts with the number of bytes of rows it holds and the
+    # number of those rows that have already been flushed to the event file.
+    # The count is only a hint, as the process may die between writing rows
+    # to the event file and updating it, so `recover` counts the rows instead
+    JOURNAL_HEADER: struct.Struct = struct.Struct("<QQ")
+    COLUMNS: List[str] = ["onset", "duration", "trial_type"]
+
+    def __init__(
+        self,
+        path: Path,
+        flush_every: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        fsync: bool = False,
+        journal: bool = True,
+        capacity: int = 1024,
+    ):
+        """A columnar log of the events of a run that writes them to an
+        `events.tsv` file in batches
+
+        Parameters
+        ----------
+        path : Path
+            The path of the event file
+        flush_every : Optional[int]
+            If supplied, flush after this many events have been appended
+        flush_interval : Optional[float]
+            If supplied, flush when an event is appended and at least this many
+            seconds have passed since the last flush, according to the log's
+            `clock`
+        fsync : bool
+            Whether every flush should also force the data to disk. The final
+            flush when the log is closed always does
+        journal : bool
+            If true, every appended row is also copied into a memory-mapped
+            journal file next to the event file. The journal survives the
+            process dying without any system call per event, and `recover`
+            completes the event file from it
+        capacity : int
+            The number of events to preallocate room for
+        """
+        self.path: Path = path
+        self.flush_every: Optional[int] = flush_every
+        self.flush_interval: Optional[float] = flush_interval
+        self.fsync: bool = fsync
+        self.journal: bool = journal
+        self.onsets: np.ndarray = np.empty(capacity)
+        self.durations: np.ndarray = np.empty(capacity)
+        self.trial_types: List[Optional[str]] = []
+        self.n_events: int = 0
+        self.n_flushed: int = 0
+        self.last_flush: float = 0.0
+        self.clock: Clock = MonotonicClock()
+        self._fh: int = -1
+        self._journal_fh: int = -1
+        self._journal: Optional[mmap.mmap] = None
+        self._journal_size: int = 0
+
+    def append(self, event: Event) -> None:
+        """Add an event to the log, flushing if the policy calls for it
+
+        Parameters
+        ----------
+        event : Event
+            The finished event to log
+        """
+        if self.n_events == len(self.onsets):
+            self.onsets = np.resize(self.onsets, 2 * len(self.onsets))
+            self.durations = np.resize(self.durations, 2 * len(self.durations))
+        self.onsets[self.n_events] = self._seconds(event.onset)
+        self.durations[self.n_events] = self._seconds(event.duration)
+        self.trial_types.append(event.trial_type)
+        self.n_events += 1
+        if self._journal is not None:
+            self._journal_write(self._format(self.n_events - 1, self.n_events))
+
+        pending: int = self.n_events - self.n_flushed
+        if (self.flush_every is not None and pending >= self.flush_every) or (
+            self.flush_interval is not None
+            and self.clock.now() - self.last_flush >= self.flush_interval
+        ):
+            self.flush(self.fsync)
+
+    def close(self) -> None:
+        """Flush every remaining event to disk and remove the journal"""
+        if self._fh < 0:
+            return
+        self.flush(fsync=True)
+        os.close(self._fh)
+        self._fh = -1
+        if self._journal is not None:
+            self._journal.close()
+            os.close(self._journal_fh)
+            self._journal = None
+            os.remove(self.journal_path)
+
+    def flush(self, fsync: bool = False) -> None:
+        """Write all events appended since the last flush to the event file
+
+        Parameters
+        ----------
+        fsync : bool
+            Whether to force the written data to disk
+        """
+        self.last_flush = self.clock.now()
+        if self.n_flushed < self.n_events:
+            data: bytes = self._format(self.n_flushed, self.n_events).encode()
+            os.write(self._fh, data)
+            self.n_flushed = self.n_events
+            if self._journal is not None:
+                self.JOURNAL_HEADER.pack_into(
+                    self._journal, 0, self._journal_size, self.n_flushed
+                )
+        if fsync:
+            os.fsync(self._fh)
+
+    def open(self) -> None:
+        """Create the event file, with its header, and the journal"""
+        if self.path.exists():
+            raise Exception("Run data is already saved, please create a new run")
+
+        self._fh = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        os.write(self._fh, ("\t".join(self.COLUMNS) + "\n").encode())
+        self.last_flush = self.clock.now()
+        if self.journal:
+            self._journal_fh = os.open(
+                self.journal_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644
+            )
+            self._journal_map(mmap.PAGESIZE)
+
+    @classmethod
+    def recover(cls, path: Path) -> int:
+        """Complete an event file that was left behind by a run that did not
+        finish, using its journal. Only the rows missing from the event file
+        are appended, so recovering is safe however far the last flush got
+
+        Parameters
+        ----------
+        path : Path
+            The path of the event file
+
+        Returns
+        -------
+        int
+            The number of events that were recovered
+        """
+        journal_path: Path = cls.journal_path_for(path)
+        if not journal_path.exists():
+            return 0
+
+        data: bytes = journal_path.read_bytes()
+        size: int
+        size, _ = cls.JOURNAL_HEADER.unpack_from(data, 0)
+        start: int = cls.JOURNAL_HEADER.size
+        rows: List[bytes] = data[start : start + size].splitlines(keepends=True)
+        written: bytes = path.read_bytes() if path.exists() else b""
+        # Drop a row that was only partly written before the process died
+        complete: int = written.rfind(b"\n") + 1
+        n_written: int = max(written.count(b"\n", 0, complete) - 1, 0)
+        with open(path, "r+b" if path.exists() else "wb") as fh:
+            fh.truncate(complete)
+            fh.seek(complete)
+            if complete == 0:
+                fh.write(("\t".join(cls.COLUMNS) + "\n").encode())
+            fh.writelines(rows[n_written:])
+            fh.flush()
+            os.fsync(fh.fileno())
+        journal_path.unlink()
+        return max(len(rows) - n_written, 0)
+
+    @classmethod
+    def journal_path_for(cls, path: Path) -> Path:
+        return path.with_name(path.name + ".journal")
+
+    def _format(self, start: int, stop: int) -> str:
+        """Format a range of logged events as rows of the event file"""
+        return "".join(
+            [
+                f"{self._text(onset)}\t{self._text(duration)}\t{trial_type}\n"
+                for onset, duration, trial_type in zip(
+                    self.onsets[start:stop].tolist(),
+                    self.durations[start:stop].tolist(),
+                    self.trial_types[start:stop],
+                )
+            ]
+        )
+
+    def _journal_map(self, length: int) -> None:
+        os.ftruncate(self._journal_fh, length)
+        self._journal = mmap.mmap(self._journal_fh, length)
+
+    def _journal_write(self, row: str) -> None:
+        data: bytes = row.encode()
+        offset: int = self.JOURNAL_HEADER.size + self._journal_size
+        journal: mmap.mmap = self._journal  # type: ignore
+        if offset + len(data) > len(journal):
+            length: int = 2 * len(journal)
+            while offset + len(data) > length:
+                length *= 2
+            journal.close()
+            self._journal_map(length)
+            journal = self._journal  # type: ignore
+        journal[offset : offset + len(data)] = data
+        self._journal_size += len(data)
+        self.JOURNAL_HEADER.pack_into(journal, 0, self._journal_size, self.n_flushed)
+
+    @staticmethod
+    def _seconds(value: Optional[timedelta]) -> float:
+        return np.nan if value is None else value.total_seconds()
+
+    @staticmethod
+    def _text(value: float) -> Union[float, str]:
+        return "None" if value != value else value
+
+    @property
+    def journal_path(self) -> Path:
+        return self.journal_path_for(self.path)
@@ -0,0 +1,284 @@
+import tempfile
+import threading
+import time
+import numpy as np  # type: ignore
+
+from collections import deque
+from pathlib import Path
+from typing import (
+    IO,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
+
+from ..enums import BackpressurePolicy
+
+
+class SpilledBlock:
+    def __init__(self, layout: List[Tuple[int, Tuple, np.dtype]], is_list: bool):
+        """A reference to a block of samples that was written to the spill
+        file because the writer queue was full
+
+        Parameters
+        ----------
+        layout : List[Tuple[int, Tuple, np.dtype]]
+            The offset, shape and data type of each array in the block
+        is_list : bool
+            Whether the block was a list of arrays rather than a single array
+        """
+        self.layout: List[Tuple[int, Tuple, np.dtype]] = layout
+        self.is_list: bool = is_list
+
+
+class BackgroundWriter:
+    def __init__(
+        self,
+        write_fn: Callable[[Any], None],
+        maxsize: int = 16,
+        policy: Union[BackpressurePolicy, str] = BackpressurePolicy.BLOCK,
+        spill_dir: Optional[Path] = None,
+        records_fn: Optional[Callable[[Any], int]] = None,
+    ):
+        """Writes blocks of samples from a background thread so that disk
+        latency does not stall acquisition. Submitted blocks are copied, so
+        callers may pass views into buffers they will reuse
+
+        Parameters
+        ----------
+        write_fn : Callable[[Any], None]
+            The function that writes a block to disk
+        maxsize : int
+            The number of blocks that may be held in memory waiting to be
+            written
+        policy : Union[BackpressurePolicy, str]
+            What `submit` does when `maxsize` blocks are waiting. BLOCK waits
+            for the writer to catch up, GROW holds the block in memory anyway
+            and SPILL appends the block to a temporary raw file from which the
+            writer reads it back in order
+        spill_dir : Optional[Path]
+            The directory for the spill file. Defaults to the system's
+            temporary directory
+        records_fn : Optional[Callable[[Any], int]]
+            The function that counts the records in a block, for the record
+            counts in `stats`. Defaults to one record per block
+        """
+        self.write_fn: Callable[[Any], None] = write_fn
+        self.maxsize: int = maxsize
+        self.policy: BackpressurePolicy = (
+            policy
+            if isinstance(policy, BackpressurePolicy)
+            else cast(BackpressurePolicy, BackpressurePolicy._member_map_[policy])
+        )
+        self.spill_dir: Optional[Path] = spill_dir
+        self.records_fn: Optional[Callable[[Any], int]] = records_fn
+        self.error: Optional[BaseException] = None
+
+        self.n_queued: int = 0
+        self.n_written: int = 0
+        self.n_spilled: int = 0
+        self.max_backlog: int = 0
+        self.n_queued_records: int = 0
+        self.n_written_records: int = 0
+        self.max_backlog_records: int = 0
+        self.blocked_time: float = 0.0
+
+        self._items: Deque[Tuple[Any, int]] = deque()
+        self._backlog_records: int = 0
+        self._in_memory: int = 0
+        self._writing: bool = False
+        self._closing: bool = False
+        self._cond: threading.Condition = threading.Condition()
+        self._pool: Dict[Tuple, List[np.ndarray]] = {}
+        self._spill: Optional[IO[bytes]] = None
+        self._spill_lock: threading.Lock = threading.Lock()
+        self._spill_size: int = 0
+        self._spill_pending: int = 0
+        self._thread: threading.Thread = threading.Thread(
+            target=self._write_loop, daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """Write every waiting block and stop the background thread"""
+        self.drain()
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join()
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        self.raise_error()
+
+    def drain(self) -> None:
+        """Block until every submitted block has been written"""
+        with self._cond:
+            while (len(self._items) > 0 or self._writing) and self.error is None:
+                self._cond.wait()
+        self.raise_error()
+
+    def raise_error(self) -> None:
+        """Re-raise any exception raised while writing"""
+        if self.error is not None:
+            raise self.error
+
+    def stats(self) -> Dict[str, float]:
+        """Summarize the blocks, and the records they hold, that passed
+        through the writer
+
+        Returns
+        -------
+        Dict[str, float]
+            The number of blocks queued, written and spilled, the number
+            waiting now and at most, the same counts in records, and the time
+            `submit` spent blocked
+        """
+        with self._cond:
+            return {
+                "queued": self.n_queued,
+                "written": self.n_written,
+                "spilled": self.n_spilled,
+                "backlog": len(self._items),
+                "max_backlog": self.max_backlog,
+                "queued_records": self.n_queued_records,
+                "written_records": self.n_written_records,
+                "backlog_records": self._backlog_records,
+                "max_backlog_records": self.max_backlog_records,
+                "blocked_time": self.blocked_time,
+            }
+
+    def submit(self, data: Union[np.ndarray, List[np.ndarray]]) -> None:
+        """Queue a block of samples to be written
+
+        Parameters
+        ----------
+        data : Union[np.ndarray, List[np.ndarray]]
+            A (channels, time) array, or a list with one array per channel
+        """
+        self.raise_error()
+        n_records: int = 1 if self.records_fn is None else self.records_fn(data)
+        spill: bool = False
+        with self._cond:
+            if self._in_memory >= self.maxsize:
+                if self.policy == BackpressurePolicy.BLOCK:
+                    start: float = time.perf_counter()
+                    while self._in_memory >= self.maxsize and self.error is None:
+                        self._cond.wait()
+                    self.blocked_time += time.perf_counter() - start
+                    self.raise_error()
+                elif self.policy == BackpressurePolicy.SPILL:
+                    # Keeps the writer from reusing the spill file meanwhile
+                    self._spill_pending += 1
+                    spill = True
+            if not spill:
+                self._enqueue(self._copy(data), n_records)
+                self._in_memory += 1
+                return
+
+        # Write to disk without holding the lock, so the writer thread is not
+        # held up by the spill
+        try:
+            block: SpilledBlock = self._spill_block(data)
+        except BaseException:
+            with self._cond:
+                self._spill_pending -= 1
+            raise
+        with self._cond:
+            self._enqueue(block, n_records)
+            self.n_spilled += 1
+
+    def _copy(self, data: Union[np.ndarray, List[np.ndarray]]) -> Any:
+        if not isinstance(data, np.ndarray):
+            return [np.array(d) for d in data]
+
+        key: Tuple = (data.shape, data.dtype.str)
+        free: List[np.ndarray] = self._pool.get(key, [])
+        copy: np.ndarray = free.pop() if len(free) > 0 else np.empty_like(data)
+        np.copyto(copy, data)
+        return copy
+
+    def _enqueue(self, item: Any, n_records: int) -> None:
+        self._items.append((item, n_records))
+        self.n_queued += 1
+        self.n_queued_records += n_records
+        self._backlog_records += n_records
+        self.max_backlog = max(self.max_backlog, len(self._items))
+        self.max_backlog_records = max(self.max_backlog_records, self._backlog_records)
+        self._cond.notify_all()
+
+    def _load(self, block: SpilledBlock) -> Any:
+        """Read a spilled block back from the spill file"""
+        spill: IO[bytes] = cast(IO[bytes], self._spill)
+        arrays: List[np.ndarray] = []
+        with self._spill_lock:
+            for offset, shape, dtype in block.layout:
+                spill.seek(offset)
+                raw: bytes = spill.read(int(np.prod(shape)) * dtype.itemsize)
+                arrays.append(np.frombuffer(raw, dtype=dtype).reshape(shape))
+        return arrays if block.is_list else arrays[0]
+
+    def _release(self, item: Any) -> None:
+        """Return the arrays of a written block to the pool"""
+        if isinstance(item, np.ndarray):
+            self._pool.setdefault((item.shape, item.dtype.str), []).append(item)
+
+    def _spill_block(self, data: Union[np.ndarray, List[np.ndarray]]) -> SpilledBlock:
+        """Append a block to the spill file"""
+        arrays: List[np.ndarray] = data if isinstance(data, list) else [data]
+        layout: List[Tuple[int, Tuple, np.dtype]] = []
+        with self._spill_lock:
+            if self._spill is None:
+                self._spill = tempfile.TemporaryFile(suffix=".raw", dir=self.spill_dir)
+            for array in arrays:
+                raw: bytes = np.ascontiguousarray(array).tobytes()
+                self._spill.seek(self._spill_size)
+                self._spill.write(raw)
+                layout.append((self._spill_size, array.shape, array.dtype))
+                self._spill_size += len(raw)
+        return SpilledBlock(layout, isinstance(data, list))
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._cond:
+                while len(self._items) == 0 and not self._closing:
+                    self._cond.wait()
+                if len(self._items) == 0:
+                    return
+                item: Any
+                n_records: int
+                item, n_records = self._items.popleft()
+                self._writing = True
+
+            try:
+                spilled: bool = isinstance(item, SpilledBlock)
+                self.write_fn(self._load(item) if spilled else item)
+            except BaseException as e:
+                with self._cond:
+                    self.error = e
+                    self._writing = False
+                    self._items.clear()
+                    self._backlog_records = 0
+                    self._cond.notify_all()
+                return
+
+            with self._cond:
+                self.n_written += 1
+                self.n_written_records += n_records
+                self._backlog_records -= n_records
+                self._writing = False
+                if spilled:
+                    self._spill_pending -= 1
+                    if self._spill_pending == 0:
+                        # Nothing left to read back, so reuse the file
+                        self._spill_size = 0
+                else:
+                    self._in_memory -= 1
+                    self._release(item)
+                self._cond.notify_all()
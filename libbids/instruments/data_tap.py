@@ -0,0 +1,485 @@
+import os
+import socket
+import struct
+import threading
+import numpy as np  # type: ignore
+
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Tuple, Union, cast
+
+from ..enums import TapPolicy
+
+# A frame sent to socket subscribers starts with the magic bytes, the sample
+# index, the timestamp and the number of arrays in the block. Each array
+# follows as its type, its shape and its samples in C order. A 2D block is a
+# single (channels, time) array, while a block with a list of channels of
+# different rates has one array per channel, with 0 rows
+FRAME_MAGIC: bytes = b"LBTP"
+FRAME_HEADER: struct.Struct = struct.Struct("<4sqdI")
+ARRAY_HEADER: struct.Struct = struct.Struct("<4sII")
+
+
+class TapBlock:
+    def __init__(
+        self,
+        samples: Union[np.ndarray, List[np.ndarray]],
+        sample_index: int,
+        timestamp: float,
+    ):
+        """A block of samples published by a data tap. The samples are shared
+        by every subscriber, so they are read only
+
+        Parameters
+        ----------
+        samples : Union[np.ndarray, List[np.ndarray]]
+            A (channels, time) array, or a list with one array per channel
+        sample_index : int
+            The index within the run of the block's first sample
+        timestamp : float
+            When the block was read, on the instrument's monotonic clock
+        """
+        self.samples: Union[np.ndarray, List[np.ndarray]] = samples
+        self.sample_index: int = sample_index
+        self.timestamp: float = timestamp
+        self._frame: Optional[bytes] = None
+
+    @classmethod
+    def from_frame(cls, header: bytes, read: Callable[[int], bytes]) -> "TapBlock":
+        """Decode a block sent to a socket subscriber
+
+        Parameters
+        ----------
+        header : bytes
+            The frame header
+        read : Callable[[int], bytes]
+            Reads exactly the given number of bytes of the rest of the frame
+        """
+        magic, sample_index, timestamp, n_arrays = FRAME_HEADER.unpack(header)
+        if magic != FRAME_MAGIC:
+            raise Exception("Not a data tap frame")
+        arrays: List[np.ndarray] = []
+        for _ in range(n_arrays):
+            dtype, rows, cols = ARRAY_HEADER.unpack(read(ARRAY_HEADER.size))
+            dt: np.dtype = np.dtype(dtype.rstrip(b"\0").decode("ascii"))
+            shape: Tuple = (rows, cols) if rows > 0 else (cols,)
+            raw: bytes = read(int(np.prod(shape)) * dt.itemsize)
+            arrays.append(np.frombuffer(raw, dtype=dt).reshape(shape))
+        is_list: bool = len(arrays) != 1 or arrays[0].ndim == 1
+        return cls(arrays if is_list else arrays[0], sample_index, timestamp)
+
+    @property
+    def frame(self) -> bytes:
+        """The block encoded for socket subscribers, encoded once and shared"""
+        if self._frame is None:
+            arrays: List[np.ndarray] = (
+                self.samples if isinstance(self.samples, list) else [self.samples]
+            )
+            parts: List[bytes] = [
+                FRAME_HEADER.pack(
+                    FRAME_MAGIC, self.sample_index, self.timestamp, len(arrays)
+                )
+            ]
+            for array in arrays:
+                rows: int = array.shape[0] if array.ndim == 2 else 0
+                parts.append(
+                    ARRAY_HEADER.pack(
+                        array.dtype.str.encode("ascii"), rows, array.shape[-1]
+                    )
+                )
+                parts.append(np.ascontiguousarray(array).tobytes())
+            self._frame = b"".join(parts)
+        return self._frame
+
+    @property
+    def n_samples(self) -> int:
+        return np.shape(self.samples[0])[-1]
+
+
+class TapSubscriber:
+    def __init__(
+        self,
+        callback: Callable[[TapBlock], None],
+        queue_size: int = 16,
+        policy: Union[TapPolicy, str] = TapPolicy.DROP,
+        max_decimation: int = 64,
+        name: str = "",
+        on_close: Optional[Callable[[], None]] = None,
+    ):
+        """A subscriber to a data tap. Blocks are queued without waiting and
+        handed to the callback from the subscriber's own thread, so a slow
+        subscriber never delays the instrument that publishes them
+
+        Parameters
+        ----------
+        callback : Callable[[TapBlock], None]
+            Receives each block delivered to the subscriber
+        queue_size : int
+            The number of blocks that may wait to be delivered
+        policy : Union[TapPolicy, str]
+            What happens to a block published while `queue_size` blocks are
+            waiting. DROP discards the oldest waiting block. DECIMATE also
+            discards it and then only delivers every other block, halving
+            the rate again each time the queue fills, up to `max_decimation`,
+            and doubling it each time the subscriber catches up. DISCONNECT
+            unsubscribes the subscriber
+        max_decimation : int
+            The largest number of blocks of which DECIMATE delivers one
+        name : str
+            The subscriber's name in the tap's stats
+        on_close : Optional[Callable[[], None]]
+            Called from the subscriber's thread once it stops delivering blocks
+        """
+        self.callback: Callable[[TapBlock], None] = callback
+        self.queue_size: int = queue_size
+        self.policy: TapPolicy = (
+            policy
+            if isinstance(policy, TapPolicy)
+            else cast(TapPolicy, TapPolicy._member_map_[policy])
+        )
+        self.max_decimation: int = max_decimation
+        self.name: str = name
+        self.on_close: Optional[Callable[[], None]] = on_close
+        self.decimation: int = 1
+        self.connected: bool = True
+        self.error: Optional[BaseException] = None
+
+        self.n_offered: int = 0
+        self.n_delivered: int = 0
+        self.n_dropped: int = 0
+        self.n_skipped: int = 0
+
+        self._items: Deque[TapBlock] = deque()
+        self._closing: bool = False
+        self._cond: threading.Condition = threading.Condition()
+        self._thread: threading.Thread = threading.Thread(
+            target=self._deliver_loop, daemon=True
+        )
+        self._thread.start()
+
+    def close(self) -> None:
+        """Deliver the blocks already queued and stop the subscriber's thread"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        if threading.current_thread() is not self._thread:
+            self._thread.join()
+
+    def disconnect(self) -> None:
+        """Stop the subscriber's thread, discarding the blocks still queued"""
+        with self._cond:
+            self.connected = False
+            self._items.clear()
+            self._cond.notify_all()
+
+    def offer(self, block: TapBlock) -> bool:
+        """Queue a block for delivery without waiting
+
+        Parameters
+        ----------
+        block : TapBlock
+            The published block
+
+        Returns
+        -------
+        bool
+            Whether the subscriber is still subscribed
+        """
+        with self._cond:
+            if not self.connected or self._closing:
+                return False
+            self.n_offered += 1
+            if self.policy == TapPolicy.DECIMATE:
+                if len(self._items) == 0 and self.decimation > 1:
+                    self.decimation //= 2
+                if self.n_offered % self.decimation != 0:
+                    self.n_skipped += 1
+                    return True
+            if len(self._items) >= self.queue_size:
+                if self.policy == TapPolicy.DISCONNECT:
+                    self.connected = False
+                    self._items.clear()
+                    self._cond.notify_all()
+                    return False
+                self._items.popleft()
+                self.n_dropped += 1
+                if self.policy == TapPolicy.DECIMATE:
+                    self.decimation = min(self.decimation * 2, self.max_decimation)
+            self._items.append(block)
+            self._cond.notify_all()
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "offered": self.n_offered,
+            "delivered": self.n_delivered,
+            "dropped": self.n_dropped,
+            "skipped": self.n_skipped,
+            "backlog": len(self._items),
+            "decimation": self.decimation,
+        }
+
+    def _deliver_loop(self) -> None:
+        while True:
+            with self._cond:
+                while len(self._items) == 0 and self.connected and not self._closing:
+                    self._cond.wait()
+                if len(self._items) == 0:
+                    break
+                block: TapBlock = self._items.popleft()
+
+            try:
+                self.callback(block)
+            except BaseException as e:
+                self.error = e
+                self.disconnect()
+                break
+
+            with self._cond:
+                self.n_delivered += 1
+
+        self.connected = False
+        if self.on_close is not None:
+            self.on_close()
+
+
+class DataTap:
+    def __init__(
+        self,
+        queue_size: int = 16,
+        policy: Union[TapPolicy, str] = TapPolicy.DROP,
+        poll_timeout: float = 0.1,
+        send_timeout: float = 1.0,
+    ):
+        """Fans out every block an instrument reads from its device to
+        subscribers in this process and, once `listen` is called, to
+        subscribers in other processes over a Unix socket. Attach it to an
+        instrument with `instrument.tap = DataTap()`. Publishing copies the
+        block once and never waits for a subscriber
+
+        Parameters
+        ----------
+        queue_size : int
+            The default number of blocks that may wait for each subscriber
+        policy : Union[TapPolicy, str]
+            The default policy for subscribers that fall behind
+        poll_timeout : float
+            The maximum time in seconds the socket listener waits before
+            checking whether the tap is closing
+        send_timeout : float
+            How long in seconds a socket subscriber may take to accept a block
+            before it is disconnected
+        """
+        self.queue_size: int = queue_size
+        self.policy: Union[TapPolicy, str] = policy
+        self.poll_timeout: float = poll_timeout
+        self.send_timeout: float = send_timeout
+        self.n_samples: int = 0
+        self.n_blocks: int = 0
+        self.subscribers: Tuple[TapSubscriber, ...] = ()
+        self.socket_path: Optional[Path] = None
+
+        self._lock: threading.Lock = threading.Lock()
+        self._n_connections: int = 0
+        self._server: Optional[socket.socket] = None
+        self._listener: Optional[threading.Thread] = None
+        self._closing: threading.Event = threading.Event()
+
+    def close(self) -> None:
+        """Stop listening and close every subscriber"""
+        self._closing.set()
+        if self._listener is not None:
+            self._listener.join()
+            self._listener = None
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            os.unlink(cast(Path, self.socket_path))
+        with self._lock:
+            subscribers: Tuple[TapSubscriber, ...] = self.subscribers
+            self.subscribers = ()
+        for subscriber in subscribers:
+            subscriber.close()
+
+    def listen(self, path: Union[str, Path]) -> None:
+        """Accept subscribers from other processes on a Unix socket. Each
+        connection is sent every block as a frame that `TapClient` decodes
+
+        Parameters
+        ----------
+        path : Union[str, Path]
+            The path of the socket, which must not exist
+        """
+        assert self._server is None, "The tap is already listening"
+        self.socket_path = Path(path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(str(self.socket_path))
+        self._server.listen()
+        self._server.settimeout(self.poll_timeout)
+        self._closing.clear()
+        self._listener = threading.Thread(target=self._accept_loop, daemon=True)
+        self._listener.start()
+
+    def publish(
+        self, samples: Union[np.ndarray, List[np.ndarray]], timestamp: float
+    ) -> None:
+        """Send a block of samples to every subscriber
+
+        Parameters
+        ----------
+        samples : Union[np.ndarray, List[np.ndarray]]
+            A (channels, time) array, or a list with one array per channel.
+            It is copied, so it may be a view into a buffer that is reused
+        timestamp : float
+            When the block was read
+        """
+        sample_index: int = self.n_samples
+        self.n_samples += np.shape(samples[0])[-1]
+        self.n_blocks += 1
+        subscribers: Tuple[TapSubscriber, ...] = self.subscribers
+        if len(subscribers) == 0:
+            return
+
+        block: TapBlock = TapBlock(self._copy(samples), sample_index, timestamp)
+        gone: List[TapSubscriber] = [s for s in subscribers if not s.offer(block)]
+        if len(gone) > 0:
+            with self._lock:
+                self.subscribers = tuple(s for s in self.subscribers if s not in gone)
+
+    def reset(self) -> None:
+        """Count samples from zero again, at the start of a run"""
+        self.n_samples = 0
+        self.n_blocks = 0
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """The delivery counters of each subscriber, keyed by its name"""
+        return {s.name: s.stats() for s in self.subscribers}
+
+    def subscribe(
+        self,
+        callback: Callable[[TapBlock], None],
+        queue_size: Optional[int] = None,
+        policy: Optional[Union[TapPolicy, str]] = None,
+        name: str = "",
+        on_close: Optional[Callable[[], None]] = None,
+    ) -> TapSubscriber:
+        """Deliver every block published from now on to a callback, which is
+        called from a thread of its own
+
+        Parameters
+        ----------
+        callback : Callable[[TapBlock], None]
+            Receives each block
+        queue_size : Optional[int]
+            The number of blocks that may wait for the callback. Defaults to
+            the tap's `queue_size`
+        policy : Optional[Union[TapPolicy, str]]
+            What to do when the callback falls behind. Defaults to the tap's
+            `policy`
+        name : str
+            The subscriber's name in `stats`. Defaults to its position
+        on_close : Optional[Callable[[], None]]
+            Called once the subscriber stops receiving blocks
+
+        Returns
+        -------
+        TapSubscriber
+            The subscriber, which can be passed to `unsubscribe`
+        """
+        with self._lock:
+            subscriber: TapSubscriber = TapSubscriber(
+                callback,
+                self.queue_size if queue_size is None else queue_size,
+                self.policy if policy is None else policy,
+                name=name or f"subscriber-{len(self.subscribers)}",
+                on_close=on_close,
+            )
+            self.subscribers = self.subscribers + (subscriber,)
+        return subscriber
+
+    def unsubscribe(self, subscriber: TapSubscriber) -> None:
+        """Stop delivering blocks to a subscriber once it has received those
+        already queued for it"""
+        with self._lock:
+            self.subscribers = tuple(s for s in self.subscribers if s is not subscriber)
+        subscriber.close()
+
+    def _accept_loop(self) -> None:
+        server: socket.socket = cast(socket.socket, self._server)
+        while not self._closing.is_set():
+            try:
+                connection, _ = server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            connection.settimeout(self.send_timeout)
+            self._n_connections += 1
+            self.subscribe(
+                lambda block, c=connection: c.sendall(block.frame),
+                name=f"socket-{self._n_connections}",
+                on_close=connection.close,
+            )
+
+    def _copy(
+        self, samples: Union[np.ndarray, List[np.ndarray]]
+    ) -> Union[np.ndarray, List[np.ndarray]]:
+        """Copy a block into read only arrays the subscribers may share"""
+        arrays: List[np.ndarray] = (
+            [np.array(s) for s in samples]
+            if isinstance(samples, list)
+            else [np.array(samples)]
+        )
+        for array in arrays:
+            array.flags.writeable = False
+        return arrays if isinstance(samples, list) else arrays[0]
+
+
+class TapClient:
+    def __init__(self, path: Union[str, Path]):
+        """Receives the blocks a `DataTap` publishes on a Unix socket, in
+        another process
+
+        Parameters
+        ----------
+        path : Union[str, Path]
+            The path of the socket the tap listens on
+        """
+        self.path: Path = Path(path)
+        self.socket: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(str(self.path))
+
+    def __iter__(self):
+        while True:
+            block: Optional[TapBlock] = self.read()
+            if block is None:
+                return
+            yield block
+
+    def close(self) -> None:
+        self.socket.close()
+
+    def read(self) -> Optional[TapBlock]:
+        """Wait for the next block
+
+        Returns
+        -------
+        Optional[TapBlock]
+            The block, or None once the tap has closed the connection
+        """
+        try:
+            header: bytes = self._read_exactly(FRAME_HEADER.size)
+        except EOFError:
+            return None
+        return TapBlock.from_frame(header, self._read_exactly)
+
+    def _read_exactly(self, n: int) -> bytes:
+        data: bytearray = bytearray(n)
+        view: memoryview = memoryview(data)
+        received: int = 0
+        while received < n:
+            count: int = self.socket.recv_into(view[received:])
+            if count == 0:
+                raise EOFError("The data tap closed the connection")
+            received += count
+        return bytes(data)
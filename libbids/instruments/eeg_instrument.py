@@ -1,20 +1,34 @@
+import copy
+import json
+import time
 import numpy as np  # type: ignore
 
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from pyedflib import EdfWriter  # type: ignore
+from pathlib import Path
 from typing import (
     Any,
     Callable,
+    Deque,
     Dict,
     List,
+    Optional,
+    Sequence,
     Tuple,
     TYPE_CHECKING,
     Union,
     cast,
 )
 
+from .background_writer import BackgroundWriter
+from .quality import SignalQualityMonitor
 from .read_instrument import ReadInstrument
-from ..enums import Modality
+from .ring_buffer import MultiRateRingBuffer, RingBuffer
+from .spool import Spool, SpoolInfo, convert_spool
+from .storage import StorageBackend, storage_backend
+from ..enums import BackpressurePolicy, Modality, StorageFormat
+from ..wait import WaitStrategy
 
 if TYPE_CHECKING:
     from ..session import Session  # type: ignore
@@ -37,6 +51,15 @@ class EEGInstrument(ReadInstrument):
         read_fn: Union[Tuple[str, list, Dict], Callable] = lambda: None,
         stop_fn: Union[Tuple[str, list, Dict], Callable] = lambda: None,
         is_digital: bool = False,
+        buffer_records: int = 4,
+        wait_strategy: Optional[WaitStrategy] = None,
+        writer_queue_size: Optional[int] = None,
+        writer_policy: Union[BackpressurePolicy, str] = BackpressurePolicy.BLOCK,
+        read_into_fn: Optional[Union[Tuple[str, list, Dict], Callable]] = None,
+        dtype: Optional[Union[np.dtype, str, type]] = None,
+        digital_lim: Optional[Tuple] = None,
+        storage: Union[StorageBackend, StorageFormat, str] = StorageFormat.EDF,
+        spool_duration: Optional[float] = None,
         **kwargs
     ):
         """Initialize a device for collecting electroecephalograms
@@ -75,17 +98,66 @@ class EEGInstrument(ReadInstrument):
         is_digital : bool
             Whether the data recorded from the device is in a digital format or
             a physical floating point integer (e.g., µV)
+        buffer_records : int
+            The number of data records the sample buffer can hold before they
+            must be written to the edf file
+        wait_strategy : Optional[WaitStrategy]
+            How to wait for the device to have new data before it is read, for
+            example when read by a threaded acquisition engine
+        writer_queue_size : Optional[int]
+            If supplied, data records are written to the edf file by a
+            `BackgroundWriter` thread that holds up to this many blocks of
+            records in memory. By default records are written as they complete
+        writer_policy : Union[BackpressurePolicy, str]
+            What the background writer does when its queue is full
+        read_into_fn : Optional[Union[Tuple[str, List, Dict], Callable]]
+            Similar to `read_fn`, but the function is given a writable
+            (channels, time) array as its first argument, reads new samples
+            from the device into its leading columns and returns the number of
+            samples read. When supplied, samples are read straight into the
+            record buffer instead of allocating a new array for every block,
+            and `read` returns a view into the buffer that is valid until the
+            next read. Only supported when all channels share a sampling rate
+        dtype : Optional[Union[np.dtype, str, type]]
+            The data type of the samples read from the device. Samples are
+            buffered in this type, so it should match what the device returns.
+            Defaults to int32 when `is_digital` is true and float64 otherwise.
+            Digital samples of type int16 or int32 are written to the edf file
+            without conversion
+        digital_lim : Optional[Tuple]
+            The limits of the digital values, which together with
+            `physical_lim` declare the scaling between digital and physical
+            values in the file header. Defaults to the full range of the
+            storage format
+        storage : Union[StorageBackend, StorageFormat, str]
+            The format the recording is stored in, or a backend that writes
+            it. EDF by default, or BDF for 24 bit samples, or BrainVision,
+            which has no data record constraint and takes samples of a single
+            sampling rate as they are read
+        spool_duration : Optional[float]
+            If supplied, the run is recorded to a raw `Spool` preallocated this
+            many seconds at a time, and converted to `storage` in the
+            background once the run stops. Reading then only copies each block
+            into the spool, or with `read_into_fn` reads it straight into the
+            spool. Only supported when all channels share a sampling rate. Wait
+            for the conversions with `finish_conversions`
         kwargs : Dict
             This keyword arguments dictionary is used to supply detailes to the
             edf file header. <See
             https://pyedflib.readthedocs.io/en/latest/_modules/pyedflib/edfwriter.html#EdfWriter.setHeader>
         """
-        super(EEGInstrument, self).__init__(session, Modality.EEG, file_ext="edf")
+        self.storage: StorageBackend = storage_backend(storage)
+        super(EEGInstrument, self).__init__(
+            session, Modality.EEG, file_ext=self.storage.file_ext
+        )
         self.sfreqs: List[int] = sfreq if isinstance(sfreq, List) else [sfreq]
         assert len(electrodes) > 1, "Must supply electrodes"
         assert len(self.sfreqs) == 1 or len(self.sfreqs) == len(
             electrodes
         ), "Must supply same number of sampling rates as electrodes"
+        assert (
+            self.storage.multirate or len(self.sfreqs) == 1
+        ), "The storage format requires a single sampling rate"
         self.device: Any = device
         self.electrodes: List[str] = electrodes
         self.physical_dimension: str = physical_dimension
@@ -96,13 +168,68 @@ class EEGInstrument(ReadInstrument):
         self.read_fn: Union[Tuple[str, List, Dict], Callable] = read_fn
         self.stop_fn: Union[Tuple[str, List, Dict], Callable] = stop_fn
         self.is_digital: bool = is_digital
+        self.buffer_records: int = buffer_records
+        self.wait_strategy: Optional[WaitStrategy] = wait_strategy
+        self.writer_queue_size: Optional[int] = writer_queue_size
+        self.writer_policy: Union[BackpressurePolicy, str] = writer_policy
+        self.read_into_fn: Optional[Union[Tuple[str, List, Dict], Callable]] = (
+            read_into_fn
+        )
+        assert (
+            read_into_fn is None or len(self.sfreqs) == 1
+        ), "Reading into the buffer requires a single sampling rate"
+        self.dtype: np.dtype = np.dtype(
+            dtype if dtype is not None else np.int32 if is_digital else np.float64
+        )
+        assert not is_digital or np.issubdtype(
+            self.dtype, np.integer
+        ), "Digital samples must have an integer type"
+        self.digital_lim: Tuple = (
+            digital_lim
+            if digital_lim is not None
+            else self.storage.default_digital_lim(self.dtype)
+        )
+        self.spool_duration: Optional[float] = spool_duration
+        assert (
+            spool_duration is None or len(self.sfreqs) == 1
+        ), "Spooling requires a single sampling rate"
+        self.spool: Optional[Spool] = None
+        # Converts the spools of stopped runs, one at a time
+        self.converter: Optional[ThreadPoolExecutor] = None
+        self.conversions: List[Future] = []
+        self.background_writer: Optional[BackgroundWriter] = None
+        # Annotations waiting for the next data record to be written
+        self.pending_annotations: Deque[Tuple[float, float, str]] = deque()
         self.modality_path.mkdir(exist_ok=True)
         self.metadata: Dict = self._fixup_edf_metadata(kwargs)
-        self.buffer: np.ndarray
-        self.buffers: List[np.ndarray] = [np.array([]) for i in range(len(self.sfreqs))]
+        self.buffer: RingBuffer
+        self.buffers: MultiRateRingBuffer
 
-    def annotate(self, onset: float, duration: float, description: str):
-        assert self.writer.writeAnnotation(onset, duration, description) == 0
+    def annotate(
+        self, onset: float, duration: float, description: str, deferred: bool = False
+    ):
+        """Add an annotation to the recording
+
+        Parameters
+        ----------
+        onset : float
+            The time of the annotation in seconds from the start of the run
+        duration : float
+            The duration of the annotation in seconds
+        description : str
+            The text of the annotation
+        deferred : bool
+            Whether to only queue the annotation, so that it is added with any
+            others queued just before the next data record is written, or
+            when the run stops. Queueing is safe from any thread
+        """
+        if deferred:
+            self.pending_annotations.append((onset, duration, description))
+            return
+        if self.spool is not None:
+            self.spool.annotate(onset, duration, description)
+            return
+        self.storage.annotate(onset, duration, description)
 
     def device_init_read(self):
         """Initializes reading on the device"""
@@ -122,11 +249,59 @@ class EEGInstrument(ReadInstrument):
         List
             If not all channels share the same sampling rate
         """
+        if self.read_into_fn is not None:
+            # Without a buffer to read into, read into a new array
+            out: np.ndarray = np.empty(
+                (len(self.electrodes), int(self.sfreqs[0] * self.record_duration)),
+                dtype=self.dtype,
+            )
+            return out[:, : self.device_read_into(out)]
+
+        samples: Union[np.ndarray, List]
+        start: float = time.perf_counter() if self.read_latency is not None else 0.0
         if isinstance(self.read_fn, Callable):  # type: ignore
-            return cast(Callable, self.read_fn)()
+            samples = cast(Callable, self.read_fn)()
+        else:
+            fn, args, kwargs = cast(Tuple, self.read_fn)
+            samples = self.device.__getattribute__(fn)(*args, **kwargs)
+        if self.read_latency is not None:
+            self.read_latency.record(time.perf_counter() - start)
+        if samples is None or len(samples) == 0:
+            # A non-blocking read that found no new samples
+            samples = self._join_blocks([])
 
-        fn, args, kwargs = cast(Tuple, self.read_fn)
-        return self.device.__getattribute__(fn)(*args, **kwargs)
+        if self.wait_strategy is not None:
+            self.wait_strategy.observe(np.shape(samples[0])[-1])
+        self.publish(samples)
+        return samples
+
+    def device_read_into(self, out: np.ndarray) -> int:
+        """Read new samples from the device into an array
+
+        Parameters
+        ----------
+        out : np.ndarray
+            A writable (channels, time) array to read samples into
+
+        Returns
+        -------
+        int
+            The number of samples read into the leading columns of `out`
+        """
+        start: float = time.perf_counter() if self.read_latency is not None else 0.0
+        n: int
+        if isinstance(self.read_into_fn, Callable):  # type: ignore
+            n = cast(Callable, self.read_into_fn)(out)
+        else:
+            fn, args, kwargs = cast(Tuple, self.read_into_fn)
+            n = self.device.__getattribute__(fn)(out, *args, **kwargs)
+        if self.read_latency is not None:
+            self.read_latency.record(time.perf_counter() - start)
+
+        if self.wait_strategy is not None:
+            self.wait_strategy.observe(n)
+        self.publish(out[:, :n])
+        return n
 
     def device_stop(self) -> None:
         """Stop the device"""
@@ -136,9 +311,68 @@ class EEGInstrument(ReadInstrument):
         fn, args, kwargs = cast(Tuple, self.stop_fn)
         return self.device.__getattribute__(fn)(*args, **kwargs)
 
+    def drain(self) -> None:
+        """Wait until every completed data record is written to the edf file
+        and processed by the instrument's pipeline"""
+        super().drain()
+        if self.background_writer is not None:
+            self.background_writer.drain()
+
+    def finish_conversions(self) -> List[Path]:
+        """Wait until the spools of every stopped run are converted
+
+        Returns
+        -------
+        List[Path]
+            The files converted since the last call, in the order their runs
+            stopped
+        """
+        conversions: List[Future] = self.conversions
+        self.conversions = []
+        # Wait for every conversion before raising the first error
+        errors: List[BaseException] = [
+            e for e in (f.exception() for f in conversions) if e is not None
+        ]
+        if len(errors) > 0:
+            raise errors[0]
+        return [f.result() for f in conversions]
+
     def flush(self) -> None:
-        """Read data from the device simply to discard"""
-        self.device_read()
+        """Read data from the device simply to discard. The samples are not
+        published to the instrument's tap, shared ring, previews, pipeline or
+        clock trace, as they are not part of the run"""
+        self.publishing = False
+        try:
+            self.device_read()
+        finally:
+            self.publishing = True
+
+    def monitor_quality(
+        self, line_freqs: Sequence[float] = (50.0, 60.0), flat_threshold: float = 0.0
+    ) -> SignalQualityMonitor:
+        """Measure the quality of every channel on each data record stored:
+        its RMS, the fraction of samples clipped at the limits, whether it is
+        flat and the power of line noise. The monitor's `live` array holds the
+        measures of the last record, and a summary of each run is written to
+        `quality_path`, in the dataset's derivatives, when the run stops
+
+        Parameters
+        ----------
+        line_freqs : Sequence[float]
+            The frequencies whose power is measured
+        flat_threshold : float
+            A channel is flat in a record when the difference between its
+            largest and smallest values is at most this, in physical units
+
+        Returns
+        -------
+        SignalQualityMonitor
+            The monitor
+        """
+        self.quality = SignalQualityMonitor.for_instrument(
+            self, line_freqs, flat_threshold
+        )
+        return self.quality
 
     def read(self, remainder: bool = False) -> Union[List, np.ndarray]:
         """Read data from the headset and return the data
@@ -154,50 +388,20 @@ class EEGInstrument(ReadInstrument):
         np.ndarray
             A 2D array of data in the shape of (channels, time)
         """
-        if len(self.sfreqs) == 1:
-            sfreq: int = self.sfreqs[0]
-            period: int = int(sfreq * self.record_duration)
-            samples: np.ndarray = cast(np.ndarray, self.device_read())
-            self.buffer = np.c_[self.buffer, samples]
-            if (not remainder) and (self.buffer.shape[1] >= period):
-                n_periods: int = self.buffer.shape[1] // period
-                period_boundary: int = n_periods * period
-                writebuf: np.ndarray = self.buffer[:, :period_boundary]
-                self.buffer = self.buffer[:, period_boundary:]
-                self.writer.writeSamples(
-                    np.ascontiguousarray(writebuf), digital=self.is_digital
-                )
-            elif remainder and (self.buffer.shape[1] > 0):
-                writebuf = self.buffer
-                self.writer.writeSamples(
-                    np.ascontiguousarray(writebuf), digital=self.is_digital
-                )
-            return samples
-        else:
-            periods: List[int] = [int(f * self.record_duration) for f in self.sfreqs]
-            ch_samples: List = cast(List, self.device_read())
-            assert len(ch_samples) == len(
-                self.sfreqs
-            ), "Data must be the same length as the number sfreqs"
-            self.buffers = [np.r_[i, j] for i, j in zip(self.buffers, ch_samples)]
-            period_met: np.bool_ = np.all(
-                [i.shape[0] >= j for i, j in zip(self.buffers, periods)]
-            )
-            has_data: np.bool_ = np.any([i.shape[0] > 0 for i in self.buffers])
-            if (not remainder) and period_met:
-                n_periodss: List[int] = [
-                    i.shape[0] // j for i, j in zip(self.buffers, periods)
-                ]
-                period_boundaries: List = [i * j for i, j in zip(n_periodss, periods)]
-                writebufs: List = [
-                    i[:j] for i, j in zip(self.buffers, period_boundaries)
-                ]
-                self.buffers = [i[j:] for i, j in zip(self.buffers, period_boundaries)]
-                self.writer.writeSamples(writebufs, digital=self.is_digital)
-            elif remainder and has_data:
-                writebufs = self.buffers
-                self.writer.writeSamples(writebufs, digital=self.is_digital)
-            return ch_samples
+        if self.acquisition is not None:
+            return self._join_blocks(self.acquisition.collect(self))
+
+        if self.spool is not None and self.read_into_fn is not None:
+            return self._read_into_spool()
+
+        if self.read_into_fn is not None:
+            buffered: np.ndarray = self._read_into_buffer()
+            self._write_records(partial=remainder or not self.storage.record_aligned)
+            return buffered
+
+        samples: Union[List, np.ndarray] = self.device_read()
+        self.store(samples, remainder)
+        return samples
 
     def start(self, task: str, run_id: str):
         """Begin recording a run
@@ -210,17 +414,126 @@ class EEGInstrument(ReadInstrument):
             The id of the run that will be appended to the file
         """
         super().start(task, run_id)
+        self.start_streams()
+        if self.spool_duration is not None:
+            self.spool = Spool(
+                self.spool_path, SpoolInfo.from_instrument(self), self.spool_duration
+            )
+            with self.synchronized_start():
+                self.spool.set_start(datetime.now())
+                self.device_init_read()
+            self.spool.write_info()
+            return
+
         n_electrodes: int = len(self.electrodes)
-        self._initialize_edf_file()
-        self.buffer = np.empty(shape=(n_electrodes, 0))
-        self.writer.setStartdatetime(datetime.now())
-        self.device_init_read()
+        self.storage.open(self.filepath, self)
+        if len(self.sfreqs) == 1:
+            record_size: int = int(self.sfreqs[0] * self.record_duration)
+            self.buffer = RingBuffer(
+                n_electrodes, record_size, self.buffer_records, self.dtype
+            )
+        else:
+            self.buffers = MultiRateRingBuffer(
+                self.sfreqs, self.record_duration, self.buffer_records, self.dtype
+            )
+        if self.writer_queue_size is not None:
+            self.background_writer = BackgroundWriter(
+                self._write_samples,
+                self.writer_queue_size,
+                self.writer_policy,
+                self.modality_path,
+                self._count_records,
+            )
+        with self.synchronized_start():
+            self.storage.set_start(datetime.now())
+            self.device_init_read()
 
     def stop(self):
         """Stop the run"""
+        quality_path: Path = self.quality_path
         super().stop()
         self.device_stop()
-        self.writer.close()
+        self.stop_streams()
+        if self.spool is not None:
+            self._commit_annotations()
+            self.spool.close()
+            if self.converter is None:
+                self.converter = ThreadPoolExecutor(max_workers=1)
+            # The conversion gets its own backend, as the next run may open
+            # the instrument's before it finishes
+            self.conversions.append(
+                self.converter.submit(
+                    convert_spool, self.spool.path, copy.copy(self.storage)
+                )
+            )
+            self.spool = None
+        else:
+            if self.background_writer is not None:
+                self.background_writer.close()
+                self.background_writer = None
+            self._commit_annotations()
+            self.storage.close()
+        if self.quality is not None:
+            self._write_quality(quality_path)
+
+    def store(self, samples: Union[List, np.ndarray], remainder: bool = False) -> None:
+        """Buffer samples read from the device and write any completed data
+        records to the edf file
+
+        Parameters
+        ----------
+        samples : Union[List, np.ndarray]
+            A (channels, time) array if all channels share the same sampling
+            rate, else a list with one array of samples per channel
+        remainder : bool
+            Because EDFWriter only allows full records to be written, the last
+            block of a run should be stored with remainder set to true
+        """
+        if self.spool is not None:
+            self._spool_samples(cast(np.ndarray, samples))
+            return
+        if len(self.sfreqs) == 1:
+            samples = cast(np.ndarray, samples)
+            n_samples: int = samples.shape[-1]
+            n_buffered: int = self.buffer.write(samples)
+            while n_buffered < n_samples:
+                # The block does not fit, so make room by writing full records
+                self._write_records()
+                n_buffered += self.buffer.write(samples, n_buffered)
+            self._write_records(partial=remainder or not self.storage.record_aligned)
+        else:
+            assert len(samples) == len(
+                self.sfreqs
+            ), "Data must be the same length as the number sfreqs"
+            block_sizes: np.ndarray = self.buffers.block_sizes(samples)
+            n_buffereds: np.ndarray = self.buffers.write(samples)
+            while np.any(n_buffereds < block_sizes):
+                if not self._write_multirate_records():
+                    raise Exception(
+                        "Sample buffer overrun, the device returned more samples "
+                        "than `buffer_records` can hold for one sampling rate"
+                    )
+                n_buffereds = self.buffers.write(samples, n_buffereds)
+            self._write_multirate_records(partial=remainder)
+
+    def _commit_annotations(self) -> None:
+        """Add the queued annotations to the recording in one batch"""
+        pending: Deque[Tuple[float, float, str]] = self.pending_annotations
+        if len(pending) == 0:
+            return
+        batch: List[Tuple[float, float, str]] = [
+            pending.popleft() for _ in range(len(pending))
+        ]
+        if self.spool is not None:
+            self.spool.annotate_many(batch)
+        else:
+            self.storage.annotate_many(batch)
+
+    def _count_records(self, data: Union[List, np.ndarray]) -> int:
+        """The number of data records, counting a partial one, in a block
+        written to the edf file"""
+        record_size: int = int(self.sfreqs[0] * self.record_duration)
+        return -(-np.shape(data[0])[-1] // record_size)
 
     def _fixup_edf_metadata(self, metadata: Dict):
         """A dictionary of values that will be used to store edf metadata
@@ -254,21 +567,154 @@ class EEGInstrument(ReadInstrument):
             result.update({required_key: value})
         return result
 
-    def _initialize_edf_file(self) -> None:
-        """Initialize the EDF file that will save the data collected from this
-        instrument"""
-        edf_fp: str = str(self.filepath)
-        n_electrodes: int = len(self.electrodes)
-        self.writer: EdfWriter = EdfWriter(edf_fp, n_electrodes)
-        self.writer.setHeader(self.metadata)
-        self.writer.setDatarecordDuration(self.record_duration)
-        for i, el in enumerate(self.electrodes):
-            self.writer.setLabel(i, el)
-            self.writer.setPhysicalDimension(i, self.physical_dimension)
-            self.writer.setPhysicalMaximum(i, self.physical_lim[1])
-            self.writer.setPhysicalMinimum(i, self.physical_lim[0])
-            self.writer.setSamplefrequency(
-                i, self.sfreqs[0] if len(self.sfreqs) == 1 else self.sfreqs[i]
+    def _join_blocks(self, blocks: List) -> Union[List, np.ndarray]:
+        """Join blocks of samples, in the format returned by `device_read`,
+        along time"""
+        if len(self.sfreqs) == 1:
+            if len(blocks) == 1:
+                return blocks[0]
+            return np.hstack(
+                blocks or [np.empty((len(self.electrodes), 0), dtype=self.dtype)]
+            )
+        if len(blocks) == 1:
+            return blocks[0]
+        return [
+            np.hstack([b[i] for b in blocks] or [np.empty(0, dtype=self.dtype)])
+            for i in range(len(self.sfreqs))
+        ]
+
+    def _read_into_buffer(self) -> np.ndarray:
+        """Read new samples from the device directly into the free space of
+        the record buffer, writing full records first if it has none"""
+        out: np.ndarray = self.buffer.reserve()
+        if out.shape[-1] == 0:
+            self._write_records()
+            out = self.buffer.reserve()
+        n: int = self.device_read_into(out)
+        self.buffer.commit(n)
+        return out[:, :n]
+
+    def _read_into_spool(self) -> np.ndarray:
+        """Read new samples from the device directly into the spool"""
+        spool: Spool = cast(Spool, self.spool)
+        out: np.ndarray = spool.reserve(int(self.sfreqs[0] * self.record_duration))
+        n: int = self.device_read_into(out)
+        spool.commit(n, self.clock.now())
+        self._commit_annotations()
+        if self.quality is not None:
+            self.quality.process(out[:, :n])
+        return out[:, :n]
+
+    def _spool_samples(self, samples: np.ndarray) -> None:
+        """Append samples read from the device to the spool"""
+        spool: Spool = cast(Spool, self.spool)
+        self._commit_annotations()
+        if self.quality is not None:
+            self.quality.process(samples)
+        if self.write_latency is None:
+            spool.append(samples, self.clock.now())
+            return
+        start: float = time.perf_counter()
+        spool.append(samples, self.clock.now())
+        self.write_latency.record(time.perf_counter() - start)
+
+    def _submit_samples(self, data: Union[List, np.ndarray]) -> None:
+        """Write whole data records to the edf file, through the background
+        writer if there is one"""
+        if self.background_writer is not None:
+            self.background_writer.submit(data)
+        else:
+            self._write_samples(data)
+
+    def _write_samples(self, data: Union[List, np.ndarray]) -> None:
+        # Annotations go in the records being written, so that they need no
+        # write of their own
+        self._commit_annotations()
+        if self.quality is not None:
+            self.quality.process(cast(np.ndarray, data))
+        if self.write_latency is None:
+            self.storage.write(data)
+            return
+        start: float = time.perf_counter()
+        self.storage.write(data)
+        self.write_latency.record(time.perf_counter() - start)
+
+    def _write_records(self, partial: bool = False) -> None:
+        """Write buffered data records to the edf file
+
+        Parameters
+        ----------
+        partial : bool
+            Whether to also write an incomplete trailing record. This should
+            only be done once, when the run is finished
+        """
+        for writebuf in self.buffer.pop(partial):
+            self._submit_samples(writebuf)
+
+    def _write_multirate_records(self, partial: bool = False) -> bool:
+        """Write data records buffered for channels of differing sampling
+        rates to the edf file
+
+        Parameters
+        ----------
+        partial : bool
+            Whether to also write incomplete trailing records. This should only
+            be done once, when the run is finished
+
+        Returns
+        -------
+        bool
+            Whether any data was written
+        """
+        writebufs: List[List[np.ndarray]] = self.buffers.pop(partial)
+        for writebuf in writebufs:
+            self._submit_samples(writebuf)
+        return len(writebufs) > 0
+
+    def _write_quality(self, path: Path) -> None:
+        """Write the summary of the run's quality to the dataset's
+        derivatives, describing the derivative dataset if it is new
+
+        Parameters
+        ----------
+        path : Path
+            The run's `quality_path`
+        """
+        quality: SignalQualityMonitor = cast(SignalQualityMonitor, self.quality)
+        quality.finish()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        description: Path = self.quality_root.joinpath("dataset_description.json")
+        if not description.exists():
+            description.write_text(
+                json.dumps(
+                    {
+                        "Name": "Signal quality",
+                        "BIDSVersion": "1.8.0",
+                        "DatasetType": "derivative",
+                        "GeneratedBy": [{"Name": "libbids"}],
+                    },
+                    indent=2,
+                )
+                + "\n"
             )
-            if "AUX" not in el:
-                self.writer.setPrefilter(i, self.preamp_filter)
+        quality.write(path, self.electrodes)
+
+    @property
+    def quality_root(self) -> Path:
+        """The derivative dataset holding the summaries of signal quality"""
+        return self.session.subject.path.parent.joinpath("derivatives", "quality")
+
+    @property
+    def quality_path(self) -> Path:
+        """The summary of the quality of the channels over the current run, at
+        the recording's place in the quality derivative dataset"""
+        relative: Path = self.filepath.relative_to(self.session.subject.path.parent)
+        return self.quality_root.joinpath(
+            relative.with_name(relative.stem + "_quality.tsv")
+        )
+
+    @property
+    def spool_path(self) -> Path:
+        """The directory of the spool the current run is recorded to when
+        spooling"""
+        return self.filepath.with_name(self.filepath.name + ".spool")
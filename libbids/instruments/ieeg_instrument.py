@@ -3,13 +3,18 @@ from typing import (
     Callable,
     Dict,
     List,
+    Optional,
     Tuple,
     TYPE_CHECKING,
     Union,
 )
 
+import numpy as np  # type: ignore
+
 from .eeg_instrument import EEGInstrument
-from ..enums import Modality
+from .storage import StorageBackend
+from ..enums import BackpressurePolicy, Modality, StorageFormat
+from ..wait import WaitStrategy
 
 if TYPE_CHECKING:
     from ..session import Session  # type: ignore
@@ -33,6 +38,15 @@ class IEEGInstrument(EEGInstrument):
         read_fn: Union[Tuple[str, list, Dict], Callable] = lambda: None,
         stop_fn: Union[Tuple[str, list, Dict], Callable] = lambda: None,
         is_digital: bool = False,
+        buffer_records: int = 4,
+        wait_strategy: Optional[WaitStrategy] = None,
+        writer_queue_size: Optional[int] = None,
+        writer_policy: Union[BackpressurePolicy, str] = BackpressurePolicy.BLOCK,
+        read_into_fn: Optional[Union[Tuple[str, list, Dict], Callable]] = None,
+        dtype: Optional[Union[np.dtype, str, type]] = None,
+        digital_lim: Optional[Tuple] = None,
+        storage: Union[StorageBackend, StorageFormat, str] = StorageFormat.EDF,
+        spool_duration: Optional[float] = None,
         **kwargs
     ):
         """Initialize a device for collecting electroecephalograms
@@ -70,6 +84,48 @@ class IEEGInstrument(EEGInstrument):
         is_digital : bool
             Whether the data recorded from the device is in a digital format or
             a physical floating point integer (e.g., µV)
+        buffer_records : int
+            The number of data records the sample buffer can hold before they
+            must be written to the edf file
+        wait_strategy : Optional[WaitStrategy]
+            How to wait for the device to have new data before it is read, for
+            example when read by a threaded acquisition engine
+        writer_queue_size : Optional[int]
+            If supplied, data records are written to the edf file by a
+            `BackgroundWriter` thread that holds up to this many blocks of
+            records in memory. By default records are written as they complete
+        writer_policy : Union[BackpressurePolicy, str]
+            What the background writer does when its queue is full
+        read_into_fn : Optional[Union[Tuple[str, List, Dict], Callable]]
+            Similar to `read_fn`, but the function is given a writable
+            (channels, time) array as its first argument, reads new samples
+            from the device into its leading columns and returns the number of
+            samples read. When supplied, samples are read straight into the
+            record buffer instead of allocating a new array for every block,
+            and `read` returns a view into the buffer that is valid until the
+            next read. Only supported when all channels share a sampling rate
+        dtype : Optional[Union[np.dtype, str, type]]
+            The data type of the samples read from the device. Samples are
+            buffered in this type, so it should match what the device returns.
+            Defaults to int32 when `is_digital` is true and float64 otherwise.
+            Digital samples of type int16 or int32 are written to the edf file
+            without conversion
+        digital_lim : Optional[Tuple]
+            The limits of the digital values, which together with
+            `physical_lim` declare the scaling between digital and physical
+            values in the file header. Defaults to the full range of the
+            storage format
+        storage : Union[StorageBackend, StorageFormat, str]
+            The format the recording is stored in, or a backend that writes
+            it. EDF by default, or BDF for 24 bit samples, or BrainVision,
+            which has no data record constraint and takes samples of a single
+            sampling rate as they are read
+        spool_duration : Optional[float]
+            If supplied, the run is recorded to a raw `Spool` preallocated this
+            many seconds at a time, and converted to `storage` when the run
+            stops. Reading then only copies each block into the spool, or with
+            `read_into_fn` reads it straight into the spool. Only supported
+            when all channels share a sampling rate
         kwargs : Dict
             This keyword arguments dictionary is used to supply detailes to the
             edf file header. <See
@@ -88,7 +144,18 @@ class IEEGInstrument(EEGInstrument):
             read_fn,
             stop_fn,
             is_digital,
+            buffer_records,
+            wait_strategy,
+            writer_queue_size,
+            writer_policy,
+            read_into_fn,
+            dtype,
+            digital_lim,
+            storage,
+            spool_duration,
             **kwargs
         )
-        super(EEGInstrument, self).__init__(session, Modality.iEEG, file_ext="edf")
+        super(EEGInstrument, self).__init__(
+            session, Modality.iEEG, file_ext=self.storage.file_ext
+        )
         self.modality_path.mkdir(exist_ok=True)
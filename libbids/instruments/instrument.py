@@ -1,8 +1,11 @@
 """Instrument for stimulating or recording"""
+import threading
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional, TYPE_CHECKING, Union, cast
+from typing import Iterator, List, Optional, TYPE_CHECKING, Union, cast
 
+from ..clock import Clock, MonotonicClock
 from ..enums import Modality
 
 if TYPE_CHECKING:
@@ -61,6 +64,9 @@ class Instrument(ABC):
         self.run_id: str = ""
         self._started: bool = False
         self.sfreqs: List[int]
+        self.start_barrier: Optional[threading.Barrier] = None
+        self.started_at: Optional[float] = None
+        self.clock: Clock = MonotonicClock()
 
     @abstractmethod
     def start(self, task_id: str, run_id: str):
@@ -74,6 +80,20 @@ class Instrument(ABC):
         self.run_id = ""
         self._started = False
 
+    @contextmanager
+    def synchronized_start(self) -> Iterator[None]:
+        """Wraps the call that makes the device begin acquiring or stimulating.
+        Waits for the other instruments sharing the `start_barrier`, if any,
+        and records the time on the instrument's clock at which the device had
+        started"""
+        self.started_at = None
+        barrier: Optional[threading.Barrier] = self.start_barrier
+        if barrier is not None:
+            self.start_barrier = None
+            barrier.wait()
+        yield
+        self.started_at = self.clock.now()
+
     @property
     def filename(self) -> str:
         return (
@@ -95,7 +95,8 @@ class PhysioInstrument(Instrument):
             The id of the run that will be appended to the file
         """
         super().start(task, run_id)
-        self.device_init_read(task, run_id)
+        with self.synchronized_start():
+            self.device_init_read(task, run_id)
 
     def stop(self):
         self.device.stop(
@@ -0,0 +1,465 @@
+import math
+import threading
+import time
+import numpy as np  # type: ignore
+
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple, Union
+
+from .background_writer import BackgroundWriter
+from ..enums import BackpressurePolicy
+from ..metrics import Histogram
+
+
+class PipelineStage(ABC):
+    """A stateful step of a processing pipeline that transforms (channels,
+    time) blocks. Stages write into work buffers they allocate once, so the
+    array a stage returns is only valid until it processes the next block"""
+
+    name: str = "stage"
+
+    def setup(self, n_channels: int, sfreq: float, dtype: np.dtype) -> None:
+        """Prepare for blocks of a number of channels, before the first block
+
+        Parameters
+        ----------
+        n_channels : int
+            The number of channels of the blocks the stage receives
+        sfreq : float
+            Their sampling rate
+        dtype : np.dtype
+            The type of their samples. Stages work in floating point even when
+            the samples are digital
+        """
+        self.n_channels: int = n_channels
+        self.sfreq: float = sfreq
+        self.dtype: np.dtype = np.result_type(dtype, np.float32)
+        self._buffer: np.ndarray = np.empty((n_channels, 0), dtype=self.dtype)
+
+    @abstractmethod
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Process a block
+
+        Parameters
+        ----------
+        samples : np.ndarray
+            A (channels, time) array, which must not be modified
+
+        Returns
+        -------
+        np.ndarray
+            The output of the stage
+        """
+        raise Exception("Method not implemented")
+
+    def reset(self) -> None:
+        """Forget the state carried between blocks, at the start of a run"""
+        pass
+
+    def work_buffer(self, n: int) -> np.ndarray:
+        """A (channels, n) view of the stage's work buffer, which only grows
+        when a block is longer than any before"""
+        if self._buffer.shape[1] < n:
+            self._buffer = np.empty((self.n_channels, n), dtype=self.dtype)
+        return self._buffer[:, :n]
+
+    @property
+    def output_channels(self) -> int:
+        """The number of channels of the stage's output"""
+        return self.n_channels
+
+
+class CommonAverageReference(PipelineStage):
+    name: str = "car"
+
+    def __init__(self, reference: Optional[Sequence[int]] = None):
+        """Re-references every channel to the mean of a set of channels
+
+        Parameters
+        ----------
+        reference : Optional[Sequence[int]]
+            The indices of the channels averaged. Defaults to every channel
+        """
+        self.reference: Optional[List[int]] = (
+            None if reference is None else list(reference)
+        )
+
+    def setup(self, n_channels: int, sfreq: float, dtype: np.dtype) -> None:
+        super().setup(n_channels, sfreq, dtype)
+        self._mean: np.ndarray = np.empty((1, 0), dtype=self.dtype)
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        n: int = samples.shape[1]
+        out: np.ndarray = self.work_buffer(n)
+        if self._mean.shape[1] < n:
+            self._mean = np.empty((1, n), dtype=self.dtype)
+        mean: np.ndarray = self._mean[:, :n]
+        reference: np.ndarray = (
+            samples if self.reference is None else samples[self.reference]
+        )
+        np.mean(reference, axis=0, keepdims=True, out=mean)
+        np.subtract(samples, mean, out=out)
+        return out
+
+
+class BiquadFilter(PipelineStage):
+    name: str = "biquad"
+
+    def __init__(
+        self,
+        sections: Sequence[Tuple[Sequence[float], Sequence[float]]],
+        chunk_size: int = 32,
+    ):
+        """A cascade of second order IIR sections applied to every channel.
+        Within a chunk of samples, each output of a section is a fixed linear
+        combination of the chunk's inputs and of the two inputs and outputs
+        before it, so each section filters a chunk of every channel with one
+        matrix product. This is exact, and vectorized over both channels and
+        samples
+
+        Parameters
+        ----------
+        sections : Sequence[Tuple[Sequence[float], Sequence[float]]]
+            The numerator and denominator coefficients of each section
+        chunk_size : int
+            The number of samples filtered by each matrix product
+        """
+        self.sections: List[Tuple[np.ndarray, np.ndarray]] = [
+            (np.asarray(b, dtype=np.float64) / a[0], np.asarray(a) / a[0])
+            for b, a in sections
+        ]
+        self.chunk_size: int = chunk_size
+
+    def setup(self, n_channels: int, sfreq: float, dtype: np.dtype) -> None:
+        super().setup(n_channels, sfreq, dtype)
+        self.kernels: List[np.ndarray] = [
+            self._kernel(b, a).astype(self.dtype) for b, a in self.sections
+        ]
+        # Each section's two previous outputs and two previous inputs,
+        # followed by room for a chunk of inputs
+        self._states: List[np.ndarray] = [
+            np.zeros((n_channels, self.chunk_size + 4), dtype=self.dtype)
+            for _ in self.sections
+        ]
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        n: int = samples.shape[1]
+        out: np.ndarray = self.work_buffer(n)
+        if len(self.sections) == 0:
+            out[...] = samples
+            return out
+        for start in range(0, n, self.chunk_size):
+            stop: int = min(start + self.chunk_size, n)
+            chunk: np.ndarray = samples[:, start:stop]
+            for i in range(len(self.sections)):
+                self._filter_chunk(i, chunk, out[:, start:stop])
+                chunk = out[:, start:stop]
+        return out
+
+    def reset(self) -> None:
+        for state in self._states:
+            state[:] = 0
+
+    def _filter_chunk(self, i: int, chunk: np.ndarray, out: np.ndarray) -> None:
+        """Filter a chunk through one section into `out`, which may be the
+        chunk itself, updating the section's state"""
+        state: np.ndarray = self._states[i]
+        n: int = chunk.shape[1]
+        state[:, 4 : n + 4] = chunk
+        np.matmul(state[:, : n + 4], self.kernels[i][: n + 4, :n], out=out)
+        state[:, 0] = out[:, n - 2] if n >= 2 else state[:, 1]
+        state[:, 1] = out[:, n - 1]
+        state[:, 2:4] = state[:, n + 2 : n + 4]
+
+    def _kernel(self, b: np.ndarray, a: np.ndarray) -> np.ndarray:
+        """The matrix mapping a section's state and a chunk of inputs to the
+        chunk's outputs. Its first `n + 4` rows and `n` columns do the same
+        for a chunk of `n` samples"""
+        n: int = self.chunk_size
+        # The numerator applied to the two previous inputs and the chunk
+        numerator: np.ndarray = np.zeros((n + 2, n))
+        for k in range(n):
+            numerator[k : k + 3, k] = b[::-1]
+        # Convolution with the impulse response of the denominator
+        impulse: np.ndarray = _all_pole_response(a, n, 1.0, 0.0, 0.0)
+        toeplitz: np.ndarray = np.zeros((n, n))
+        for j in range(n):
+            toeplitz[j, j:] = impulse[: n - j]
+        return np.vstack(
+            [
+                _all_pole_response(a, n, 0.0, 0.0, 1.0),
+                _all_pole_response(a, n, 0.0, 1.0, 0.0),
+                numerator @ toeplitz,
+            ]
+        )
+
+
+def _all_pole_response(
+    a: np.ndarray, n: int, x0: float, y1: float, y2: float
+) -> np.ndarray:
+    """The first `n` outputs of the filter 1 / a for an input that is `x0`
+    followed by zeros, when the two outputs before it were `y1` and `y2`"""
+    y: np.ndarray = np.zeros(n + 2)
+    y[0], y[1] = y2, y1
+    for k in range(n):
+        y[k + 2] = (x0 if k == 0 else 0.0) - a[1] * y[k + 1] - a[2] * y[k]
+    return y[2:]
+
+
+class NotchFilter(BiquadFilter):
+    name: str = "notch"
+
+    def __init__(
+        self, freq: float = 50.0, q: float = 30.0, harmonics: int = 1, **kwargs
+    ):
+        """Removes line noise at a frequency and its harmonics
+
+        Parameters
+        ----------
+        freq : float
+            The line frequency
+        q : float
+            The quality factor of each notch, its frequency over its width
+        harmonics : int
+            The number of multiples of `freq` removed, including `freq`
+        kwargs : Dict
+            Passed to `BiquadFilter`
+        """
+        self.freq: float = freq
+        self.q: float = q
+        self.harmonics: int = harmonics
+        super().__init__([], **kwargs)
+
+    def setup(self, n_channels: int, sfreq: float, dtype: np.dtype) -> None:
+        self.sections = []
+        for harmonic in range(1, self.harmonics + 1):
+            f: float = self.freq * harmonic
+            if f >= sfreq / 2:
+                break
+            w0: float = 2 * math.pi * f / sfreq
+            alpha: float = math.sin(w0) / (2 * self.q)
+            b: np.ndarray = np.array([1.0, -2 * math.cos(w0), 1.0])
+            a: np.ndarray = np.array([1 + alpha, -2 * math.cos(w0), 1 - alpha])
+            self.sections.append((b / a[0], a / a[0]))
+        super().setup(n_channels, sfreq, dtype)
+
+
+class BandPower(PipelineStage):
+    name: str = "band_power"
+
+    def __init__(
+        self,
+        bands: Sequence[Tuple[float, float]] = ((4, 8), (8, 13), (13, 30)),
+        window: float = 1.0,
+    ):
+        """The power of each channel in frequency bands, estimated from a
+        Hann windowed spectrum of the last `window` seconds each block. The
+        output is a (channels, bands) array per block
+
+        Parameters
+        ----------
+        bands : Sequence[Tuple[float, float]]
+            The lower and upper frequency of each band
+        window : float
+            The duration of the samples the power is estimated from
+        """
+        self.bands: List[Tuple[float, float]] = [tuple(b) for b in bands]
+        self.window: float = window
+
+    def setup(self, n_channels: int, sfreq: float, dtype: np.dtype) -> None:
+        super().setup(n_channels, sfreq, np.dtype(np.float64))
+        self.n_window: int = max(int(sfreq * self.window), 2)
+        self._history: np.ndarray = np.zeros((n_channels, self.n_window))
+        self._taper: np.ndarray = np.hanning(self.n_window)
+        freqs: np.ndarray = np.fft.rfftfreq(self.n_window, 1 / sfreq)
+        # Sums the periodogram over each band
+        self._band_matrix: np.ndarray = np.zeros((len(freqs), len(self.bands)))
+        scale: float = 2.0 / (sfreq * np.sum(self._taper**2))
+        for i, (low, high) in enumerate(self.bands):
+            self._band_matrix[(freqs >= low) & (freqs < high), i] = scale
+        self._tapered: np.ndarray = np.empty((n_channels, self.n_window))
+        self._power: np.ndarray = np.empty((n_channels, len(self.bands)))
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        n: int = min(samples.shape[1], self.n_window)
+        self._history[:, : self.n_window - n] = self._history[:, n:]
+        self._history[:, self.n_window - n :] = samples[:, samples.shape[1] - n :]
+        np.multiply(self._history, self._taper, out=self._tapered)
+        spectrum: np.ndarray = np.fft.rfft(self._tapered)
+        np.matmul(
+            spectrum.real**2 + spectrum.imag**2, self._band_matrix, out=self._power
+        )
+        return self._power
+
+    def reset(self) -> None:
+        self._history[:] = 0
+
+
+class Pipeline:
+    def __init__(
+        self,
+        stages: List[PipelineStage],
+        sfreq: float,
+        threaded: bool = False,
+        queue_size: int = 16,
+        policy: Union[BackpressurePolicy, str] = BackpressurePolicy.BLOCK,
+        max_results: int = 1024,
+    ):
+        """Runs a chain of stages on every block an instrument reads from its
+        device, leaving the samples written to disk untouched. The output of
+        the last stage is kept for the task to `collect`
+
+        Parameters
+        ----------
+        stages : List[PipelineStage]
+            The stages, in order
+        sfreq : float
+            The sampling rate of the instrument
+        threaded : bool
+            Whether to process blocks on a background thread rather than the
+            thread that reads the device. The thread is stopped by `close`,
+            when the instrument stops, and started again by `reset`
+        queue_size : int
+            The number of blocks that may wait for the background thread
+        policy : Union[BackpressurePolicy, str]
+            What to do when `queue_size` blocks are waiting, as for a
+            `BackgroundWriter`
+        max_results : int
+            The number of outputs kept for `collect`. Older outputs are
+            dropped once this many are waiting
+        """
+        self.stages: List[PipelineStage] = stages
+        self.sfreq: float = sfreq
+        self.timings: Dict[str, Histogram] = {
+            self._stage_name(i): Histogram() for i in range(len(stages))
+        }
+        self.n_blocks: int = 0
+        self.n_samples: int = 0
+        self.results: Deque[Tuple[int, float, np.ndarray]] = deque(maxlen=max_results)
+        self.threaded: bool = threaded
+        self.queue_size: int = queue_size
+        self.policy: Union[BackpressurePolicy, str] = policy
+        self.worker: Optional[BackgroundWriter] = None
+        self._start_worker()
+        self._shape: Optional[Tuple[int, np.dtype]] = None
+        self._timestamps: Deque[float] = deque()
+        self._lock: threading.Lock = threading.Lock()
+
+    def close(self) -> None:
+        """Process every waiting block and stop the background thread. The
+        outputs may still be collected"""
+        if self.worker is not None:
+            self.worker.close()
+            self.worker = None
+
+    def collect(self) -> List[Tuple[int, float, np.ndarray]]:
+        """Take the outputs produced since the last call
+
+        Returns
+        -------
+        List[Tuple[int, float, np.ndarray]]
+            The index of the first sample of each processed block, when it
+            was read and a copy of the last stage's output
+        """
+        with self._lock:
+            results: List[Tuple[int, float, np.ndarray]] = list(self.results)
+            self.results.clear()
+        return results
+
+    def drain(self) -> None:
+        """Block until every submitted block has been processed"""
+        if self.worker is not None:
+            self.worker.drain()
+
+    def process(self, samples: np.ndarray, timestamp: float = 0.0) -> np.ndarray:
+        """Run the stages on a block on the calling thread
+
+        Parameters
+        ----------
+        samples : np.ndarray
+            A (channels, time) array
+        timestamp : float
+            When the block was read
+
+        Returns
+        -------
+        np.ndarray
+            The output of the last stage, valid until the next block
+        """
+        if self._shape is None:
+            self._setup(samples.shape[0], samples.dtype)
+        sample_index: int = self.n_samples
+        self.n_samples += samples.shape[1]
+        self.n_blocks += 1
+
+        out: np.ndarray = samples
+        for i, stage in enumerate(self.stages):
+            start: float = time.perf_counter()
+            out = stage.process(out)
+            self.timings[self._stage_name(i)].record(time.perf_counter() - start)
+        with self._lock:
+            self.results.append((sample_index, timestamp, out.copy()))
+        return out
+
+    def reset(self) -> None:
+        """Forget the state of every stage, at the start of a run, and start
+        the background thread if the pipeline is threaded"""
+        self.drain()
+        self._start_worker()
+        # Stages are set up by the first block they process
+        if self._shape is not None:
+            for stage in self.stages:
+                stage.reset()
+        self.n_blocks = 0
+        self.n_samples = 0
+        with self._lock:
+            self.results.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            name: histogram.to_dict() for name, histogram in self.timings.items()
+        }
+        if self.worker is not None:
+            stats["worker"] = self.worker.stats()
+        return stats
+
+    def submit(self, samples: np.ndarray, timestamp: float) -> None:
+        """Process a block, on the background thread if the pipeline is
+        threaded. The block is copied first, so it may be a view into a
+        buffer that is reused
+
+        Parameters
+        ----------
+        samples : np.ndarray
+            A (channels, time) array
+        timestamp : float
+            When the block was read
+        """
+        if self.worker is None:
+            self.process(samples, timestamp)
+        else:
+            with self._lock:
+                self._timestamps.append(timestamp)
+            self.worker.submit(samples)
+
+    def _process_item(self, samples: np.ndarray) -> None:
+        with self._lock:
+            timestamp: float = self._timestamps.popleft()
+        self.process(samples, timestamp)
+
+    def _start_worker(self) -> None:
+        if self.threaded and self.worker is None:
+            self.worker = BackgroundWriter(
+                self._process_item, self.queue_size, self.policy
+            )
+
+    def _setup(self, n_channels: int, dtype: np.dtype) -> None:
+        self._shape = (n_channels, dtype)
+        for stage in self.stages:
+            stage.setup(n_channels, self.sfreq, dtype)
+            n_channels = stage.output_channels
+            dtype = stage.dtype
+
+    def _stage_name(self, i: int) -> str:
+        return f"{i}.{self.stages[i].name}"
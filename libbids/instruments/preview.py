@@ -0,0 +1,184 @@
+import numpy as np  # type: ignore
+
+from typing import Optional, Union
+
+from .data_tap import DataTap
+from ..enums import TapPolicy
+
+
+def lowpass_taps(
+    factor: int, taps_per_phase: int = 16, cutoff: float = 0.8, beta: float = 8.0
+) -> np.ndarray:
+    """Design an anti-aliasing FIR filter for decimating by `factor`, as a
+    Kaiser windowed sinc
+
+    Parameters
+    ----------
+    factor : int
+        The decimation factor
+    taps_per_phase : int
+        The length of the filter divided by `factor`
+    cutoff : float
+        The cutoff frequency as a fraction of the decimated Nyquist frequency
+    beta : float
+        The Kaiser window's shape parameter, trading the width of the
+        transition band for stopband attenuation
+
+    Returns
+    -------
+    np.ndarray
+        The `factor * taps_per_phase` taps, summing to one
+    """
+    n_taps: int = factor * taps_per_phase
+    t: np.ndarray = np.arange(n_taps) - (n_taps - 1) / 2
+    taps: np.ndarray = np.sinc(t * cutoff / factor) * np.kaiser(n_taps, beta)
+    return taps / taps.sum()
+
+
+class PolyphaseDecimator:
+    def __init__(self, factor: int, taps: np.ndarray, dtype: np.dtype = np.float64):
+        """Low-pass filters and decimates blocks of samples, keeping its state
+        across blocks so that the output is the same however the input is
+        split. Only the retained outputs are computed: the input is viewed as
+        frames of `factor` samples, each new frame is multiplied by every
+        phase of the taps at once, for every channel, and each output sums
+        the products of the last frames with their phases
+
+        Parameters
+        ----------
+        factor : int
+            The decimation factor
+        taps : np.ndarray
+            The filter taps. Padded with zeros to a multiple of `factor`
+        dtype : np.dtype
+            The type the samples are filtered in
+        """
+        self.factor: int = factor
+        self.dtype: np.dtype = np.dtype(dtype)
+        n_phases: int = -(-len(taps) // factor)
+        padded: np.ndarray = np.zeros(n_phases * factor, dtype=self.dtype)
+        padded[: len(taps)] = taps
+        # Output k is the sum over q of frame k - q times phases[q], where
+        # phases[q][r] is the tap applied to sample r of that frame
+        self.phases: np.ndarray = padded.reshape(n_phases, factor)[:, ::-1].copy()
+        # The products of the last frames with every phase, still needed by
+        # the outputs of frames to come
+        self.history: Optional[np.ndarray] = None
+        self.pending: Optional[np.ndarray] = None
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Filter a block of samples
+
+        Parameters
+        ----------
+        samples : np.ndarray
+            A (channels, time) array
+
+        Returns
+        -------
+        np.ndarray
+            A (channels, time) array of the decimated samples completed by
+            the block, which may be empty
+        """
+        n_channels: int = samples.shape[0]
+        n_phases: int = len(self.phases)
+        if self.history is None or self.pending is None:
+            self.history = np.zeros(
+                (n_channels, n_phases - 1, n_phases), dtype=self.dtype
+            )
+            self.pending = np.zeros((n_channels, 0), dtype=self.dtype)
+
+        samples = np.concatenate([self.pending, samples], axis=1, dtype=self.dtype)
+        n_frames: int = samples.shape[1] // self.factor
+        self.pending = samples[:, n_frames * self.factor :]
+        if n_frames == 0:
+            return np.zeros((n_channels, 0), dtype=self.dtype)
+
+        frames: np.ndarray = samples[:, : n_frames * self.factor].reshape(
+            n_channels, n_frames, self.factor
+        )
+        products: np.ndarray = np.concatenate(
+            [self.history, frames @ self.phases.T], axis=1
+        )
+        out: np.ndarray = products[:, n_phases - 1 :, 0].copy()
+        for q in range(1, n_phases):
+            out += products[:, n_phases - 1 - q : n_phases - 1 - q + n_frames, q]
+        self.history = products[:, n_frames:]
+        return out
+
+    def reset(self) -> None:
+        """Forget the samples of previous blocks"""
+        self.history = None
+        self.pending = None
+
+    @property
+    def delay(self) -> float:
+        """The filter's group delay in input samples"""
+        return (self.phases.size - 1) / 2
+
+
+class PreviewStream:
+    def __init__(
+        self,
+        input_sfreq: int,
+        sfreq: int,
+        taps_per_phase: int = 16,
+        cutoff: float = 0.8,
+        queue_size: int = 16,
+        policy: Union[TapPolicy, str] = TapPolicy.DROP,
+        dtype: Union[np.dtype, str, type] = np.float32,
+    ):
+        """A decimated copy of an instrument's samples for live displays,
+        published through its own `DataTap`. Created with
+        `ReadInstrument.add_preview`
+
+        Parameters
+        ----------
+        input_sfreq : int
+            The instrument's sampling rate
+        sfreq : int
+            The preview's sampling rate, which must divide `input_sfreq`
+        taps_per_phase : int
+            The length of the anti-aliasing filter divided by the decimation
+            factor
+        cutoff : float
+            The filter's cutoff frequency as a fraction of the preview's
+            Nyquist frequency
+        queue_size : int
+            The number of preview blocks that may wait for each subscriber
+        policy : Union[TapPolicy, str]
+            What to do with subscribers that fall behind
+        dtype : Union[np.dtype, str, type]
+            The type the samples are filtered in and published as
+        """
+        assert input_sfreq % sfreq == 0, "The preview rate must divide the rate"
+        self.input_sfreq: int = input_sfreq
+        self.sfreq: int = sfreq
+        factor: int = input_sfreq // sfreq
+        self.decimator: PolyphaseDecimator = PolyphaseDecimator(
+            factor, lowpass_taps(factor, taps_per_phase, cutoff), np.dtype(dtype)
+        )
+        self.tap: DataTap = DataTap(queue_size, policy)
+
+    def close(self) -> None:
+        """Stop publishing, closing every subscriber of the tap"""
+        self.tap.close()
+
+    def process(self, samples: np.ndarray, timestamp: float) -> None:
+        """Decimate a block read from the device and publish the result
+
+        Parameters
+        ----------
+        samples : np.ndarray
+            A (channels, time) array
+        timestamp : float
+            When the block was read
+        """
+        preview: np.ndarray = self.decimator.process(samples)
+        if preview.shape[-1] > 0:
+            self.tap.publish(preview, timestamp)
+
+    def reset(self) -> None:
+        """Start a new run"""
+        self.decimator.reset()
+        self.tap.reset()
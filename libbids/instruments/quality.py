@@ -0,0 +1,247 @@
+import numpy as np  # type: ignore
+
+from pathlib import Path
+from typing import Dict, List, Sequence, TYPE_CHECKING, Tuple
+
+if TYPE_CHECKING:
+    from .eeg_instrument import EEGInstrument
+
+
+class SignalQualityMonitor:
+    def __init__(
+        self,
+        n_channels: int,
+        sfreq: float,
+        record_size: int,
+        limits: Tuple[float, float],
+        gain: float = 1.0,
+        line_freqs: Sequence[float] = (50.0, 60.0),
+        flat_threshold: float = 0.0,
+        dtype: np.dtype = np.float64,
+    ):
+        """Measures the quality of every channel on each record of samples:
+        the RMS about the record's mean, the fraction of samples clipped at
+        the limits, whether the channel is flat and the power of line noise.
+        Every channel is measured at once, mostly by one matrix product per
+        record. Attach it to an instrument with
+        `EEGInstrument.monitor_quality`
+
+        Parameters
+        ----------
+        n_channels : int
+            The number of channels
+        sfreq : float
+            The sampling rate
+        record_size : int
+            The number of samples measured together
+        limits : Tuple[float, float]
+            The lowest and highest values of the samples, at which they are
+            clipped
+        gain : float
+            The physical value of one unit of the samples, so that the RMS,
+            flatness and line power are in physical units
+        line_freqs : Sequence[float]
+            The frequencies whose power is measured
+        flat_threshold : float
+            A channel is flat in a record when the difference between its
+            largest and smallest values is at most this, in physical units
+        dtype : np.dtype
+            The type of the samples
+        """
+        self.n_channels: int = n_channels
+        self.sfreq: float = sfreq
+        self.record_size: int = record_size
+        self.limits: Tuple[float, float] = limits
+        self.gain: float = gain
+        self.line_freqs: List[float] = list(line_freqs)
+        self.flat_threshold: float = flat_threshold
+        self.columns: List[str] = ["rms", "clipping", "flat"] + [
+            f"line_power_{f:g}" for f in self.line_freqs
+        ]
+        # The measures of the last record, updated in place
+        self.live: np.ndarray = np.full((n_channels, len(self.columns)), np.nan)
+        self.n_records: int = 0
+
+        self._record: np.ndarray = np.empty((n_channels, record_size), dtype=dtype)
+        self._n_filled: int = 0
+        self._work: np.ndarray = np.empty((n_channels, record_size))
+        self._clipped: np.ndarray = np.empty((n_channels, record_size), dtype=bool)
+        self._above: np.ndarray = np.empty((n_channels, record_size), dtype=bool)
+        self._bases: Dict[int, np.ndarray] = {}
+        self.reset()
+
+    def finish(self) -> None:
+        """Measure the samples of an incomplete last record"""
+        if self._n_filled > 1:
+            self._measure(self._record[:, : self._n_filled])
+        self._n_filled = 0
+
+    @classmethod
+    def for_instrument(
+        cls,
+        instrument: "EEGInstrument",
+        line_freqs: Sequence[float] = (50.0, 60.0),
+        flat_threshold: float = 0.0,
+    ) -> "SignalQualityMonitor":
+        """A monitor measuring each data record of an instrument, with the
+        limits and scaling of its samples
+
+        Parameters
+        ----------
+        instrument : EEGInstrument
+            The instrument whose samples are measured
+        line_freqs : Sequence[float]
+            The frequencies whose power is measured
+        flat_threshold : float
+            The largest range of a flat channel, in physical units
+        """
+        assert len(instrument.sfreqs) == 1, "Monitoring needs a single rate"
+        sfreq: int = instrument.sfreqs[0]
+        physical: Tuple = instrument.physical_lim
+        limits: Tuple = physical
+        gain: float = 1.0
+        if instrument.is_digital:
+            digital: Tuple = instrument.digital_lim
+            limits = digital
+            gain = (physical[1] - physical[0]) / (digital[1] - digital[0])
+        return cls(
+            len(instrument.electrodes),
+            sfreq,
+            int(sfreq * instrument.record_duration),
+            limits,
+            gain,
+            line_freqs,
+            flat_threshold,
+            instrument.dtype,
+        )
+
+    def process(self, samples: np.ndarray) -> None:
+        """Add a block of samples, measuring every record it completes
+
+        Parameters
+        ----------
+        samples : np.ndarray
+            A (channels, time) array
+        """
+        n: int = samples.shape[-1]
+        start: int = 0
+        while start < n:
+            if self._n_filled == 0 and n - start >= self.record_size:
+                # Measure whole records without copying them
+                self._measure(samples[:, start : start + self.record_size])
+                start += self.record_size
+                continue
+            count: int = min(self.record_size - self._n_filled, n - start)
+            self._record[:, self._n_filled : self._n_filled + count] = samples[
+                :, start : start + count
+            ]
+            self._n_filled += count
+            start += count
+            if self._n_filled == self.record_size:
+                self._measure(self._record)
+                self._n_filled = 0
+
+    def reset(self) -> None:
+        """Forget the records measured, at the start of a run"""
+        self.live[:] = np.nan
+        self.n_records = 0
+        self._n_filled = 0
+        self._n_samples: int = 0
+        self._n_clipped: np.ndarray = np.zeros(self.n_channels, dtype=np.int64)
+        self._n_flat: np.ndarray = np.zeros(self.n_channels, dtype=np.int64)
+        self._sums: np.ndarray = np.zeros((self.n_channels, len(self.columns)))
+        self._maxima: np.ndarray = np.zeros((self.n_channels, len(self.columns)))
+
+    def summary(self) -> Dict[str, np.ndarray]:
+        """The measures of every channel over the records of the run
+
+        Returns
+        -------
+        Dict[str, np.ndarray]
+            The number of records measured, the mean and largest RMS and line
+            powers over the records, the fraction of samples clipped and the
+            fraction of records in which the channel was flat
+        """
+        n: int = max(self.n_records, 1)
+        summary: Dict[str, np.ndarray] = {
+            "records": np.full(self.n_channels, self.n_records),
+            "rms_mean": self._sums[:, 0] / n,
+            "rms_max": self._maxima[:, 0],
+            "clipping": self._n_clipped / max(self._n_samples, 1),
+            "flat": self._n_flat / n,
+        }
+        for i, f in enumerate(self.line_freqs):
+            summary[f"line_power_{f:g}_mean"] = self._sums[:, 3 + i] / n
+            summary[f"line_power_{f:g}_max"] = self._maxima[:, 3 + i]
+        return summary
+
+    def write(self, path: Path, names: Sequence[str]) -> None:
+        """Write the run's summary as a tab separated table with a row per
+        channel
+
+        Parameters
+        ----------
+        path : Path
+            The file written
+        names : Sequence[str]
+            The name of each channel
+        """
+        summary: Dict[str, np.ndarray] = self.summary()
+        rows: List[str] = ["\t".join(["name"] + list(summary.keys()))]
+        for i, name in enumerate(names):
+            rows.append(
+                "\t".join([name] + [f"{values[i]:.6g}" for values in summary.values()])
+            )
+        path.write_text("\n".join(rows) + "\n")
+
+    def _basis(self, n: int) -> np.ndarray:
+        """The matrix whose product with a record of `n` samples gives their
+        mean and the Hann windowed Fourier coefficients at the line
+        frequencies, with the coefficients' response to the mean removed"""
+        if n not in self._bases:
+            t: np.ndarray = np.arange(n) / self.sfreq
+            window: np.ndarray = np.hanning(n + 2)[1:-1]
+            columns: List[np.ndarray] = [np.full(n, 1 / n)]
+            for f in self.line_freqs:
+                for wave in (np.cos(2 * np.pi * f * t), np.sin(2 * np.pi * f * t)):
+                    column: np.ndarray = wave * window
+                    columns.append(column - column.mean())
+            # Scaled so that the squared coefficients of a sine of amplitude A
+            # sum to A ** 2 / 2, its power
+            basis: np.ndarray = np.stack(columns, axis=1)
+            basis[:, 1:] *= np.sqrt(2) / window.sum()
+            self._bases[n] = basis
+        return self._bases[n]
+
+    def _measure(self, record: np.ndarray) -> None:
+        n: int = record.shape[-1]
+        low, high = self.limits
+        clipped: np.ndarray = self._clipped[:, :n]
+        above: np.ndarray = self._above[:, :n]
+        np.less_equal(record, low, out=clipped)
+        np.greater_equal(record, high, out=above)
+        np.logical_or(clipped, above, out=clipped)
+        n_clipped: np.ndarray = np.count_nonzero(clipped, axis=1)
+
+        work: np.ndarray = self._work[:, :n]
+        np.copyto(work, record)
+        projection: np.ndarray = work @ self._basis(n)
+        np.subtract(work, projection[:, :1], out=work)
+        measures: np.ndarray = np.empty_like(self.live)
+        measures[:, 0] = np.sqrt(np.einsum("ij,ij->i", work, work) / n) * self.gain
+        measures[:, 1] = n_clipped / n
+        measures[:, 2] = (
+            work.max(axis=1) - work.min(axis=1)
+        ) * self.gain <= self.flat_threshold
+        coefficients: np.ndarray = projection[:, 1:] ** 2
+        measures[:, 3:] = (coefficients[:, ::2] + coefficients[:, 1::2]) * (
+            self.gain**2
+        )
+
+        np.copyto(self.live, measures)
+        self.n_records += 1
+        self._n_samples += n
+        self._n_clipped += n_clipped
+        self._n_flat += measures[:, 2].astype(np.int64)
+        self._sums += measures
+        np.maximum(self._maxima, measures, out=self._maxima)
@@ -1,19 +1,136 @@
 import numpy as np
 from abc import abstractmethod
-from typing import List, Union
+from typing import Any, List, Optional, TYPE_CHECKING, Tuple, Union, cast
 
+from .data_tap import DataTap
 from .instrument import Instrument
+from .pipeline import Pipeline, PipelineStage
+from .preview import PreviewStream
+from .quality import SignalQualityMonitor
+from .shared_ring import SharedRing
+from ..alignment import ClockTrace
+from ..metrics import Histogram
+from ..wait import WaitStrategy
+
+if TYPE_CHECKING:
+    from ..acquisition import AcquisitionEngine
 
 
 class ReadInstrument(Instrument):
     """An instrument device capabale of recording data"""
 
+    # Set while a threaded acquisition engine reads from this instrument
+    acquisition: Optional["AcquisitionEngine"] = None
+
+    # How to wait for new data from the device, if at all
+    wait_strategy: Optional[WaitStrategy] = None
+
+    # Set while a run collects metrics, to time device reads and storage writes
+    read_latency: Optional[Histogram] = None
+    write_latency: Optional[Histogram] = None
+
+    # Publishes every block read from the device to live subscribers
+    tap: Optional[DataTap] = None
+
+    # Mirrors the most recent samples into shared memory for other processes
+    shared_ring: Optional[SharedRing] = None
+
+    # Decimated copies of the samples for live displays
+    previews: Tuple[PreviewStream, ...] = ()
+
+    # Processes every block read from the device for the task
+    pipeline: Optional[Pipeline] = None
+
+    # Measures the quality of every channel on each data record stored
+    quality: Optional[SignalQualityMonitor] = None
+
+    # Set while a run traces the clocks of its instruments, to record when
+    # each block is read
+    clock_trace: Optional[ClockTrace] = None
+
+    # Cleared while samples are read from the device only to be discarded
+    publishing: bool = True
+
+    def add_preview(self, sfreq: int, **kwargs: Any) -> PreviewStream:
+        """Publish a decimated copy of the samples read from the device, for
+        live displays that do not need every sample. The preview lasts until
+        the instrument stops, when its tap is closed and it is detached
+
+        Parameters
+        ----------
+        sfreq : int
+            The preview's sampling rate, which must divide the instrument's
+        kwargs : Any
+            Passed to `PreviewStream`
+
+        Returns
+        -------
+        PreviewStream
+            The preview, whose `tap` displays subscribe to
+        """
+        assert len(self.sfreqs) == 1, "Previews need a single sampling rate"
+        preview: PreviewStream = PreviewStream(self.sfreqs[0], sfreq, **kwargs)
+        self.previews = self.previews + (preview,)
+        return preview
+
+    def device_read(self) -> Union[List, np.ndarray]:
+        """Read a block of new samples from the device without storing them
+
+        Returns
+        -------
+        Union[List, np.ndarray]
+            The samples read from the device
+        """
+        raise Exception("Method not implemented")
+
+    def drain(self) -> None:
+        """Block until all data read so far has been written to storage and
+        processed by the instrument's pipeline"""
+        if self.pipeline is not None:
+            self.pipeline.drain()
+
     @abstractmethod
     def flush(self) -> None:
         """Read from the device but throw away the data as a way to
-        clear any data buffers from the device"""
+        clear any data buffers from the device. The discarded samples are not
+        published to the instrument's streams, so that their sample indices
+        match the samples stored"""
         raise Exception("Method not implemented")
 
+    def publish(self, samples: Union[List, np.ndarray]) -> None:
+        """Send a block just read from the device to the instrument's tap, if
+        it has one, stamped with the time on the instrument's clock, mirror
+        it into the instrument's shared ring, if it has one, decimate it for
+        the instrument's previews and submit it to the instrument's pipeline.
+        Also records when the block was read in the instrument's clock trace
+
+        Parameters
+        ----------
+        samples : Union[List, np.ndarray]
+            The samples read from the device
+        """
+        if not self.publishing:
+            return
+        if (
+            self.tap is None
+            and self.shared_ring is None
+            and not self.previews
+            and self.pipeline is None
+            and self.clock_trace is None
+        ):
+            return
+        timestamp: float = self.clock.now()
+        if self.clock_trace is not None:
+            self.clock_trace.record(timestamp, np.shape(samples[0])[-1])
+        if self.tap is not None:
+            self.tap.publish(samples, timestamp)
+        if self.shared_ring is not None:
+            self.shared_ring.write(cast(np.ndarray, samples))
+        for preview in self.previews:
+            preview.process(cast(np.ndarray, samples), timestamp)
+        if self.pipeline is not None:
+            self.pipeline.submit(cast(np.ndarray, samples), timestamp)
+
     @abstractmethod
     def read(self, remainder: bool = False) -> Union[List, np.ndarray]:
         """Read data from the headset and return the data
@@ -30,3 +147,93 @@ class ReadInstrument(Instrument):
             A 2D array of data in the shape of (channels, time)
         """
         raise Exception("Method not implemented")
+
+    def store(self, samples: Union[List, np.ndarray], remainder: bool = False) -> None:
+        """Store samples previously obtained from `device_read`
+
+        Parameters
+        ----------
+        samples : Union[List, np.ndarray]
+            The samples to store
+        remainder : bool
+            Whether this is the last block of the run, in which case any
+            partially filled data record should also be stored
+        """
+        raise Exception("Method not implemented")
+
+    def set_pipeline(self, stages: List[PipelineStage], **kwargs: Any) -> Pipeline:
+        """Process every block read from the device with a chain of stages,
+        whose outputs the task collects from the returned pipeline. The
+        samples stored are not modified
+
+        Parameters
+        ----------
+        stages : List[PipelineStage]
+            The stages, in order
+        kwargs : Any
+            Passed to `Pipeline`
+
+        Returns
+        -------
+        Pipeline
+            The pipeline
+        """
+        assert len(self.sfreqs) == 1, "A pipeline needs a single sampling rate"
+        if self.pipeline is not None:
+            self.pipeline.close()
+        self.pipeline = Pipeline(stages, self.sfreqs[0], **kwargs)
+        return self.pipeline
+
+    def start_clock_trace(self) -> bool:
+        """Record when each block is read in a new clock trace, to align the
+        instrument's clock with the others of a run. The trace counts the
+        samples of the first channel, so an instrument that does not declare
+        its sampling rates is not traced
+
+        Returns
+        -------
+        bool
+            Whether the instrument is traced
+        """
+        sfreqs: List[int] = getattr(self, "sfreqs", [])
+        self.clock_trace = ClockTrace(sfreqs[0]) if len(sfreqs) > 0 else None
+        return self.clock_trace is not None
+
+    def start_streams(self) -> None:
+        """Start a new run on the instrument's tap, shared ring, previews,
+        pipeline, quality monitor and clock trace"""
+        if self.tap is not None:
+            self.tap.reset()
+        if self.shared_ring is not None:
+            self.shared_ring.start_run()
+        for preview in self.previews:
+            preview.reset()
+        if self.pipeline is not None:
+            self.pipeline.reset()
+        if self.quality is not None:
+            self.quality.reset()
+        if self.clock_trace is not None:
+            self.clock_trace.reset()
+
+    def stop_streams(self) -> None:
+        """Finish the run on the instrument's pipeline, processing the blocks
+        it still holds and stopping its thread, and close and detach the
+        instrument's previews"""
+        if self.pipeline is not None:
+            self.pipeline.close()
+        previews: Tuple[PreviewStream, ...] = self.previews
+        self.previews = ()
+        for preview in previews:
+            preview.close()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Block until the device is expected to have new data, using the
+        instrument's `wait_strategy`. Returns immediately if there is none
+
+        Parameters
+        ----------
+        timeout : Optional[float]
+            The maximum time in seconds to wait
+        """
+        if self.wait_strategy is not None:
+            self.wait_strategy.wait(timeout)
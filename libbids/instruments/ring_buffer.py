@@ -0,0 +1,289 @@
+import numpy as np  # type: ignore
+
+from typing import List, Optional, Sequence, Union
+
+
+class RingBuffer:
+    """A fixed-capacity, record-aligned ring buffer of multichannel samples"""
+
+    def __init__(
+        self,
+        n_channels: int,
+        record_size: int,
+        n_records: int = 4,
+        dtype: np.dtype = np.dtype(np.float64),
+    ):
+        """Preallocate a ring buffer that holds `n_records` data records
+
+        Parameters
+        ----------
+        n_channels : int
+            The number of channels stored in the buffer
+        record_size : int
+            The number of samples in a single data record
+        n_records : int
+            The number of data records the buffer can hold at once
+        dtype : np.dtype
+            The data type of the stored samples
+        """
+        assert record_size > 0, "Records must hold at least one sample"
+        assert n_records > 0, "The buffer must hold at least one record"
+        self.record_size: int = record_size
+        self.n_records: int = n_records
+        self.capacity: int = record_size * n_records
+        self.data: np.ndarray = np.empty((n_channels, self.capacity), dtype=dtype)
+        self.head: int = 0
+        self.size: int = 0
+
+    def clear(self) -> None:
+        """Discard all buffered samples"""
+        self.head = 0
+        self.size = 0
+
+    def commit(self, n: int) -> None:
+        """Mark samples written into a view returned by `reserve` as buffered
+
+        Parameters
+        ----------
+        n : int
+            The number of samples written at the start of the reserved view
+        """
+        assert 0 <= n <= self.free, "Cannot commit more samples than are free"
+        self.size += n
+
+    def pop(
+        self, partial: bool = False, n_records: Optional[int] = None
+    ) -> List[np.ndarray]:
+        """Remove buffered samples from the ring and return views of them
+
+        The returned views point into the ring itself and are only valid
+        until the next call to `write`.
+
+        Parameters
+        ----------
+        partial : bool
+            If false, only complete data records are removed. If true, every
+            buffered sample is removed including an incomplete trailing record
+        n_records : Optional[int]
+            If supplied, remove at most this many complete records
+
+        Returns
+        -------
+        List[np.ndarray]
+            Zero, one or two (channels, time) views, in time order. Two views
+            are returned when the data wraps around the end of the ring
+        """
+        if partial:
+            n: int = self.size
+        else:
+            n_complete: int = self.n_complete
+            if n_records is not None:
+                n_complete = min(n_complete, n_records)
+            n = n_complete * self.record_size
+        if n == 0:
+            return []
+
+        first: int = min(n, self.capacity - self.head)
+        views: List[np.ndarray] = [self.data[:, self.head : self.head + first]]
+        if n > first:
+            views.append(self.data[:, : n - first])
+
+        self.size -= n
+        self.head = (self.head + n) % self.capacity
+        if partial:
+            # Realign so that whole records never straddle the end of the ring
+            self.head = 0
+        return views
+
+    def reserve(self) -> np.ndarray:
+        """Return a writable view of the free space at the end of the ring
+        that does not wrap around, so that samples can be written into the
+        ring directly. Samples written into the view are only buffered once
+        they are passed to `commit`
+
+        Returns
+        -------
+        np.ndarray
+            A (channels, time) view, empty if the ring is full
+        """
+        if self.size == 0:
+            # Nothing is buffered, so start at the beginning of the ring to
+            # offer as much contiguous space as possible
+            self.head = 0
+        tail: int = (self.head + self.size) % self.capacity
+        return self.data[:, tail : tail + min(self.free, self.capacity - tail)]
+
+    def write(
+        self, samples: Union[np.ndarray, Sequence[np.ndarray]], start: int = 0
+    ) -> int:
+        """Copy samples into the free space of the ring
+
+        Parameters
+        ----------
+        samples : Union[np.ndarray, Sequence[np.ndarray]]
+            A (channels, time) array of samples, or a sequence with one
+            equally long array of samples per channel
+        start : int
+            The time index within `samples` of the first sample to copy
+
+        Returns
+        -------
+        int
+            The number of samples copied. This is less than the number of
+            samples supplied when the ring is full; the caller must `pop`
+            records before writing the rest
+        """
+        n: int = min(samples[0].shape[-1] - start, self.free)
+        if n <= 0:
+            return 0
+
+        tail: int = (self.head + self.size) % self.capacity
+        first: int = min(n, self.capacity - tail)
+        if isinstance(samples, np.ndarray):
+            self.data[:, tail : tail + first] = samples[:, start : start + first]
+            if n > first:
+                self.data[:, : n - first] = samples[:, start + first : start + n]
+        else:
+            for row, channel in zip(self.data, samples):
+                row[tail : tail + first] = channel[start : start + first]
+                if n > first:
+                    row[: n - first] = channel[start + first : start + n]
+        self.size += n
+        return n
+
+    @property
+    def free(self) -> int:
+        return self.capacity - self.size
+
+    @property
+    def n_complete(self) -> int:
+        return self.size // self.record_size
+
+
+class MultiRateRingBuffer:
+    """Record-aligned ring buffers for channels sampled at different rates.
+    Channels that share a sampling rate are stored together in one ring"""
+
+    def __init__(
+        self,
+        sfreqs: List[int],
+        record_duration: float,
+        n_records: int = 4,
+        dtype: np.dtype = np.dtype(np.float64),
+    ):
+        """Preallocate one ring buffer per sampling rate
+
+        Parameters
+        ----------
+        sfreqs : List[int]
+            The sampling rate of each channel
+        record_duration : float
+            The length in seconds of a single data record
+        n_records : int
+            The number of data records each ring can hold at once
+        dtype : np.dtype
+            The data type of the stored samples
+        """
+        rates: np.ndarray
+        groups: np.ndarray
+        rates, groups = np.unique(np.asarray(sfreqs), return_inverse=True)
+        self.record_sizes: np.ndarray = (rates * record_duration).astype(int)
+        self.group_channels: List[np.ndarray] = [
+            np.flatnonzero(groups == g) for g in range(len(rates))
+        ]
+        self.rings: List[RingBuffer] = [
+            RingBuffer(len(channels), int(record_size), n_records, dtype)
+            for channels, record_size in zip(self.group_channels, self.record_sizes)
+        ]
+        self.channel_group: np.ndarray = groups
+        self.channel_row: np.ndarray = np.empty(len(sfreqs), dtype=int)
+        for channels in self.group_channels:
+            self.channel_row[channels] = np.arange(len(channels))
+        self.sizes: np.ndarray = np.zeros(len(self.rings), dtype=int)
+
+    def block_sizes(self, ch_samples: Sequence[np.ndarray]) -> np.ndarray:
+        """The number of samples per channel, for each rate group, in a block
+        read from a device"""
+        return np.array(
+            [ch_samples[channels[0]].shape[-1] for channels in self.group_channels]
+        )
+
+    def clear(self) -> None:
+        """Discard all buffered samples"""
+        for ring in self.rings:
+            ring.clear()
+        self.sizes[:] = 0
+
+    def pop(self, partial: bool = False) -> List[List[np.ndarray]]:
+        """Remove buffered samples from the rings
+
+        Parameters
+        ----------
+        partial : bool
+            If false, the largest number of complete records available in
+            every rate group is removed. If true, every buffered sample is
+            removed
+
+        Returns
+        -------
+        List[List[np.ndarray]]
+            A list of chunks in time order, each of which is a list with one
+            array of samples per channel in the original channel order. Apart
+            from the final partial chunk, every chunk holds whole records and
+            consists of views into the rings
+        """
+        if partial:
+            if not np.any(self.sizes):
+                return []
+            group_views: List[List[np.ndarray]] = [
+                ring.pop(partial=True) for ring in self.rings
+            ]
+            self.sizes[:] = 0
+            group_data: List[np.ndarray] = [
+                views[0] if len(views) == 1 else np.hstack(views or [ring.data[:, :0]])
+                for ring, views in zip(self.rings, group_views)
+            ]
+            return [self._interleave(group_data)]
+
+        n_records: int = int(np.min(self.sizes // self.record_sizes))
+        if n_records == 0:
+            return []
+
+        # Every ring pops the same number of records so their heads stay on
+        # the same record index and any wrap happens at the same chunk
+        group_views = [ring.pop(n_records=n_records) for ring in self.rings]
+        self.sizes -= n_records * self.record_sizes
+        return [
+            self._interleave([views[i] for views in group_views])
+            for i in range(len(group_views[0]))
+        ]
+
+    def write(
+        self, ch_samples: Sequence[np.ndarray], start: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Copy a block of per-channel samples into the rings
+
+        Parameters
+        ----------
+        ch_samples : Sequence[np.ndarray]
+            One array of new samples per channel
+        start : Optional[np.ndarray]
+            For each rate group, the index of the first sample to copy
+
+        Returns
+        -------
+        np.ndarray
+            For each rate group, the index after the last sample copied
+        """
+        end: np.ndarray = (
+            np.zeros(len(self.rings), dtype=int) if start is None else start.copy()
+        )
+        for g, (ring, channels) in enumerate(zip(self.rings, self.group_channels)):
+            end[g] += ring.write([ch_samples[c] for c in channels], int(end[g]))
+            self.sizes[g] = ring.size
+        return end
+
+    def _interleave(self, group_data: List[np.ndarray]) -> List[np.ndarray]:
+        """Arrange per-group (channels, time) arrays into per-channel rows in
+        the original channel order"""
+        return [group_data[g][r] for g, r in zip(self.channel_group, self.channel_row)]
@@ -0,0 +1,313 @@
+import sys
+import numpy as np  # type: ignore
+
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, Optional, TYPE_CHECKING, Tuple, Union
+
+if TYPE_CHECKING:
+    from .eeg_instrument import EEGInstrument
+
+# The ring starts with this header, guarded by `seq` like a seqlock: the
+# writer makes `seq` odd before it changes anything and even again after, so
+# a reader that sees the same even `seq` before and after reading has a
+# consistent view. `head` counts the samples written since the ring was
+# created, `pending` is what `head` becomes once the write in progress ends
+# and `run_start` is `head` at the start of the current run
+HEADER_DTYPE: np.dtype = np.dtype(
+    [
+        ("magic", "<u8"),
+        ("seq", "<u8"),
+        ("head", "<u8"),
+        ("pending", "<u8"),
+        ("run_start", "<u8"),
+        ("n_channels", "<u8"),
+        ("capacity", "<u8"),
+        ("sfreq", "<f8"),
+        ("dtype", "S8"),
+    ]
+)
+HEADER_BYTES: int = 128
+RING_MAGIC: int = 0x474E495253444942  # "BIDSRING"
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to existing shared memory without letting this process's
+    resource tracker unlink it when the process exits"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    register: Callable = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name)
+    finally:
+        resource_tracker.register = register
+
+
+class SharedRingReader:
+    def __init__(self, name: str):
+        """Maps a `SharedRing` written by another process. Windows of the most
+        recent samples are views of the shared memory, so they are not copied,
+        but are overwritten once the writer wraps around the ring. Check
+        `is_valid` after using a window, or use `read` to get a copy
+
+        Parameters
+        ----------
+        name : str
+            The name of the ring's shared memory
+        """
+        self.shm: shared_memory.SharedMemory = self._open(name)
+        self.header: np.ndarray = np.ndarray(
+            (), dtype=HEADER_DTYPE, buffer=self.shm.buf
+        )
+        if int(self.header["magic"]) != RING_MAGIC:
+            raise Exception(f"{name} is not a shared ring")
+        self.n_channels: int = int(self.header["n_channels"])
+        self.capacity: int = int(self.header["capacity"])
+        self.sfreq: float = float(self.header["sfreq"])
+        self.dtype: np.dtype = np.dtype(self.header["dtype"].item().decode("ascii"))
+        # Every sample is written twice, `capacity` apart, so any window of
+        # up to `capacity` samples is a contiguous slice
+        self.data: np.ndarray = np.ndarray(
+            (self.n_channels, 2 * self.capacity),
+            dtype=self.dtype,
+            buffer=self.shm.buf,
+            offset=HEADER_BYTES,
+        )
+
+    def close(self) -> None:
+        """Unmap the ring. Windows taken from it must no longer be used"""
+        del self.header
+        del self.data
+        self.shm.close()
+
+    def is_valid(self, start: int) -> bool:
+        """Whether the samples from `start` onwards have not been overwritten
+
+        Parameters
+        ----------
+        start : int
+            The index of the first sample of a window
+        """
+        return start >= self.positions()[1] - self.capacity
+
+    def last(self, seconds: float) -> Tuple[np.ndarray, int]:
+        """A view of the most recent samples, as `window` does. The window is
+        shorter than `seconds` if fewer samples have been written
+
+        Parameters
+        ----------
+        seconds : float
+            The duration of the window
+        """
+        return self.window(min(int(seconds * self.sfreq), self.head))
+
+    def positions(self) -> Tuple[int, int, int]:
+        """The header fields the writer updates, read consistently
+
+        Returns
+        -------
+        Tuple[int, int, int]
+            The number of samples written, the number of samples written once
+            the write in progress ends and the index of the first sample of
+            the current run
+        """
+        while True:
+            seq: int = int(self.header["seq"])
+            if seq % 2 == 1:
+                continue
+            head: int = int(self.header["head"])
+            pending: int = int(self.header["pending"])
+            run_start: int = int(self.header["run_start"])
+            if int(self.header["seq"]) == seq:
+                return head, pending, run_start
+
+    def read(self, n: int, end: Optional[int] = None) -> Tuple[np.ndarray, int]:
+        """Copy a window of samples, retrying if the writer overwrote it while
+        it was copied
+
+        Parameters
+        ----------
+        n : int
+            The number of samples
+        end : Optional[int]
+            The index after the last sample. Defaults to the latest sample
+
+        Returns
+        -------
+        Tuple[np.ndarray, int]
+            A (channels, n) copy of the samples and the index of the first
+        """
+        while True:
+            view, start = self.window(n, end)
+            copy: np.ndarray = view.copy()
+            if self.is_valid(start):
+                return copy, start
+
+    def window(self, n: int, end: Optional[int] = None) -> Tuple[np.ndarray, int]:
+        """A view of a window of samples in the shared memory
+
+        Parameters
+        ----------
+        n : int
+            The number of samples, at most `capacity`
+        end : Optional[int]
+            The index after the last sample. Defaults to the latest sample
+
+        Returns
+        -------
+        Tuple[np.ndarray, int]
+            A read only (channels, n) view of the samples and the index of the
+            first
+        """
+        assert 0 <= n <= self.capacity, "The window is larger than the ring"
+        head, pending, _ = self.positions()
+        end = head if end is None else end
+        start: int = end - n
+        assert end <= head, "The window ends after the latest sample"
+        if start < 0:
+            raise Exception("The window starts before the first sample")
+        if start < pending - self.capacity:
+            raise Exception("The window has been overwritten")
+        position: int = start % self.capacity
+        view: np.ndarray = self.data[:, position : position + n]
+        view.flags.writeable = False
+        return view, start
+
+    def _open(self, name: str) -> shared_memory.SharedMemory:
+        return _attach(name)
+
+    @property
+    def head(self) -> int:
+        """The number of samples written since the ring was created"""
+        return self.positions()[0]
+
+    @property
+    def run_start(self) -> int:
+        """The index of the first sample of the current run"""
+        return self.positions()[2]
+
+
+class SharedRing(SharedRingReader):
+    def __init__(
+        self,
+        n_channels: int,
+        capacity: int,
+        sfreq: float,
+        dtype: Union[np.dtype, str, type] = np.float64,
+        name: Optional[str] = None,
+    ):
+        """A ring of the most recent samples of an instrument in shared memory,
+        which other processes map with `SharedRingReader`. Attach it to an
+        instrument with `instrument.shared_ring = SharedRing.for_instrument(
+        instrument, retention)` and every block read from the device is
+        mirrored into it
+
+        Parameters
+        ----------
+        n_channels : int
+            The number of channels
+        capacity : int
+            The number of samples of each channel kept
+        sfreq : float
+            The sampling rate, for readers to convert durations into samples
+        dtype : Union[np.dtype, str, type]
+            The type of the samples
+        name : Optional[str]
+            The name of the shared memory. Defaults to a unique name
+        """
+        dt: np.dtype = np.dtype(dtype)
+        self.shm = shared_memory.SharedMemory(
+            name=name,
+            create=True,
+            size=HEADER_BYTES + n_channels * 2 * capacity * dt.itemsize,
+        )
+        header: np.ndarray = np.ndarray((), dtype=HEADER_DTYPE, buffer=self.shm.buf)
+        header["n_channels"] = n_channels
+        header["capacity"] = capacity
+        header["sfreq"] = sfreq
+        header["dtype"] = dt.str.encode("ascii")
+        header["magic"] = RING_MAGIC
+        super().__init__(self.shm.name)
+
+    @classmethod
+    def for_instrument(
+        cls,
+        instrument: "EEGInstrument",
+        retention: float,
+        name: Optional[str] = None,
+    ) -> "SharedRing":
+        """A ring sized to hold the last `retention` seconds of an
+        instrument's samples
+
+        Parameters
+        ----------
+        instrument : EEGInstrument
+            The instrument whose samples are mirrored
+        retention : float
+            The number of seconds of samples kept
+        name : Optional[str]
+            The name of the shared memory. Defaults to a unique name
+        """
+        assert len(instrument.sfreqs) == 1, "A shared ring needs a single rate"
+        sfreq: int = instrument.sfreqs[0]
+        return cls(
+            len(instrument.electrodes),
+            max(int(sfreq * retention), 1),
+            sfreq,
+            instrument.dtype,
+            name,
+        )
+
+    def start_run(self) -> None:
+        """Mark the next sample written as the first of a run"""
+        self.header["seq"] += 1
+        self.header["run_start"] = self.header["head"]
+        self.header["seq"] += 1
+
+    def unlink(self) -> None:
+        """Unmap the ring and free the shared memory"""
+        self.close()
+        self.shm.unlink()
+
+    def write(self, samples: np.ndarray) -> None:
+        """Append a block of samples, overwriting the oldest
+
+        Parameters
+        ----------
+        samples : np.ndarray
+            A (channels, time) array
+        """
+        if not isinstance(samples, np.ndarray):
+            # A list with one array per channel, as multirate devices return
+            if len({np.shape(channel)[-1] for channel in samples}) > 1:
+                raise Exception("Channels have different numbers of samples")
+            samples = np.asarray(samples)
+        if samples.shape[0] != self.n_channels:
+            raise Exception(
+                f"Expected {self.n_channels} channels, got {samples.shape[0]}"
+            )
+        n: int = samples.shape[-1]
+        if n > self.capacity:
+            self.header["seq"] += 1
+            self.header["pending"] += n
+            self.header["head"] += n - self.capacity
+            self.header["seq"] += 1
+            samples = samples[:, n - self.capacity :]
+            n = self.capacity
+        head: int = int(self.header["head"])
+        position: int = head % self.capacity
+        self.header["seq"] += 1
+        self.header["pending"] = head + n
+        self.data[:, position : position + n] = samples
+        # Mirror the samples into the other half of the ring
+        first: int = min(n, self.capacity - position)
+        self.data[:, position + self.capacity : position + self.capacity + first] = (
+            samples[:, :first]
+        )
+        if n > first:
+            self.data[:, : n - first] = samples[:, first:]
+        self.header["head"] = head + n
+        self.header["seq"] += 1
+
+    def _open(self, name: str) -> shared_memory.SharedMemory:
+        return self.shm
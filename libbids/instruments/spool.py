@@ -0,0 +1,430 @@
+import json
+import os
+import shutil
+import numpy as np  # type: ignore
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    TYPE_CHECKING,
+    Tuple,
+    Union,
+    cast,
+)
+
+from .storage import StorageBackend, storage_backend
+from ..enums import StorageFormat
+
+if TYPE_CHECKING:
+    from .eeg_instrument import EEGInstrument
+
+
+def _to_json(value: Any) -> Any:
+    """Serialize a value JSON does not support: numpy values as the
+    equivalent Python values, dates in ISO 8601 and anything else as text"""
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+class SpoolInfo:
+    def __init__(
+        self,
+        target: Path,
+        storage: StorageFormat,
+        electrodes: List[str],
+        sfreq: int,
+        dtype: np.dtype,
+        record_duration: float,
+        is_digital: bool,
+        physical_dimension: str,
+        physical_lim: Tuple,
+        digital_lim: Tuple,
+        preamp_filter: str,
+        metadata: Dict,
+        start: Optional[datetime] = None,
+    ):
+        """Everything needed to convert a spool into the file its instrument
+        would have written. It has the attributes a `StorageBackend` reads
+        from an instrument, so it can stand in for the instrument when the
+        file is written
+
+        Parameters
+        ----------
+        target : Path
+            The file the spool is converted into
+        storage : StorageFormat
+            The format of the file
+        electrodes : List[str]
+            The channel names
+        sfreq : int
+            The sampling rate shared by all channels
+        dtype : np.dtype
+            The type of the spooled samples
+        record_duration : float
+            The duration of a data record in seconds
+        is_digital : bool
+            Whether the samples are digital values
+        physical_dimension : str
+            The units of the signal
+        physical_lim : Tuple
+            The limits of the physical values
+        digital_lim : Tuple
+            The limits of the digital values
+        preamp_filter : str
+            The preamp filter settings
+        metadata : Dict
+            The details for the file header
+        start : Optional[datetime]
+            When the recording started
+        """
+        self.target: Path = target
+        self.storage: StorageFormat = storage
+        self.electrodes: List[str] = electrodes
+        self.sfreqs: List[int] = [sfreq]
+        self.dtype: np.dtype = np.dtype(dtype)
+        self.record_duration: float = record_duration
+        self.is_digital: bool = is_digital
+        self.physical_dimension: str = physical_dimension
+        self.physical_lim: Tuple = tuple(physical_lim)
+        self.digital_lim: Tuple = tuple(digital_lim)
+        self.preamp_filter: str = preamp_filter
+        self.metadata: Dict = metadata
+        self.start: Optional[datetime] = start
+
+    @classmethod
+    def from_dict(cls, values: Dict) -> "SpoolInfo":
+        """Read the information written by `to_dict`"""
+        metadata: Dict = dict(values["metadata"])
+        for key in values["datetime_keys"]:
+            metadata[key] = datetime.fromisoformat(metadata[key])
+        return cls(
+            Path(values["target"]),
+            cast(StorageFormat, StorageFormat._member_map_[values["storage"]]),
+            values["electrodes"],
+            values["sfreq"],
+            np.dtype(values["dtype"]),
+            values["record_duration"],
+            values["is_digital"],
+            values["physical_dimension"],
+            values["physical_lim"],
+            values["digital_lim"],
+            values["preamp_filter"],
+            metadata,
+            (
+                None
+                if values["start"] is None
+                else datetime.fromisoformat(values["start"])
+            ),
+        )
+
+    @classmethod
+    def from_instrument(cls, instrument: "EEGInstrument") -> "SpoolInfo":
+        """Describe the file an instrument records its current run to"""
+        return cls(
+            instrument.filepath,
+            instrument.storage.storage_format,
+            instrument.electrodes,
+            instrument.sfreqs[0],
+            instrument.dtype,
+            instrument.record_duration,
+            instrument.is_digital,
+            instrument.physical_dimension,
+            instrument.physical_lim,
+            instrument.digital_lim,
+            instrument.preamp_filter,
+            instrument.metadata,
+        )
+
+    def to_dict(self) -> Dict:
+        """The information as a dictionary that is JSON serializable with
+        `_to_json` as the default. Metadata dates are read back as datetimes,
+        while other values JSON does not support are read back as they were
+        serialized"""
+        metadata: Dict = {}
+        datetime_keys: List[str] = []
+        for key, value in self.metadata.items():
+            if isinstance(value, date):
+                if not isinstance(value, datetime):
+                    value = datetime.combine(value, datetime.min.time())
+                value = value.isoformat()
+                datetime_keys.append(key)
+            metadata[key] = value
+        return {
+            "target": str(self.target),
+            "storage": self.storage.name,
+            "electrodes": self.electrodes,
+            "sfreq": self.sfreqs[0],
+            "dtype": self.dtype.str,
+            "record_duration": self.record_duration,
+            "is_digital": self.is_digital,
+            "physical_dimension": self.physical_dimension,
+            "physical_lim": list(self.physical_lim),
+            "digital_lim": list(self.digital_lim),
+            "preamp_filter": self.preamp_filter,
+            "metadata": metadata,
+            "datetime_keys": datetime_keys,
+            "start": None if self.start is None else self.start.isoformat(),
+        }
+
+
+class Spool:
+    # Each index entry is the first sample of a block, its number of samples
+    # and the time it was read
+    index_dtype: np.dtype = np.dtype([("start", "<i8"), ("n", "<i8"), ("time", "<f8")])
+
+    def __init__(self, path: Path, info: SpoolInfo, chunk_duration: float = 60.0):
+        """An append-only spool of raw samples, preallocated in chunks, that is
+        converted into the instrument's file after the run. The spool is a
+        directory holding `info.json`, the samples in `data.raw` in time
+        major order, an index of the blocks appended in `index.bin` and the
+        annotations in `annotations.jsonl`. A block is only indexed once its
+        samples are in the spool, so if the process dies the spool still
+        holds every indexed block and can be converted with `convert_spool`
+
+        Parameters
+        ----------
+        path : Path
+            The directory of the spool, which is created
+        info : SpoolInfo
+            What is spooled and the file it is converted into
+        chunk_duration : float
+            How many seconds of samples to preallocate at a time
+        """
+        self.path: Path = path
+        self.info: SpoolInfo = info
+        self.n_channels: int = len(info.electrodes)
+        self.chunk_size: int = max(int(info.sfreqs[0] * chunk_duration), 1)
+        self.n_samples: int = 0
+        self.n_blocks: int = 0
+        self.capacity: int = 0
+        self.data: np.ndarray
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.write_info()
+        self._data_fd: int = os.open(
+            self.path.joinpath("data.raw"), os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644
+        )
+        self._index_fd: int = os.open(
+            self.path.joinpath("index.bin"),
+            os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_APPEND,
+            0o644,
+        )
+        self._annotations_fd: int = os.open(
+            self.path.joinpath("annotations.jsonl"),
+            os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_APPEND,
+            0o644,
+        )
+        self._entry: np.ndarray = np.zeros(1, dtype=self.index_dtype)
+        self._grow(self.chunk_size)
+
+    def annotate(self, onset: float, duration: float, description: str) -> None:
+        """Add an annotation to be written to the converted file"""
+        self.annotate_many([(onset, duration, description)])
+
+    def annotate_many(self, annotations: Sequence[Tuple[float, float, str]]) -> None:
+        """Add several annotations to be written to the converted file, with a
+        single write"""
+        lines: str = "".join(
+            json.dumps({"onset": onset, "duration": duration, "description": text})
+            + "\n"
+            for onset, duration, text in annotations
+        )
+        os.write(self._annotations_fd, lines.encode("utf-8"))
+
+    def append(self, samples: np.ndarray, time: float = 0.0) -> None:
+        """Copy a block of samples into the spool
+
+        Parameters
+        ----------
+        samples : np.ndarray
+            A (channels, time) array
+        time : float
+            When the block was read
+        """
+        n: int = samples.shape[-1]
+        self.reserve(n)[...] = samples
+        self.commit(n, time)
+
+    def close(self) -> None:
+        """Stop appending to the spool, release its unused space and write
+        its information"""
+        if self._data_fd < 0:
+            return
+        self.write_info()
+        self.data.flush()
+        del self.data
+        os.ftruncate(self._data_fd, self.n_samples * self._sample_bytes)
+        for fd in [self._data_fd, self._index_fd, self._annotations_fd]:
+            os.close(fd)
+        self._data_fd = self._index_fd = self._annotations_fd = -1
+
+    def commit(self, n: int, time: float = 0.0) -> None:
+        """Index the first `n` samples of the last reserved block
+
+        Parameters
+        ----------
+        n : int
+            The number of samples written into the block
+        time : float
+            When the block was read
+        """
+        if n <= 0:
+            return
+        self._entry["start"] = self.n_samples
+        self._entry["n"] = n
+        self._entry["time"] = time
+        os.write(self._index_fd, self._entry.tobytes())
+        self.n_samples += n
+        self.n_blocks += 1
+
+    def reserve(self, n: int) -> np.ndarray:
+        """Get space in the spool for the next block, growing the spool if it
+        is full
+
+        Parameters
+        ----------
+        n : int
+            The largest number of samples the block may have
+
+        Returns
+        -------
+        np.ndarray
+            A writable (channels, n) view of the spool. It is a transposed view
+            of time major storage, so samples of a channel are not contiguous
+        """
+        if self.n_samples + n > self.capacity:
+            self._grow(self.n_samples + n + self.chunk_size)
+        return self.data[self.n_samples : self.n_samples + n].T
+
+    def set_start(self, start: datetime) -> None:
+        """Record when the recording started. Only the spool's information in
+        memory is updated, so that this is cheap enough to call as the
+        recording starts. It is written with `write_info`, or when the spool
+        is closed"""
+        self.info.start = start
+
+    def write_info(self) -> None:
+        """Replace the spool's information on disk atomically"""
+        tmp: Path = self.path.joinpath("info.json.tmp")
+        tmp.write_text(json.dumps(self.info.to_dict(), indent=2, default=_to_json))
+        tmp.replace(self.path.joinpath("info.json"))
+
+    def _grow(self, capacity: int) -> None:
+        """Preallocate space on disk for `capacity` samples and map it"""
+        size: int = capacity * self._sample_bytes
+        if hasattr(os, "posix_fallocate"):
+            os.posix_fallocate(self._data_fd, 0, size)
+        else:
+            os.ftruncate(self._data_fd, size)
+        # Blocks handed out before keep the previous mapping alive
+        self.data = np.memmap(
+            self.path.joinpath("data.raw"),
+            dtype=self.info.dtype,
+            mode="r+",
+            shape=(capacity, self.n_channels),
+        )
+        self.capacity = capacity
+
+    @property
+    def _sample_bytes(self) -> int:
+        """The number of bytes of one sample of every channel"""
+        return self.n_channels * self.info.dtype.itemsize
+
+
+def convert_spool(
+    path: Union[str, Path],
+    storage: Optional[StorageBackend] = None,
+    remove: bool = True,
+    records_per_write: int = 64,
+) -> Path:
+    """Convert a spool into the file named by its instrument's `filepath`.
+    Only the blocks in the spool's index are converted, so a spool left by a
+    process that died mid-run can be converted too
+
+    Parameters
+    ----------
+    path : Union[str, Path]
+        The directory of the spool
+    storage : Optional[StorageBackend]
+        The backend that writes the file. Defaults to a new backend for the
+        spool's storage format
+    remove : bool
+        Whether to delete the spool once it is converted
+    records_per_write : int
+        How many data records to pass to the backend at once
+
+    Returns
+    -------
+    Path
+        The converted file
+    """
+    path = Path(path)
+    info: SpoolInfo = SpoolInfo.from_dict(
+        json.loads(path.joinpath("info.json").read_text())
+    )
+    index: np.ndarray = np.fromfile(path.joinpath("index.bin"), dtype=Spool.index_dtype)
+    n_samples: int = int(index["start"][-1] + index["n"][-1]) if len(index) else 0
+    n_channels: int = len(info.electrodes)
+
+    backend: StorageBackend = storage or storage_backend(info.storage)
+    backend.open(info.target, cast(Any, info))
+    backend.set_start(info.start or info.metadata.get("startdate") or datetime.now())
+    annotations: Path = path.joinpath("annotations.jsonl")
+    for line in annotations.read_text().splitlines():
+        annotation: Dict = json.loads(line)
+        backend.annotate(
+            annotation["onset"], annotation["duration"], annotation["description"]
+        )
+
+    if n_samples > 0:
+        data: np.ndarray = np.memmap(
+            path.joinpath("data.raw"),
+            dtype=info.dtype,
+            mode="r",
+            shape=(n_samples, n_channels),
+        )
+        step: int = int(info.sfreqs[0] * info.record_duration) * records_per_write
+        for start in range(0, n_samples, step):
+            backend.write(data[start : start + step].T)
+        del data
+    backend.close()
+
+    if remove:
+        shutil.rmtree(path)
+    return info.target
+
+
+def recover_spools(
+    directory: Union[str, Path], workers: Optional[int] = None
+) -> List[Path]:
+    """Convert every spool under a directory, such as a session's directory
+    after a crash, in parallel
+
+    Parameters
+    ----------
+    directory : Union[str, Path]
+        The directory to search for spools
+    workers : Optional[int]
+        The number of spools to convert at once. Defaults to one per spool
+
+    Returns
+    -------
+    List[Path]
+        The converted files
+    """
+    spools: List[Path] = sorted(
+        p.parent for p in Path(directory).rglob("*.spool/info.json")
+    )
+    if len(spools) == 0:
+        return []
+    with ThreadPoolExecutor(max_workers=workers or len(spools)) as pool:
+        return list(pool.map(convert_spool, spools))
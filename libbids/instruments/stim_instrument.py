@@ -1,3 +1,5 @@
+import threading
+
 from typing import Any, TYPE_CHECKING
 
 from .write_instrument import WriteInstrument
@@ -31,13 +33,19 @@ class StimInstrument(WriteInstrument):
             session, Modality.STIM, label=label, primary_modality=primary_modality
         )
         self.device: Any = device
+        # Triggers are written from the thread that fires them, which may not
+        # be the run loop's
+        self.write_lock: threading.Lock = threading.Lock()
 
     def start(self, task: str, run_id: str):
-        self.device.start()
+        with self.synchronized_start():
+            self.device.start()
 
     def stop(self):
         self.device.stop()
 
     def write(self, command: str) -> None:
-        """a string command to send to the device"""
-        self.device.write(command)
+        """a string command to send to the device. Safe to call from any
+        thread"""
+        with self.write_lock:
+            self.device.write(command)
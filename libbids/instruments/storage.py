@@ -0,0 +1,550 @@
+import os
+import numpy as np  # type: ignore
+
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from pathlib import Path
+from pyedflib import EdfWriter, FILETYPE_BDFPLUS, FILETYPE_EDFPLUS  # type: ignore
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    IO,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TYPE_CHECKING,
+    Union,
+    cast,
+)
+
+from ..enums import StorageFormat
+
+try:
+    from ..clibbids import EdfEncoder, EdfSignal  # type: ignore
+except ImportError:
+    # An extension built without the native encoder
+    EdfEncoder = None
+    EdfSignal = None
+
+if TYPE_CHECKING:
+    from .eeg_instrument import EEGInstrument
+
+
+class StorageBackend(ABC):
+    """Writes the samples recorded by an instrument to a file in one of the
+    formats BIDS allows"""
+
+    # The format written, and the extension of the file named by the
+    # instrument's `filepath`
+    storage_format: StorageFormat
+    file_ext: str = ""
+
+    # Whether samples may only be written in whole data records until the file
+    # is closed
+    record_aligned: bool = True
+
+    # Whether channels may have different sampling rates
+    multirate: bool = True
+
+    def __init__(self):
+        self.record_dtype: np.dtype = np.dtype(np.float64)
+
+    @abstractmethod
+    def annotate(self, onset: float, duration: float, description: str) -> None:
+        """Add an annotation to the recording
+
+        Parameters
+        ----------
+        onset : float
+            The time of the annotation in seconds from the start of the file
+        duration : float
+            The duration of the annotation in seconds
+        description : str
+            The text of the annotation
+        """
+        raise Exception("Not Implemented")
+
+    def annotate_many(self, annotations: Sequence[Tuple[float, float, str]]) -> None:
+        """Add several annotations to the recording at once
+
+        Parameters
+        ----------
+        annotations : Sequence[Tuple[float, float, str]]
+            The onset, duration and text of each annotation
+        """
+        for onset, duration, description in annotations:
+            self.annotate(onset, duration, description)
+
+    @abstractmethod
+    def close(self) -> None:
+        """Finish writing the file"""
+        raise Exception("Not Implemented")
+
+    def default_digital_lim(self, dtype: np.dtype) -> Tuple[int, int]:
+        """The digital limits used when an instrument does not declare them
+
+        Parameters
+        ----------
+        dtype : np.dtype
+            The type of the instrument's samples
+        """
+        return (-32768, 32767)
+
+    @abstractmethod
+    def open(self, path: Path, instrument: "EEGInstrument") -> None:
+        """Create the file and write its header
+
+        Parameters
+        ----------
+        path : Path
+            The path of the file
+        instrument : EEGInstrument
+            The instrument whose samples will be written. Its electrodes,
+            sampling rates, limits and sample type describe the signals
+        """
+        raise Exception("Not Implemented")
+
+    @abstractmethod
+    def set_start(self, start: datetime) -> None:
+        """Record the time at which the recording started"""
+        raise Exception("Not Implemented")
+
+    @abstractmethod
+    def write(self, data: Union[np.ndarray, List[np.ndarray]]) -> None:
+        """Append samples to the file
+
+        Parameters
+        ----------
+        data : Union[np.ndarray, List[np.ndarray]]
+            A (channels, time) array, or a list with one array per channel when
+            the channels have different sampling rates. Unless the file is
+            about to be closed, record aligned backends are only given whole
+            data records
+        """
+        raise Exception("Not Implemented")
+
+
+class EDFBackend(StorageBackend):
+    """European Data Format files, with 16 bit samples"""
+
+    storage_format: StorageFormat = StorageFormat.EDF
+    file_ext: str = "edf"
+    file_type: int = FILETYPE_EDFPLUS
+
+    def __init__(self, native: bool = False):
+        """Write EDF files with pyedflib, or with the native encoder of
+        clibbids, which releases the GIL while it scales, interleaves and
+        writes data records
+
+        Parameters
+        ----------
+        native : bool
+            Whether to use the native encoder. Requires clibbids to have been
+            built with it
+        """
+        super(EDFBackend, self).__init__()
+        if native and EdfEncoder is None:
+            raise Exception("clibbids was built without the native edf encoder")
+        self.native: bool = native
+        # Set while a file is open, by whichever of the encoder and pyedflib
+        # writes it
+        self.encoder: Optional[EdfEncoder] = None
+        self.writer: Optional[EdfWriter] = None
+        self.record_size: int = 0
+        self.is_digital: bool = False
+        self.multirate_data: bool = False
+        self._block_write: Optional[Callable[[np.ndarray], int]] = None
+
+    def annotate(self, onset: float, duration: float, description: str) -> None:
+        if self.encoder is not None:
+            self.encoder.annotate(onset, duration, description)
+            return
+        assert self._open_writer().writeAnnotation(onset, duration, description) == 0
+
+    def close(self) -> None:
+        if self.encoder is not None:
+            self.encoder.close()
+            self.encoder = None
+            return
+        self._open_writer().close()
+        self.writer = None
+        self._block_write = None
+
+    def open(self, path: Path, instrument: "EEGInstrument") -> None:
+        sfreqs: List[int] = instrument.sfreqs
+        self.record_size = int(sfreqs[0] * instrument.record_duration)
+        self.is_digital = instrument.is_digital
+        self.multirate_data = len(sfreqs) > 1
+        if self.native:
+            self._open_encoder(path, instrument)
+            return
+
+        writer: EdfWriter = EdfWriter(
+            str(path), len(instrument.electrodes), file_type=self.file_type
+        )
+        writer.setHeader(
+            {**instrument.metadata, "startdate": _whole_second(instrument.metadata)}
+        )
+        writer.setDatarecordDuration(instrument.record_duration)
+        # Declare every signal at once, as each header change rewrites the
+        # whole header
+        writer.setSignalHeaders(
+            [
+                {
+                    "label": el,
+                    "dimension": instrument.physical_dimension,
+                    "sample_frequency": sfreqs[0] if len(sfreqs) == 1 else sfreqs[i],
+                    "physical_max": instrument.physical_lim[1],
+                    "physical_min": instrument.physical_lim[0],
+                    "digital_max": instrument.digital_lim[1],
+                    "digital_min": instrument.digital_lim[0],
+                    "prefilter": "" if "AUX" in el else instrument.preamp_filter,
+                }
+                for i, el in enumerate(instrument.electrodes)
+            ]
+        )
+
+        # Choose how whole data records are written, based on the sample type
+        self.record_dtype = np.dtype(np.float64)
+        self._block_write = writer.blockWritePhysicalSamples
+        if self.is_digital and instrument.dtype == np.int16:
+            self.record_dtype = instrument.dtype
+            self._block_write = writer.blockWriteDigitalShortSamples
+        elif self.is_digital:
+            self.record_dtype = np.dtype(np.int32)
+            self._block_write = writer.blockWriteDigitalSamples
+        self.writer = writer
+
+    def set_start(self, start: datetime) -> None:
+        if self.encoder is not None:
+            self.encoder.set_start(
+                start.year,
+                start.month,
+                start.day,
+                start.hour,
+                start.minute,
+                start.second,
+                start.microsecond,
+            )
+            return
+        self._open_writer().setStartdatetime(start.replace(microsecond=0))
+
+    def write(self, data: Union[np.ndarray, List[np.ndarray]]) -> None:
+        """Whole records of channels sharing a sampling rate are interleaved
+        with a single copy, in the type the edf library takes, and written
+        record by record. Anything else, such as the final partial record,
+        goes through `EdfWriter.writeSamples`. The native encoder takes
+        any samples as they are and pads a final partial record"""
+        if self.encoder is not None:
+            self.encoder.write(data, self.is_digital)
+            return
+        writer: EdfWriter = self._open_writer()
+        if (
+            not isinstance(data, np.ndarray)
+            or self.multirate_data
+            or data.shape[-1] % self.record_size != 0
+        ):
+            writer.writeSamples(data, digital=self.is_digital)
+            return
+
+        n_records: int = data.shape[-1] // self.record_size
+        records: np.ndarray = np.ascontiguousarray(
+            data.reshape(data.shape[0], n_records, self.record_size).transpose(1, 0, 2),
+            dtype=self.record_dtype,
+        )
+        block_write: Callable[[np.ndarray], int] = cast(
+            Callable[[np.ndarray], int], self._block_write
+        )
+        for record in records.reshape(n_records, -1):
+            if block_write(record) < 0:
+                raise OSError(f"Failed to write a data record to {self.file_ext}")
+
+    def _open_writer(self) -> EdfWriter:
+        """The pyedflib writer of the open file"""
+        if self.writer is None:
+            raise Exception(f"No {self.file_ext} file is open, call `open` first")
+        return self.writer
+
+    def _open_encoder(self, path: Path, instrument: "EEGInstrument") -> None:
+        """Create the file with the native encoder"""
+        sfreqs: List[int] = instrument.sfreqs
+        patient, recording = edf_plus_identification(instrument.metadata)
+        self.encoder = EdfEncoder(
+            str(path),
+            self.file_type == FILETYPE_BDFPLUS,
+            [
+                EdfSignal(
+                    el,
+                    instrument.physical_dimension,
+                    "" if "AUX" in el else instrument.preamp_filter,
+                    int(
+                        (sfreqs[0] if len(sfreqs) == 1 else sfreqs[i])
+                        * instrument.record_duration
+                    ),
+                    instrument.physical_lim[0],
+                    instrument.physical_lim[1],
+                    instrument.digital_lim[0],
+                    instrument.digital_lim[1],
+                )
+                for i, el in enumerate(instrument.electrodes)
+            ],
+            instrument.record_duration,
+            patient,
+            recording,
+        )
+        # The encoder reads samples in place, in their own type
+        self.record_dtype = np.dtype(np.float64)
+        if self.is_digital:
+            self.record_dtype = np.dtype(
+                np.int16 if instrument.dtype == np.int16 else np.int32
+            )
+
+
+class BDFBackend(EDFBackend):
+    """BioSemi Data Format files, the 24 bit variant of EDF"""
+
+    storage_format: StorageFormat = StorageFormat.BDF
+    file_ext: str = "bdf"
+    file_type: int = FILETYPE_BDFPLUS
+
+    def default_digital_lim(self, dtype: np.dtype) -> Tuple[int, int]:
+        return (-8388608, 8388607)
+
+    def open(self, path: Path, instrument: "EEGInstrument") -> None:
+        super(BDFBackend, self).open(path, instrument)
+        if self.is_digital and self.encoder is None:
+            # 24 bit samples do not fit the short sample writer
+            self.record_dtype = np.dtype(np.int32)
+            self._block_write = self._open_writer().blockWriteDigitalSamples
+
+
+class BrainVisionBackend(StorageBackend):
+    """BrainVision Core Data Format recordings: a `.vhdr` header, a `.vmrk`
+    marker file and a `.eeg` file of multiplexed binary samples. Samples are
+    appended to the binary file without buffering and with no record size
+    constraint"""
+
+    storage_format: StorageFormat = StorageFormat.BRAINVISION
+    file_ext: str = "vhdr"
+    record_aligned: bool = False
+    multirate: bool = False
+
+    def __init__(self):
+        super(BrainVisionBackend, self).__init__()
+        self.sfreq: int = 0
+        self.n_markers: int = 0
+        self._fd: int = -1
+        self._markers: Optional[IO[str]] = None
+
+    def annotate(self, onset: float, duration: float, description: str) -> None:
+        position: int = int(round(onset * self.sfreq)) + 1
+        size: int = max(int(round(duration * self.sfreq)), 1)
+        self._add_marker("Comment", description, position, size)
+
+    def close(self) -> None:
+        os.close(self._fd)
+        self._fd = -1
+        cast(IO[str], self._markers).close()
+        self._markers = None
+
+    def default_digital_lim(self, dtype: np.dtype) -> Tuple[int, int]:
+        info: np.iinfo = np.iinfo(self._binary_dtype(dtype, True))
+        return (int(info.min), int(info.max))
+
+    def open(self, path: Path, instrument: "EEGInstrument") -> None:
+        assert len(instrument.sfreqs) == 1, "BrainVision needs a single sampling rate"
+        self.sfreq = instrument.sfreqs[0]
+        self.record_dtype = self._binary_dtype(instrument.dtype, instrument.is_digital)
+        binary_format: str = {
+            np.dtype(np.int16): "INT_16",
+            np.dtype(np.int32): "INT_32",
+            np.dtype(np.float32): "IEEE_FLOAT_32",
+        }[self.record_dtype]
+        resolution: float = 1.0
+        if instrument.is_digital:
+            physical_min, physical_max = instrument.physical_lim
+            digital_min, digital_max = instrument.digital_lim
+            resolution = (physical_max - physical_min) / (digital_max - digital_min)
+
+        data_path: Path = path.with_suffix(".eeg")
+        marker_path: Path = path.with_suffix(".vmrk")
+        channels: List[str] = [
+            f"Ch{i + 1}={self._escape(el)},,{resolution:.10g},"
+            f"{instrument.physical_dimension}"
+            for i, el in enumerate(instrument.electrodes)
+        ]
+        path.write_text(
+            "\n".join(
+                [
+                    "Brain Vision Data Exchange Header File Version 1.0",
+                    "; Data created by libbids",
+                    "",
+                    "[Common Infos]",
+                    "Codepage=UTF-8",
+                    f"DataFile={data_path.name}",
+                    f"MarkerFile={marker_path.name}",
+                    "DataFormat=BINARY",
+                    "DataOrientation=MULTIPLEXED",
+                    f"NumberOfChannels={len(instrument.electrodes)}",
+                    f"SamplingInterval={1e6 / self.sfreq:.10g}",
+                    "",
+                    "[Binary Infos]",
+                    f"BinaryFormat={binary_format}",
+                    "",
+                    "[Channel Infos]",
+                    *channels,
+                    "",
+                ]
+            ),
+            encoding="utf-8",
+        )
+
+        self._markers = open(marker_path, "w", encoding="utf-8")
+        self._markers.write(
+            "\n".join(
+                [
+                    "Brain Vision Data Exchange Marker File, Version 1.0",
+                    "",
+                    "[Common Infos]",
+                    "Codepage=UTF-8",
+                    f"DataFile={data_path.name}",
+                    "",
+                    "[Marker Infos]",
+                    "",
+                ]
+            )
+        )
+        self.n_markers = 0
+        self._fd = os.open(data_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+
+    def set_start(self, start: datetime) -> None:
+        self._add_marker("New Segment", "", 1, 1, start.strftime("%Y%m%d%H%M%S%f"))
+
+    def write(self, data: Union[np.ndarray, List[np.ndarray]]) -> None:
+        """Multiplex the samples with a single copy and append them"""
+        samples: np.ndarray = np.ascontiguousarray(
+            np.asarray(data).T, dtype=self.record_dtype
+        )
+        view: memoryview = memoryview(samples).cast("B")
+        while len(view) > 0:
+            view = view[os.write(self._fd, view) :]
+
+    def _add_marker(
+        self,
+        kind: str,
+        description: str,
+        position: int,
+        size: int,
+        date: Optional[str] = None,
+    ) -> None:
+        self.n_markers += 1
+        fields: List[str] = [kind, self._escape(description), str(position), str(size)]
+        fields.append("0")
+        if date is not None:
+            fields.append(date)
+        markers: IO[str] = cast(IO[str], self._markers)
+        markers.write(f"Mk{self.n_markers}={','.join(fields)}\n")
+        markers.flush()
+
+    @staticmethod
+    def _binary_dtype(dtype: np.dtype, is_digital: bool) -> np.dtype:
+        """The binary format that holds samples of a type"""
+        if not is_digital:
+            return np.dtype(np.float32)
+        return np.dtype(np.int16) if dtype == np.int16 else np.dtype(np.int32)
+
+    @staticmethod
+    def _escape(text: str) -> str:
+        """Escape commas, which separate the fields of header lines"""
+        return text.replace(",", r"\1")
+
+
+def edf_plus_identification(metadata: Dict) -> Tuple[str, str]:
+    """The patient and recording identification fields of an EDF+ header
+
+    Parameters
+    ----------
+    metadata : Dict
+        The header details an `EEGInstrument` passes to `EdfWriter.setHeader`
+
+    Returns
+    -------
+    Tuple[str, str]
+        The patient identification, and the recording identification that
+        follows the start date. Unknown subfields are X and spaces within a
+        subfield are underscores
+    """
+
+    def subfield(value: Any) -> str:
+        if isinstance(value, (date, datetime)):
+            return value.strftime("%d-%b-%Y").upper()
+        return str(value).strip().replace(" ", "_") or "X"
+
+    sex: str = (
+        str(metadata.get("sex", "")).lower() or str(metadata.get("gender", "")).lower()
+    )
+    sex_code: str = (
+        "M"
+        if sex in ["1", "m", "male"]
+        else "F" if sex in ["0", "f", "female"] else "X"
+    )
+    patient: List[str] = [
+        subfield(metadata.get("patientcode", "")),
+        sex_code,
+        subfield(metadata.get("birthdate", "")),
+        subfield(metadata.get("patientname", "")),
+    ]
+    recording: List[str] = [
+        subfield(metadata.get(key, ""))
+        for key in ["admincode", "technician", "equipment"]
+    ]
+    for fields, key in [
+        (patient, "patient_additional"),
+        (recording, "recording_additional"),
+    ]:
+        if metadata.get(key):
+            fields.append(str(metadata[key]))
+    return " ".join(patient), " ".join(recording)
+
+
+def _whole_second(metadata: Dict) -> Any:
+    """The start date of a header for pyedflib, without its microseconds.
+    pyedflib passes the microseconds to edflib as if they were in its units of
+    100 ns, so a subsecond start is mostly dropped and otherwise stored 100
+    times too late, which also shifts the annotations read back. Once set, it
+    is not cleared by a later start on the second. The native encoder keeps
+    the subsecond start, so the two paths write different start times for
+    the same run: pyedflib's truncated to the second, the encoder's exact"""
+    start: Any = metadata["startdate"]
+    return start.replace(microsecond=0) if isinstance(start, datetime) else start
+
+
+def storage_backend(
+    storage: Union[StorageBackend, StorageFormat, str],
+) -> StorageBackend:
+    """Get a storage backend from a backend or the name of a format
+
+    Parameters
+    ----------
+    storage : Union[StorageBackend, StorageFormat, str]
+        A backend, which is returned as is, or a storage format
+
+    Returns
+    -------
+    StorageBackend
+        A new backend for the format
+    """
+    if isinstance(storage, StorageBackend):
+        return storage
+    fmt: StorageFormat = (
+        storage
+        if isinstance(storage, StorageFormat)
+        else cast(StorageFormat, StorageFormat._member_map_[storage.upper()])
+    )
+    if fmt == StorageFormat.BDF:
+        return BDFBackend()
+    if fmt == StorageFormat.BRAINVISION:
+        return BrainVisionBackend()
+    return EDFBackend()
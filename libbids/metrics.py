@@ -0,0 +1,154 @@
+import json
+import math
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+class Histogram:
+    def __init__(
+        self, low: float = 1e-6, high: float = 100.0, bins_per_decade: int = 10
+    ):
+        """A histogram of positive values, such as durations in seconds, with
+        logarithmically spaced bins. Recording a value is O(1) and allocates
+        nothing, so it can be used inside acquisition loops
+
+        Parameters
+        ----------
+        low : float
+            The upper edge of the lowest bin. Smaller values fall into it
+        high : float
+            Values above this fall into the highest bin
+        bins_per_decade : int
+            The number of bins per factor of ten
+        """
+        self.low: float = low
+        self.bins_per_decade: int = bins_per_decade
+        n_bins: int = int(math.ceil(math.log10(high / low) * bins_per_decade)) + 2
+        self.counts: List[int] = [0] * n_bins
+        self.count: int = 0
+        self.total: float = 0.0
+        self.min: float = math.inf
+        self.max: float = 0.0
+
+    def edge(self, index: int) -> float:
+        """The upper edge of a bin"""
+        return self.low * 10 ** (index / self.bins_per_decade)
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile as the upper edge of the bin containing it
+
+        Parameters
+        ----------
+        q : float
+            The quantile, between 0 and 1
+
+        Returns
+        -------
+        float
+            The estimated value, never larger than the largest value recorded
+        """
+        if self.count == 0:
+            return 0.0
+        target: float = q * self.count
+        cumulative: int = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(self.edge(i), self.max)
+        return self.max
+
+    def record(self, value: float) -> None:
+        """Add a value to the histogram"""
+        if value <= self.low:
+            index: int = 0
+        else:
+            index = int(math.log10(value / self.low) * self.bins_per_decade) + 1
+            if index >= len(self.counts):
+                index = len(self.counts) - 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summarize the histogram, including its non-empty bins keyed by
+        their upper edge"""
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count > 0 else 0.0,
+            "min": self.min if self.count > 0 else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "p999": self.quantile(0.999),
+            "bins": {
+                f"{self.edge(i):.3g}": count
+                for i, count in enumerate(self.counts)
+                if count > 0
+            },
+        }
+
+
+class RunMetrics:
+    def __init__(self, sfreq: int):
+        """Low-overhead timing statistics for the acquisition loop of a run
+
+        Parameters
+        ----------
+        sfreq : int
+            The sampling rate of the primary instrument
+        """
+        self.sfreq: int = sfreq
+        self.histograms: Dict[str, Histogram] = {}
+        self.process: Histogram = self.histogram("task_process")
+        self.loop_jitter: Histogram = self.histogram("loop_jitter")
+        self.event_onset_lag: Histogram = self.histogram("event_onset_lag")
+        self.extra: Dict[str, Any] = {}
+        self._last_block: Optional[float] = None
+
+    def histogram(self, name: str) -> Histogram:
+        """Get the histogram with the given name, creating it if needed"""
+        if name not in self.histograms:
+            self.histograms[name] = Histogram()
+        return self.histograms[name]
+
+    def record_iteration(self, start: float, end: float, n_samples: int) -> None:
+        """Record one call to `Task.process`
+
+        Parameters
+        ----------
+        start : float
+            The `time.perf_counter` time before the call
+        end : float
+            The `time.perf_counter` time after the call
+        n_samples : int
+            The number of samples the call returned
+        """
+        self.process.record(end - start)
+        if n_samples > 0:
+            if self._last_block is not None:
+                period: float = n_samples / self.sfreq
+                self.loop_jitter.record(abs(end - self._last_block - period))
+            self._last_block = end
+
+    def to_dict(self) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            name: histogram.to_dict() for name, histogram in self.histograms.items()
+        }
+        result.update(self.extra)
+        return result
+
+    def write(self, path: Path) -> None:
+        """Write the metrics as a JSON sidecar
+
+        Parameters
+        ----------
+        path : Path
+            The path of the JSON file
+        """
+        with open(path, "w") as fh:
+            json.dump(self.to_dict(), fh, indent=2)
@@ -1,12 +1,24 @@
+import threading
+import time
 import numpy as np  # type: ignore
 
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import timedelta
 from pathlib import Path
-from typing import Any, List, Optional, TYPE_CHECKING, cast
+from typing import Any, Callable, Dict, List, Optional, TYPE_CHECKING, cast
 
+from .acquisition import AcquisitionEngine
+from .alignment import ClockFit, write_alignment
 from .clibbids import Entity  # type: ignore
+from .clock import Clock, MonotonicClock, VirtualClock
 from .event import Event
-from .instruments import ReadInstrument
+from .devices import BlockDevice
+from .event_log import EventLog
+from .instruments import EEGInstrument, Instrument, ReadInstrument
+from .metrics import RunMetrics
+from .scheduler import EventScheduler
+from .trigger import Trigger, TriggerChannel
+from .wait import WaitStrategy
 
 if TYPE_CHECKING:
     from .task import Task
@@ -16,6 +28,18 @@ class Run(Entity):
     def __init__(
         self,
         task: "Task",
+        threaded: bool = False,
+        queue_size: int = 64,
+        wait_strategy: Optional[WaitStrategy] = None,
+        event_flush_every: Optional[int] = None,
+        event_flush_interval: Optional[float] = None,
+        event_fsync: bool = False,
+        event_journal: bool = True,
+        concurrent_lifecycle: bool = False,
+        metrics: bool = False,
+        clock: Optional[Clock] = None,
+        annotate_events: bool = False,
+        trace_clocks: bool = False,
     ):
         """Initializes the objects necessary to run a training data collection
         session
@@ -24,12 +48,94 @@ class Run(Entity):
         ----------
         task : Task
             The task object that this run will exectute
+        threaded : bool
+            If true, each read instrument is read on a dedicated thread and its
+            data is written to disk from a separate writer thread by an
+            `AcquisitionEngine`. Reading an instrument from `Task.process` then
+            returns the samples that were stored since the previous read
+        queue_size : int
+            When threaded, the maximum number of blocks per instrument that may
+            wait to be written to disk
+        wait_strategy : Optional[WaitStrategy]
+            How to wait between iterations of the run loop for the primary
+            instrument to have new data. By default the loop does not wait and
+            calls `Task.process` as fast as possible
+        event_flush_every : Optional[int]
+            If supplied, events are flushed to the event file in batches of
+            this many events. By default they are written when the run stops
+        event_flush_interval : Optional[float]
+            If supplied, events are flushed to the event file at most this many
+            seconds apart
+        event_fsync : bool
+            Whether each batch of events is forced to disk when flushed
+        event_journal : bool
+            Whether events are journaled to a memory-mapped file as they finish
+            so that they can be recovered with `EventLog.recover` if the
+            process dies before they are flushed
+        concurrent_lifecycle : bool
+            If true, instruments are started, flushed and stopped concurrently
+            on a thread pool. Starting instruments wait at a barrier so that
+            their devices begin acquiring at nearly the same time
+        metrics : bool
+            If true, the run times `Task.process`, device reads, storage writes,
+            the loop period and event onsets, and writes the resulting
+            histograms along with the statistics of the wait strategy,
+            acquisition engine and background writers to a
+            `<prefix>_metrics.json` file next to the event file when it stops
+        clock : Optional[Clock]
+            If supplied, the clock is shared with the run's instruments, their
+            wait strategies and any `BlockDevice` they read from. Supplying a
+            `VirtualClock` simulates the run: paced devices generate or replay
+            samples on demand, the run advances the clock as samples arrive,
+            and the events, their callbacks and the event file are produced as
+            fast as the samples can be processed. A simulated run cannot be
+            threaded
+        annotate_events : bool
+            If true, every event is also added as an annotation to the
+            recording of the primary instrument when it finishes, so that
+            readers of the file get the event markers without the event file.
+            The annotations are queued and added in batches as data records
+            are written, or when the run stops
+        trace_clocks : bool
+            If true, each read instrument records when every block of samples
+            is read. When the run stops, the sampling rate and start of each
+            device are fit on the host's clock, and the mapping from the
+            indices of each instrument's samples to those of the primary
+            instrument is written to a `<prefix>_clocks.json` file next to the
+            event file
         """
         super(Run, self).__init__("Run", value=task.n_runs + 1)
         self.task: "Task" = task
+        self.threaded: bool = threaded
+        self.queue_size: int = queue_size
+        self.engine: Optional[AcquisitionEngine] = None
+        self.wait_strategy: Optional[WaitStrategy] = wait_strategy
+        self.concurrent_lifecycle: bool = concurrent_lifecycle
+        self.collect_metrics: bool = metrics
+        self.metrics: Optional[RunMetrics] = None
+        self.clock: Clock = MonotonicClock() if clock is None else clock
+        self.annotate_events: bool = annotate_events
+        self.trace_clocks: bool = trace_clocks
+        assert not annotate_events or isinstance(
+            task.primary_instrument, EEGInstrument
+        ), "Events can only be annotated on an EEG recording"
+        if self.clock.is_virtual and threaded:
+            raise Exception("A run with a virtual clock cannot be threaded")
+        self.event_log: EventLog = EventLog(
+            self.event_filepath,
+            event_flush_every,
+            event_flush_interval,
+            event_fsync,
+            event_journal,
+        )
 
-        self.current_event: Optional[Event] = None
-        self.remaining_events: List[Event] = self.task.events
+        self.n_samples: int = 0
+        self.start_time: float = 0.0
+        self.triggers: TriggerChannel = TriggerChannel(
+            self.clock, lambda: self.n_samples
+        )
+        self.scheduler: EventScheduler = EventScheduler(self.task.events, self.sfreq)
+        self.done_samples: int = self.scheduler.to_samples(self.task.duration)
 
     def append_event(self, event: Event):
         """Append the event data to the event table
@@ -39,140 +145,444 @@ class Run(Entity):
         event : Event
             The event data to save
         """
-        line: str = (
-            "\t".join([str(x) for x in cast(List[Any], dict(event).values())]) + "\n"
-        )
-        self.eventbuf.writelines([line])
-
-    def end_current_event(self) -> None:
-        """Finishes out the current event"""
-        if self.current_event is not None:
-            current_event: Event = cast(Event, self.current_event)
-            current_event_onset: timedelta = cast(timedelta, current_event.onset)
-            current_event.duration = self.elapsed_time - current_event_onset
-            self.current_event = current_event
-            self.task.on_event_end(self.current_event)
-            self.append_event(self.current_event)
-            self.previous_event = self.current_event
-            self.current_event = None
+        self.event_log.append(event)
+        if self.annotate_events and event.onset is not None:
+            cast(EEGInstrument, self.task.primary_instrument).annotate(
+                event.onset.total_seconds(),
+                0.0 if event.duration is None else event.duration.total_seconds(),
+                str(event.trial_type),
+                deferred=True,
+            )
 
-    def flush_instruments(self) -> None:
-        """Flushes Read instruments"""
+    def attach_clock(self) -> None:
+        """Shares the run's clock with its event log, wait strategies,
+        instruments and the block devices they read from"""
+        if self.clock is self.event_log.clock:
+            return
+        self.event_log.clock = self.clock
+        if self.wait_strategy is not None:
+            self.wait_strategy.clock = self.clock
         for ins in self.task.instruments:
-            if isinstance(ins, ReadInstrument):
-                ins.flush()
+            ins.clock = self.clock
+            if isinstance(ins, ReadInstrument) and ins.wait_strategy is not None:
+                ins.wait_strategy.clock = self.clock
+            device: Any = getattr(ins, "device", None)
+            if isinstance(device, BlockDevice):
+                device.clock = self.clock
+
+    def end_current_event(self, n_samples: Optional[int] = None) -> None:
+        """Finishes out the current event
+
+        Parameters
+        ----------
+        n_samples : Optional[int]
+            The sample at which the event ends. By default, the number of
+            samples processed so far
+        """
+        if self.scheduler.current is not None:
+            current_event: Event = self.scheduler.end_current(
+                self.n_samples if n_samples is None else n_samples
+            )
+            self.task.on_event_end(current_event)
+            self.append_event(current_event)
+            self.previous_event = current_event
+
+    def flush_instruments(self) -> None:
+        """Flushes Read instruments. The samples discarded are not published
+        to the instruments' streams"""
+        self._for_each_instrument(
+            lambda ins: ins.flush(),
+            [ins for ins in self.task.instruments if isinstance(ins, ReadInstrument)],
+        )
+
+    def handle_triggers(self) -> None:
+        """Hands the triggers fired since the last call to the events they
+        begin, and begins the next event if it was triggered"""
+        scheduler: EventScheduler = self.scheduler
+        trigger: Optional[Trigger] = self.triggers.take()
+        while trigger is not None:
+            event: Optional[Event] = trigger.event
+            if (
+                event is None
+                and scheduler.has_next
+                and scheduler.onsets[scheduler.cursor] < 0
+                and scheduler.next.triggerable
+                and scheduler.next.trigger is None
+            ):
+                event = scheduler.next
+            if event is not None:
+                event.trigger = trigger
+                if trigger.event is None:
+                    # A trigger fired without an event is not from `Event.set`,
+                    # so the event it begins has not been set yet
+                    event.threading_event.set()
+            trigger = self.triggers.take()
+        if scheduler.has_next and scheduler.is_next_ready(self.n_samples):
+            self.start_next_event()
 
     def initialize_event_file(self) -> None:
         """Initializes the event file for writing"""
-        if self.event_filepath.exists():
-            raise Exception("Run data is already saved, please create a new run")
-
-        self.eventbuf = open(self.event_filepath, "w")
-        header: str = "\t".join(["onset", "duration", "trial_type"]) + "\n"
-        self.eventbuf.writelines([header])
+        self.event_log.open()
 
     def is_current_event_finished(self) -> bool:
         """Determines whether the current event is complete"""
-        if (self.current_event is not None) and (
-            self.current_event.duration is not None
-        ):
-            current_event: Event = cast(Event, self.current_event)
-            current_event_onset: timedelta = cast(timedelta, current_event.onset)
-            current_event_duration: timedelta = cast(timedelta, current_event.duration)
-            current_event_end_time: timedelta = (
-                current_event_onset + current_event_duration
-            )
-            if self.elapsed_time >= current_event_end_time:
-                return True
-
-        return False
+        return self.scheduler.is_current_finished(self.n_samples)
 
     def is_next_event_ready(self) -> bool:
         """Determines if the next event should begin"""
-        if self.next_event.onset is None:
-            return self.next_event.is_set()
-        else:
-            return self.elapsed_time >= self.next_event.onset
+        return self.scheduler.is_next_ready(self.n_samples)
 
     def pop_event(self) -> Event:
-        event: Event = self.remaining_events[0]
-        self.remaining_events = self.remaining_events[1:]
-        return event
+        return self.scheduler.pop()
+
+    def start_next_event(self) -> None:
+        """Finishes out the current event and begins the next one. An event
+        begun by a trigger begins at the sample the trigger was fired at"""
+        trigger: Optional[Trigger] = self.scheduler.next.trigger
+        n_samples: int = self.n_samples
+        if trigger is not None and trigger.sample >= self.scheduler.current_onset:
+            n_samples = trigger.sample
+        self.end_current_event(n_samples)
+        if self.metrics is not None:
+            onset: int = self.scheduler.onsets[self.scheduler.cursor]
+            if onset >= 0:
+                lag: float = (n_samples - onset) / self.sfreq
+                self.metrics.event_onset_lag.record(lag)
+        current_event: Event = self.scheduler.start_next(n_samples)
+        self.task.on_event_start(current_event)
+        if trigger is not None:
+            self.triggers.record_onset(trigger, self.n_samples)
 
     def start(self) -> None:
+        self.attach_clock()
         self.initialize_event_file()
-        for ins in self.task.instruments:
-            ins.start(self.task.id, self.id)
-        self.remaining_events = self.task.events
-        self.n_samples: int = 0
+        if self.collect_metrics:
+            self.start_metrics()
+        if self.trace_clocks:
+            self.start_clock_traces()
+        self.start_instruments()
+        self.n_samples = 0
+        self.start_time = self.clock.now()
+        self.scheduler = EventScheduler(self.task.events, self.sfreq)
+        self.done_samples = self.scheduler.to_samples(self.task.duration)
+        self.start_triggers()
 
         # Determine current event
-        self.current_event = None
-        if self.elapsed_time == self.next_event.onset:
-            self.current_event = self.pop_event()
-            self.task.on_event_start(self.current_event)
+        if self.scheduler.has_next and self.scheduler.onsets[0] == 0:
+            self.start_next_event()
 
         # Throw away any samples collected during setup
         self.flush_instruments()
+        if self.threaded:
+            self.engine = AcquisitionEngine(
+                [
+                    ins
+                    for ins in self.task.instruments
+                    if isinstance(ins, ReadInstrument)
+                ],
+                self.queue_size,
+            )
+            self.engine.start()
+
+        scheduler: EventScheduler = self.scheduler
+        triggers: TriggerChannel = self.triggers
+        wait_strategy: Optional[WaitStrategy] = self.wait_strategy
+        metrics: Optional[RunMetrics] = self.metrics
+        process_start: float = 0.0
+        virtual_clock: Optional[VirtualClock] = (
+            cast(VirtualClock, self.clock) if self.clock.is_virtual else None
+        )
         while not self.done:
             # Handle events
-            if self.is_current_event_finished():
+            if scheduler.is_current_finished(self.n_samples):
                 self.end_current_event()
 
-            if (len(self.remaining_events) > 0) and self.is_next_event_ready():
-                self.end_current_event()
-                self.current_event = self.pop_event()
-                current_event: Event = cast(Event, self.current_event)
-                current_event.onset = self.elapsed_time
-                self.current_event = current_event
-                self.task.on_event_start(current_event)
+            if triggers.has_pending:
+                self.handle_triggers()
+            elif scheduler.has_next and scheduler.is_next_ready(self.n_samples):
+                self.start_next_event()
 
             # Handle sampling
+            if wait_strategy is not None:
+                wait_strategy.wait()
+                # A trigger fired while waiting interrupts the wait
+                if triggers.has_pending:
+                    self.handle_triggers()
+            if metrics is not None:
+                process_start = time.perf_counter()
             sample: np.ndarray = self.task.process()
+            if metrics is not None:
+                metrics.record_iteration(
+                    process_start, time.perf_counter(), sample.shape[-1]
+                )
             self.n_samples += sample.shape[-1]
+            if wait_strategy is not None:
+                wait_strategy.observe(sample.shape[-1])
+            if virtual_clock is not None:
+                virtual_clock.advance_to(self.start_time + self.n_samples / self.sfreq)
 
         # Final event
         self.end_current_event()
+        self.stop_triggers()
+
+        if self.engine is not None:
+            self.engine.stop()
 
         # Final sample
         self.task.process(True)
 
         self.stop()
 
+    def start_metrics(self) -> None:
+        """Creates the run's metrics and attaches latency histograms to its
+        read instruments"""
+        self.metrics = RunMetrics(self.sfreq)
+        for label, ins in self._instrument_labels().items():
+            if isinstance(ins, ReadInstrument):
+                ins.read_latency = self.metrics.histogram(f"device_read.{label}")
+                ins.write_latency = self.metrics.histogram(f"write.{label}")
+
+    def start_clock_traces(self) -> None:
+        """Attaches a clock trace to every read instrument that declares its
+        sampling rates"""
+        for ins in self.task.instruments:
+            if isinstance(ins, ReadInstrument):
+                ins.start_clock_trace()
+
+    def start_triggers(self) -> None:
+        """Clears the triggers of a previous run and routes the triggering
+        of the task's events through the run's trigger channel"""
+        self.triggers.reset()
+        self.triggers.wake = (
+            [self.wait_strategy.interrupt] if self.wait_strategy is not None else []
+        )
+        for event in self.task.events:
+            event.trigger = None
+            if event.triggerable:
+                event.on_set = self._on_event_set
+
+    def start_instruments(self) -> None:
+        """Starts every instrument of the task. When the lifecycle is
+        concurrent, the instruments start their devices together"""
+        barrier: Optional[threading.Barrier] = (
+            threading.Barrier(len(self.task.instruments))
+            if self.concurrent_lifecycle
+            else None
+        )
+
+        def start(ins: Instrument) -> None:
+            try:
+                ins.start(self.task.id, self.id)
+                if ins.start_barrier is not None:
+                    # The instrument does not synchronize its start, so arrive
+                    # at the barrier on its behalf
+                    ins.start_barrier = None
+                    cast(threading.Barrier, barrier).wait()
+            except BaseException:
+                # Release the instruments waiting for this one
+                if barrier is not None:
+                    barrier.abort()
+                raise
+
+        for ins in self.task.instruments:
+            ins.start_barrier = barrier
+        try:
+            self._for_each_instrument(start, self.task.instruments)
+        finally:
+            for ins in self.task.instruments:
+                ins.start_barrier = None
+
     def stop(self):
+        self._for_each_instrument(
+            lambda ins: ins.drain(),
+            [ins for ins in self.task.instruments if isinstance(ins, ReadInstrument)],
+        )
+        if self.metrics is not None:
+            self.metrics.extra.update(self._component_stats())
+        if self.trace_clocks:
+            self.stop_clock_traces()
+        self._for_each_instrument(lambda ins: ins.stop(), self.task.instruments)
+        self.event_log.close()
+        if self.metrics is not None:
+            self.stop_metrics()
+
+    def stop_triggers(self) -> None:
+        """Detaches the trigger channel from the task's events"""
+        self.triggers.wake = []
+        for event in self.task.events:
+            event.on_set = None
+
+    def stop_clock_traces(self) -> None:
+        """Detaches the clock traces from the instruments and writes the
+        alignment of their clocks. Instruments that sample without being read,
+        such as a `PhysioInstrument` recording on its own, are aligned by the
+        time their device started"""
+        fits: Dict[str, Optional[ClockFit]] = {}
+        primary: str = ""
+        for label, ins in self._instrument_labels().items():
+            if ins is self.task.primary_instrument:
+                primary = label
+            if isinstance(ins, ReadInstrument) and ins.clock_trace is not None:
+                fits[label] = ins.clock_trace.fit()
+                ins.clock_trace = None
+            elif hasattr(ins, "sfreq") and ins.started_at is not None:
+                sfreq: float = getattr(ins, "sfreq")
+                fits[label] = ClockFit(ins.started_at, 1 / sfreq, sfreq, 0, 0.0, 0.0)
+        write_alignment(self.clocks_filepath, fits, primary, self.start_time)
+
+    def stop_metrics(self) -> None:
+        """Detaches the latency histograms from the instruments and writes the
+        metrics sidecar"""
+        metrics: RunMetrics = cast(RunMetrics, self.metrics)
         for ins in self.task.instruments:
-            ins.stop()
-        self.eventbuf.close()
+            if isinstance(ins, ReadInstrument):
+                ins.read_latency = None
+                ins.write_latency = None
+        metrics.extra["start_skew"] = self.start_skew
+        metrics.write(self.metrics_filepath)
+
+    def trigger(self, label: Optional[str] = None) -> Trigger:
+        """Fires a trigger that begins the next event if it waits for one. Safe
+        to call from any thread
+
+        Parameters
+        ----------
+        label : Optional[str]
+            A label for the trigger, written to the instruments it is
+            forwarded to
+
+        Returns
+        -------
+        Trigger
+            The trigger, stamped with the sample it was fired at
+        """
+        return self.triggers.fire(label)
+
+    def _component_stats(self) -> Dict[str, Any]:
+        """Collects the statistics kept by the wait strategies, acquisition
+        engine, background writers and pipelines of the run"""
+        stats: Dict[str, Any] = {}
+        if self.wait_strategy is not None:
+            stats["wait_strategy"] = self.wait_strategy.metrics()
+        if self.engine is not None:
+            stats["acquisition"] = self.engine.stats()
+        for label, ins in self._instrument_labels().items():
+            if not isinstance(ins, ReadInstrument):
+                continue
+            if ins.wait_strategy is not None:
+                stats[f"wait_strategy.{label}"] = ins.wait_strategy.metrics()
+            writer: Any = getattr(ins, "background_writer", None)
+            if writer is not None:
+                stats[f"background_writer.{label}"] = writer.stats()
+            if ins.pipeline is not None:
+                stats[f"pipeline.{label}"] = ins.pipeline.stats()
+        if len(self.triggers.triggers) > 0:
+            stats["triggers"] = self.triggers.stats()
+        return stats
+
+    def _for_each_instrument(
+        self, fn: Callable[[Instrument], None], instruments: List[Instrument]
+    ) -> None:
+        """Apply a function to each instrument, concurrently if the lifecycle
+        is concurrent, and re-raise the first error encountered"""
+        if not self.concurrent_lifecycle:
+            for ins in instruments:
+                fn(ins)
+            return
+
+        with ThreadPoolExecutor(max_workers=max(len(instruments), 1)) as pool:
+            futures: List[Future] = [pool.submit(fn, ins) for ins in instruments]
+        errors: List[BaseException] = [
+            e for e in (f.exception() for f in futures) if e is not None
+        ]
+        # An aborted barrier is a consequence of another instrument failing
+        errors.sort(key=lambda e: isinstance(e, threading.BrokenBarrierError))
+        if len(errors) > 0:
+            raise errors[0]
+
+    def _on_event_set(self, event: Event) -> None:
+        self.triggers.fire(event.trial_type, event)
+
+    def _instrument_labels(self) -> Dict[str, Instrument]:
+        """The instruments of the task keyed by their modality and position"""
+        return {
+            f"{ins.modality.name.lower()}-{i}": ins
+            for i, ins in enumerate(self.task.instruments)
+        }
+
+    @property
+    def clocks_filepath(self) -> Path:
+        clocks_filename: str = "_".join([self.prefix, "clocks.json"])
+        return self.task.modality_path.joinpath(clocks_filename)
+
+    @property
+    def current_event(self) -> Optional[Event]:
+        return self.scheduler.current
+
+    @current_event.setter
+    def current_event(self, event: Optional[Event]) -> None:
+        self.scheduler.set_current(event, self.n_samples)
 
     @property
     def done(self) -> bool:
-        if self.task.duration is None:
-            return len(self.remaining_events) == 0
+        if self.done_samples < 0:
+            return not self.scheduler.has_next
         else:
-            return self.elapsed_time >= self.task.duration
+            return self.n_samples >= self.done_samples
 
     @property
     def elapsed_time(self) -> timedelta:
-        elapsed_seconds: float = self.n_samples / self.sfreq
-        return timedelta(seconds=elapsed_seconds)
+        return self.scheduler.to_timedelta(self.n_samples)
 
     @property
     def event_filepath(self) -> Path:
         event_filename: str = "_".join([self.prefix, "events.tsv"])
         return self.task.modality_path.joinpath(event_filename)
 
+    @property
+    def metrics_filepath(self) -> Path:
+        metrics_filename: str = "_".join([self.prefix, "metrics.json"])
+        return self.task.modality_path.joinpath(metrics_filename)
+
     @property
     def next_event(self) -> Event:
-        return self.remaining_events[0]
+        return self.scheduler.next
 
     @property
     def prefix(self) -> str:
         return "_".join([self.subject_id, self.task.session.id, self.task.id, self.id])
 
+    @property
+    def remaining_events(self) -> List[Event]:
+        return self.scheduler.remaining
+
+    @remaining_events.setter
+    def remaining_events(self, events: List[Event]) -> None:
+        self.scheduler.replace_remaining(events)
+
     @property
     def sfreq(self) -> int:
         return self.task.primary_instrument.sfreqs[0]
 
+    @property
+    def start_skew(self) -> float:
+        """The time in seconds between the first and the last instrument
+        starting its device"""
+        started_at: List[float] = [
+            ins.started_at
+            for ins in self.task.instruments
+            if ins.started_at is not None
+        ]
+        return max(started_at) - min(started_at) if len(started_at) > 0 else 0.0
+
+    @property
+    def start_times(self) -> Dict[str, Optional[float]]:
+        """The time on the run's clock at which each instrument started its device,
+        keyed by the instrument's modality and position in the task"""
+        return {
+            label: ins.started_at for label, ins in self._instrument_labels().items()
+        }
+
     @property
     def subject_dir(self) -> Path:
         return self.task.session.subject.path
@@ -0,0 +1,147 @@
+from datetime import timedelta
+from typing import List, Optional
+
+from .event import Event
+
+
+class EventScheduler:
+    def __init__(self, events: List[Event], sfreq: int):
+        """Schedules a list of events against a sample clock. Event onsets and
+        durations are converted once into integer sample counts so that the
+        checks made on every loop iteration of a run are integer comparisons
+
+        Parameters
+        ----------
+        events : List[Event]
+            The events to schedule, in order
+        sfreq : int
+            The sampling frequency of the sample clock
+        """
+        self.events: List[Event] = events
+        self.sfreq: int = sfreq
+        self.cursor: int = 0
+        self.current: Optional[Event] = None
+        self.current_onset: int = 0
+        self.current_end: int = -1
+        # -1 marks an onset or duration that is not known ahead of time
+        self.onsets: List[int] = [self.to_samples(e.onset) for e in events]
+        self.durations: List[int] = [self.to_samples(e.duration) for e in events]
+
+    def end_current(self, n_samples: int) -> Event:
+        """Finish the current event
+
+        Parameters
+        ----------
+        n_samples : int
+            The number of samples elapsed since the start of the run
+
+        Returns
+        -------
+        Event
+            The event that was finished, with its duration set
+        """
+        event: Event = self.current  # type: ignore
+        event.duration = self.to_timedelta(n_samples - self.current_onset)
+        self.current = None
+        self.current_end = -1
+        return event
+
+    def is_current_finished(self, n_samples: int) -> bool:
+        """Determines whether the current event has reached its end"""
+        return self.current_end >= 0 and n_samples >= self.current_end
+
+    def is_next_ready(self, n_samples: int) -> bool:
+        """Determines whether the next event should begin"""
+        onset: int = self.onsets[self.cursor]
+        if onset < 0:
+            return self.events[self.cursor].is_set()
+        return n_samples >= onset
+
+    def pop(self) -> Event:
+        """Remove the next event from the schedule without starting it"""
+        event: Event = self.events[self.cursor]
+        self.cursor += 1
+        return event
+
+    def replace_remaining(self, events: List[Event]) -> None:
+        """Replace the events that have yet to begin
+
+        Parameters
+        ----------
+        events : List[Event]
+            The events to schedule after those already begun, in order
+        """
+        self.events = self.events[: self.cursor] + list(events)
+        self.onsets = self.onsets[: self.cursor] + [
+            self.to_samples(e.onset) for e in events
+        ]
+        self.durations = self.durations[: self.cursor] + [
+            self.to_samples(e.duration) for e in events
+        ]
+
+    def set_current(self, event: Optional[Event], n_samples: int) -> None:
+        """Make an event the current one without taking it from the schedule
+
+        Parameters
+        ----------
+        event : Optional[Event]
+            The event, or None for no current event. It begins at its onset,
+            or at `n_samples` if it has none
+        n_samples : int
+            The number of samples elapsed since the start of the run
+        """
+        self.current = event
+        if event is None:
+            self.current_end = -1
+            return
+        onset: int = self.to_samples(event.onset)
+        self.current_onset = onset if onset >= 0 else n_samples
+        if event.onset is None:
+            event.onset = self.to_timedelta(n_samples)
+        duration: int = self.to_samples(event.duration)
+        self.current_end = self.current_onset + duration if duration >= 0 else -1
+
+    def start_next(self, n_samples: int) -> Event:
+        """Begin the next event
+
+        Parameters
+        ----------
+        n_samples : int
+            The number of samples elapsed since the start of the run
+
+        Returns
+        -------
+        Event
+            The event that began, with its onset set to the current time
+        """
+        duration: int = self.durations[self.cursor]
+        event: Event = self.pop()
+        event.onset = self.to_timedelta(n_samples)
+        self.current = event
+        self.current_onset = n_samples
+        self.current_end = n_samples + duration if duration >= 0 else -1
+        return event
+
+    def to_samples(self, time: Optional[timedelta]) -> int:
+        """Convert a time into the smallest sample count that is at or past
+        it, or -1 if no time is given"""
+        if time is None:
+            return -1
+        microseconds: int = time // timedelta(microseconds=1)
+        return -(-microseconds * self.sfreq // 1000000)
+
+    def to_timedelta(self, n_samples: int) -> timedelta:
+        """Convert a sample count into a time"""
+        return timedelta(seconds=n_samples / self.sfreq)
+
+    @property
+    def has_next(self) -> bool:
+        return self.cursor < len(self.events)
+
+    @property
+    def next(self) -> Event:
+        return self.events[self.cursor]
+
+    @property
+    def remaining(self) -> List[Event]:
+        return self.events[self.cursor :]
@@ -3,7 +3,7 @@ import numpy as np
 from abc import abstractmethod
 from datetime import timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, TYPE_CHECKING
+from typing import Dict, List, Optional, Set, TYPE_CHECKING
 from .clibbids import Entity  # type: ignore
 from .event import Event
 from .instruments import Instrument
@@ -65,15 +65,20 @@ class Task(Entity):
         notes: Notes = Notes(self)
         notes.add_note(run_id, note_data)
 
-    def add_run(self) -> Run:
+    def add_run(self, **kwargs) -> Run:
         """Create a run associated with this taks for the current session
 
+        Parameters
+        ----------
+        kwargs : Dict
+            Keyword arguments passed on to the `Run` constructor
+
         Returns
         -------
         Run
             A run object that can be used to start the session
         """
-        run: Run = Run(self)
+        run: Run = Run(self, **kwargs)
         self.on_new_run(run)
         return run
 
@@ -140,8 +145,15 @@ class Task(Entity):
 
     @property
     def n_runs(self) -> int:
+        """The number of runs recorded by the primary instrument, counted by
+        the files in its format, or the spools still to be converted to them"""
         pattern: str = (
-            self.id + "_run-[0-9]{" + str(self.padding) + "}.*\.edf"  # noqa: W605
+            self.id
+            + "_run-[0-9]{"
+            + str(self.padding)
+            + "}.*\\."
+            + re.escape(self.primary_instrument.file_ext)
+            + "(\\.spool)?$"
         )
         run_files: List[Path] = [
             f
@@ -155,5 +167,6 @@ class Task(Entity):
         run_matches: List[re.Match] = [
             m for m in run_matches_potential if m is not None
         ]
-        run_numbers: List[int] = [int(m.groups()[0]) for m in run_matches]
+        # A spool and the file converted from it may both exist for a moment
+        run_numbers: Set[int] = {int(m.groups()[0]) for m in run_matches}
         return len(run_numbers)
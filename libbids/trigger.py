@@ -0,0 +1,197 @@
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, TYPE_CHECKING, Tuple
+
+from .clock import Clock
+from .metrics import Histogram
+
+if TYPE_CHECKING:
+    from .event import Event
+    from .instruments.stim_instrument import StimInstrument
+
+
+class Trigger:
+    def __init__(
+        self,
+        time: float,
+        sample: int,
+        label: Optional[str] = None,
+        event: Optional["Event"] = None,
+    ):
+        """A trigger fired during a run
+
+        Parameters
+        ----------
+        time : float
+            When the trigger was fired, on the run's clock
+        sample : int
+            The number of samples the run had processed when the trigger was
+            fired. A triggered event begins at this sample
+        label : Optional[str]
+            A label for the trigger, such as the trial type of its event
+        event : Optional[Event]
+            The event the trigger begins. By default it begins the next event
+            of the run if that event waits for a trigger
+        """
+        self.time: float = time
+        self.sample: int = sample
+        self.label: Optional[str] = label
+        self.event: Optional["Event"] = event
+        # Set by the run once the trigger has been acted on
+        self.onset_time: Optional[float] = None
+        self.onset_sample: Optional[int] = None
+        self.forwarded_time: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "label": self.label,
+            "sample": self.sample,
+            "onset_sample": self.onset_sample,
+            "latency": self.latency,
+            "forward_latency": self.forward_latency,
+        }
+
+    @property
+    def forward_latency(self) -> Optional[float]:
+        """The time in seconds from firing the trigger until it was written to
+        every forwarding instrument"""
+        if self.forwarded_time is None:
+            return None
+        return self.forwarded_time - self.time
+
+    @property
+    def latency(self) -> Optional[float]:
+        """The time in seconds from firing the trigger until the run began its
+        event"""
+        if self.onset_time is None:
+            return None
+        return self.onset_time - self.time
+
+
+class TriggerChannel:
+    def __init__(self, clock: Clock, sample_fn: Callable[[], int]):
+        """Delivers triggers fired from any thread to the loop of a run. Firing
+        a trigger stamps it with the time and the run's sample count, wakes the
+        run loop from its wait strategy and writes the trigger to the
+        forwarding stim instruments on the firing thread, so that they receive
+        it within the latency of their device's write. The run begins the
+        triggered event before its next call to `Task.process`
+
+        Parameters
+        ----------
+        clock : Clock
+            The clock triggers are timed by
+        sample_fn : Callable[[], int]
+            Returns the number of samples the run has processed
+        """
+        self.clock: Clock = clock
+        self.sample_fn: Callable[[], int] = sample_fn
+        self.pending: Deque[Trigger] = deque()
+        self.triggers: List[Trigger] = []
+        self.targets: List[Tuple["StimInstrument", Optional[str], Optional[str]]] = []
+        self.wake: List[Callable[[], None]] = []
+        self.onset_latency: Histogram = Histogram()
+        self.forward_latency: Histogram = Histogram()
+
+    def fire(
+        self, label: Optional[str] = None, event: Optional["Event"] = None
+    ) -> Trigger:
+        """Fire a trigger. Safe to call from any thread
+
+        Parameters
+        ----------
+        label : Optional[str]
+            A label for the trigger, written to forwarding instruments that
+            were not given a command. Without a label, those instruments are
+            written their default, if they have one
+        event : Optional[Event]
+            The event the trigger begins
+
+        Returns
+        -------
+        Trigger
+            The trigger, whose latencies are filled in once it is acted on
+        """
+        trigger: Trigger = Trigger(self.clock.now(), self.sample_fn(), label, event)
+        self.triggers.append(trigger)
+        self.pending.append(trigger)
+        for wake in self.wake:
+            wake()
+        forwarded: bool = False
+        for instrument, command, default in self.targets:
+            written: Optional[str] = command
+            if written is None:
+                written = label if label is not None else default
+            if written is not None:
+                instrument.write(written)
+                forwarded = True
+        if forwarded:
+            trigger.forwarded_time = self.clock.now()
+            self.forward_latency.record(trigger.forwarded_time - trigger.time)
+        return trigger
+
+    def forward(
+        self,
+        instrument: "StimInstrument",
+        command: Optional[str] = None,
+        default: Optional[str] = None,
+    ) -> None:
+        """Write every trigger fired to a stim instrument
+
+        Parameters
+        ----------
+        instrument : StimInstrument
+            The instrument triggers are written to
+        command : Optional[str]
+            The command written. By default the trigger's label is written
+        default : Optional[str]
+            The command written for a trigger without a label when no command
+            is given. By default nothing is written for such triggers
+        """
+        self.targets.append((instrument, command, default))
+
+    def record_onset(self, trigger: Trigger, sample: int) -> None:
+        """Mark the event of a trigger as begun
+
+        Parameters
+        ----------
+        trigger : Trigger
+            The trigger
+        sample : int
+            The number of samples the run had processed when it began the event
+        """
+        trigger.onset_time = self.clock.now()
+        trigger.onset_sample = sample
+        self.onset_latency.record(trigger.onset_time - trigger.time)
+
+    def reset(self) -> None:
+        """Forget the triggers fired, at the start of a run"""
+        self.pending.clear()
+        self.triggers = []
+        self.onset_latency = Histogram()
+        self.forward_latency = Histogram()
+
+    def stats(self) -> Dict[str, Any]:
+        """Summarize the latencies of the triggers fired during the run
+
+        Returns
+        -------
+        Dict[str, Any]
+            Histograms of the time from firing a trigger until its event began
+            and until it was forwarded, and the stamps of every trigger
+        """
+        return {
+            "onset_latency": self.onset_latency.to_dict(),
+            "forward_latency": self.forward_latency.to_dict(),
+            "triggers": [trigger.to_dict() for trigger in self.triggers],
+        }
+
+    def take(self) -> Optional[Trigger]:
+        """Remove the oldest trigger that has not been acted on"""
+        try:
+            return self.pending.popleft()
+        except IndexError:
+            return None
+
+    @property
+    def has_pending(self) -> bool:
+        return len(self.pending) > 0
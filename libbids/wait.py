@@ -0,0 +1,239 @@
+import os
+import select
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional
+
+from .clock import Clock, MonotonicClock
+
+
+class WaitStrategy(ABC):
+    def __init__(self):
+        """A strategy for waiting until a device is expected to have new data,
+        so that acquisition loops do not spin at full CPU while polling. Every
+        strategy keeps metrics on how long it waited, how late it woke up and
+        how much CPU time the process used in the meantime. Deadlines are kept
+        on the strategy's `clock`"""
+        self.clock: Clock = MonotonicClock()
+        self.n_waits: int = 0
+        self.wait_time: float = 0.0
+        self.n_late: int = 0
+        self.total_latency: float = 0.0
+        self.max_latency: float = 0.0
+        self._interrupt: threading.Event = threading.Event()
+        self._cpu_start: Optional[float] = None
+        self._wall_start: float = 0.0
+
+    def interrupt(self) -> None:
+        """Wake up a thread that is waiting on this strategy"""
+        self._interrupt.set()
+
+    def metrics(self) -> Dict[str, float]:
+        """Summarize how the strategy has performed since its first wait
+
+        Returns
+        -------
+        Dict[str, float]
+            The number of waits, the total time spent waiting, the mean and
+            maximum wakeup latency in seconds, and the fraction of one core
+            used by the process
+        """
+        wall: float = time.perf_counter() - self._wall_start
+        cpu: float = (
+            0.0 if self._cpu_start is None else time.process_time() - self._cpu_start
+        )
+        return {
+            "waits": self.n_waits,
+            "wait_time": self.wait_time,
+            "mean_wakeup_latency": self.total_latency / max(self.n_late, 1),
+            "max_wakeup_latency": self.max_latency,
+            "cpu_fraction": cpu / wall if self._cpu_start is not None else 0.0,
+        }
+
+    def observe(self, n_samples: int) -> None:
+        """Inform the strategy of the number of samples a read returned
+
+        Parameters
+        ----------
+        n_samples : int
+            The number of samples in time returned by the read
+        """
+        pass
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Block until new data is expected, `timeout` elapses or the strategy
+        is interrupted
+
+        Parameters
+        ----------
+        timeout : Optional[float]
+            The maximum time in seconds to wait
+        """
+        if self._cpu_start is None:
+            self._cpu_start = time.process_time()
+            self._wall_start = time.perf_counter()
+        start: float = self.clock.now()
+        self._wait(timeout)
+        self._interrupt.clear()
+        self.n_waits += 1
+        self.wait_time += self.clock.now() - start
+
+    @abstractmethod
+    def _wait(self, timeout: Optional[float]) -> None:
+        raise Exception("Not Implemented")
+
+    def _record_latency(self, deadline: float) -> None:
+        latency: float = self.clock.now() - deadline
+        if latency > 0:
+            self.n_late += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def _sleep_until(self, deadline: float) -> None:
+        if deadline > self.clock.now():
+            self.clock.sleep_until(deadline, self._interrupt)
+            self._record_latency(deadline)
+
+
+class BusyWait(WaitStrategy):
+    """Never waits. Loops that use this strategy poll as fast as possible"""
+
+    def _wait(self, timeout: Optional[float]) -> None:
+        pass
+
+
+class CallbackWait(WaitStrategy):
+    def __init__(
+        self,
+        ready_fn: Callable[[Optional[float]], Any],
+        event: Optional[threading.Event] = None,
+    ):
+        """Waits on a readiness callback supplied by the device
+
+        Parameters
+        ----------
+        ready_fn : Callable[[Optional[float]], Any]
+            A function that blocks until the device has data ready or the
+            timeout, in seconds, elapses
+        event : Optional[threading.Event]
+            The event `ready_fn` blocks on, which is set to interrupt a wait.
+            If not supplied and `ready_fn` is the `wait` method of an event,
+            that event is used
+        """
+        super(CallbackWait, self).__init__()
+        self.ready_fn: Callable[[Optional[float]], Any] = ready_fn
+        if event is None and isinstance(
+            getattr(ready_fn, "__self__", None), threading.Event
+        ):
+            event = getattr(ready_fn, "__self__")
+        self.event: Optional[threading.Event] = event
+
+    def interrupt(self) -> None:
+        super(CallbackWait, self).interrupt()
+        if self.event is not None:
+            self.event.set()
+
+    def _wait(self, timeout: Optional[float]) -> None:
+        if not self._interrupt.is_set():
+            self.ready_fn(timeout)
+
+
+class FileDescriptorWait(WaitStrategy):
+    def __init__(self, fd: Any):
+        """Waits until a file descriptor supplied by the device is readable
+
+        Parameters
+        ----------
+        fd : Any
+            An integer file descriptor or an object with a `fileno` method,
+            such as a socket or serial port
+        """
+        super(FileDescriptorWait, self).__init__()
+        self.fd: Any = fd
+        # A self-pipe in the select set lets `interrupt` wake the wait
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+
+    def __del__(self):
+        self.close()
+
+    def close(self) -> None:
+        """Close the pipe used to interrupt waits"""
+        for fd in (self._wake_r, self._wake_w):
+            if fd >= 0:
+                os.close(fd)
+        self._wake_r = self._wake_w = -1
+
+    def interrupt(self) -> None:
+        super(FileDescriptorWait, self).interrupt()
+        try:
+            os.write(self._wake_w, b"\0")
+        except OSError:
+            # The pipe is already full or closed, either way nothing waits
+            pass
+
+    def _wait(self, timeout: Optional[float]) -> None:
+        if not self._interrupt.is_set():
+            select.select([self.fd, self._wake_r], [], [], timeout)
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+
+
+class AdaptiveSleepWait(WaitStrategy):
+    def __init__(
+        self,
+        sfreq: int,
+        block_size: Optional[int] = None,
+        lead: float = 0.1,
+        smoothing: float = 0.1,
+    ):
+        """Sleeps until the next block of samples is due, estimated from the
+        sampling rate and the number of samples the device delivers per block
+
+        Parameters
+        ----------
+        sfreq : int
+            The sampling rate of the device
+        block_size : Optional[int]
+            The expected number of samples per block. If not supplied, it is
+            learned from the reads that are observed
+        lead : float
+            The fraction of a block period to wake up before a block is due
+        smoothing : float
+            The weight given to each new observation when updating the block
+            size estimate
+        """
+        super(AdaptiveSleepWait, self).__init__()
+        self.sfreq: int = sfreq
+        self.block_size: float = float(block_size) if block_size else 0.0
+        self.lead: float = lead
+        self.smoothing: float = smoothing
+        self.due: float = 0.0
+
+    def observe(self, n_samples: int) -> None:
+        now: float = self.clock.now()
+        if n_samples <= 0:
+            # Woke up too early; check again after a fraction of a block
+            self.due = now + self.lead * self.period
+            return
+
+        if self.block_size == 0.0:
+            self.block_size = float(n_samples)
+        else:
+            self.block_size += self.smoothing * (n_samples - self.block_size)
+        self.due = now + (1.0 - self.lead) * self.period
+
+    def _wait(self, timeout: Optional[float]) -> None:
+        deadline: float = self.due
+        if timeout is not None:
+            deadline = min(deadline, self.clock.now() + timeout)
+        self._sleep_until(deadline)
+
+    @property
+    def period(self) -> float:
+        return self.block_size / self.sfreq
@@ -0,0 +1,357 @@
+#include <algorithm>
+#include <cerrno>
+#include <cmath>
+#include <cstring>
+#include <ctime>
+#include <stdexcept>
+
+#include "edf_encoder.hpp"
+
+namespace {
+
+char const* const kMonths[] = {"JAN", "FEB", "MAR", "APR", "MAY", "JUN",
+                               "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"};
+
+// A header field, truncated or padded with spaces to its width
+std::string field(std::string value, std::size_t width) {
+  value.resize(width, ' ');
+  return value;
+}
+
+// A number in as many significant digits as fit a header field
+std::string number_field(double value, std::size_t width) {
+  char buf[64];
+  for (int precision = static_cast<int>(width); precision > 0; --precision) {
+    std::snprintf(buf, sizeof(buf), "%.*g", precision, value);
+    if (std::strlen(buf) <= width) return field(buf, width);
+  }
+  return field("0", width);
+}
+
+// A signed time in seconds as written in a time-stamped annotation list
+std::string tal_seconds(double seconds) {
+  char buf[64];
+  std::snprintf(buf, sizeof(buf), "%+.6f", seconds);
+  std::string text(buf);
+  text.erase(text.find_last_not_of('0') + 1);
+  if (text.back() == '.') text.pop_back();
+  return text;
+}
+
+// Onsets are written relative to the start time in the header, which has no
+// fraction of a second, so they are shifted by the recording's subsecond start
+std::string annotation_tal(EdfAnnotation const& annotation, double subsecond) {
+  std::string tal = tal_seconds(annotation.onset + subsecond);
+  if (annotation.duration >= 0) {
+    tal += '\x15';
+    tal += tal_seconds(annotation.duration).substr(1);
+  }
+  tal += '\x14';
+  tal += annotation.description;
+  tal += '\x14';
+  tal += '\0';
+  return tal;
+}
+
+void seek(std::FILE* file, std::uint64_t offset, int origin) {
+#ifdef _WIN32
+  int result = _fseeki64(file, static_cast<__int64>(offset), origin);
+#else
+  int result = fseeko(file, static_cast<off_t>(offset), origin);
+#endif
+  if (result != 0) throw std::runtime_error(std::strerror(errno));
+}
+
+void write_bytes(std::FILE* file, char const* data, std::size_t size) {
+  if (std::fwrite(data, 1, size, file) != size) {
+    throw std::runtime_error(std::strerror(errno));
+  }
+}
+
+}  // namespace
+
+EdfEncoder::EdfEncoder(std::filesystem::path const& path, bool bdf,
+                       std::vector<EdfSignal> const& signals,
+                       double record_duration, std::string patient,
+                       std::string recording, int annotation_bytes)
+    : file_(nullptr),
+      bdf_(bdf),
+      signals_(signals),
+      record_duration_(record_duration),
+      patient_(patient),
+      recording_(recording),
+      sample_bytes_(bdf ? 3 : 2),
+      n_records_(0),
+      n_dropped_annotations_(0),
+      start_subsecond_(0.0) {
+  if (signals_.empty()) {
+    throw std::invalid_argument("An edf file needs at least one signal");
+  }
+  if (annotation_bytes < 48) {
+    throw std::invalid_argument("Annotations need at least 48 bytes a record");
+  }
+  // The annotation signal is made of whole samples
+  annotation_bytes_ =
+      (annotation_bytes + sample_bytes_ - 1) / sample_bytes_ * sample_bytes_;
+  header_bytes_ = 256 * (signals_.size() + 2);
+  record_bytes_ = annotation_bytes_;
+  for (auto const& signal : signals_) {
+    if (signal.physical_max == signal.physical_min ||
+        signal.digital_max <= signal.digital_min) {
+      throw std::invalid_argument("Invalid limits for signal " + signal.label);
+    }
+    double gain = (signal.digital_max - signal.digital_min) /
+                  (signal.physical_max - signal.physical_min);
+    gains_.push_back(gain);
+    offsets_.push_back(signal.digital_min - signal.physical_min * gain);
+    record_bytes_ += signal.samples_per_record * sample_bytes_;
+  }
+
+  std::time_t now = std::time(nullptr);
+  std::tm local{};
+#ifdef _WIN32
+  localtime_s(&local, &now);
+#else
+  localtime_r(&now, &local);
+#endif
+  set_start_fields(local);
+
+  file_ = std::fopen(path.string().c_str(), "wb+");
+  if (file_ == nullptr) {
+    throw std::runtime_error("Failed to open " + path.string() + ": " +
+                             std::strerror(errno));
+  }
+  write_header(false);
+}
+
+EdfEncoder::~EdfEncoder() {
+  try {
+    close();
+  } catch (...) {
+  }
+}
+
+void EdfEncoder::annotate(double onset, double duration,
+                          std::string const& description) {
+  // Leave room for the time-keeping annotation so that every annotation fits
+  // in a record
+  EdfAnnotation annotation{onset, duration, description};
+  std::size_t size = annotation_tal(annotation, start_subsecond_).size();
+  std::size_t room = static_cast<std::size_t>(annotation_bytes_) - 24;
+  if (size > room) {
+    annotation.description.resize(
+        description.size() - std::min(description.size(), size - room));
+  }
+  std::lock_guard<std::mutex> lock(pending_mutex_);
+  pending_.push_back(annotation);
+}
+
+void EdfEncoder::close(void) {
+  if (file_ == nullptr) return;
+
+  // Place annotations queued after the last record into records with room
+  std::size_t data_bytes = record_bytes_ - annotation_bytes_;
+  std::size_t record = 0;
+  std::lock_guard<std::mutex> lock(pending_mutex_);
+  while (!pending_.empty()) {
+    std::string tal = annotation_tal(pending_.front(), start_subsecond_);
+    pending_.pop_front();
+    while (record < n_records_ &&
+           annotation_used_[record] + tal.size() >
+               static_cast<std::size_t>(annotation_bytes_)) {
+      ++record;
+    }
+    if (record == n_records_) {
+      ++n_dropped_annotations_;
+      continue;
+    }
+    seek(file_,
+         header_bytes_ + record * record_bytes_ + data_bytes +
+             annotation_used_[record],
+         SEEK_SET);
+    write_bytes(file_, tal.data(), tal.size());
+    annotation_used_[record] += static_cast<std::uint16_t>(tal.size());
+  }
+
+  write_header(true);
+  std::fclose(file_);
+  file_ = nullptr;
+}
+
+void EdfEncoder::set_start(int year, int month, int day, int hour, int minute,
+                           int second, int microsecond) {
+  if (microsecond < 0 || microsecond >= 1000000) {
+    throw std::invalid_argument("The microsecond must be in [0, 1000000)");
+  }
+  std::tm start{};
+  start.tm_year = year - 1900;
+  start.tm_mon = month - 1;
+  start.tm_mday = day;
+  start.tm_hour = hour;
+  start.tm_min = minute;
+  start.tm_sec = second;
+  set_start_fields(start);
+  start_subsecond_ = microsecond / 1e6;
+  if (file_ != nullptr) write_header(false);
+}
+
+template <typename T>
+void EdfEncoder::write(std::vector<T const*> const& channels,
+                       std::vector<std::ptrdiff_t> const& strides,
+                       std::vector<std::size_t> const& lengths, bool digital) {
+  if (file_ == nullptr) throw std::runtime_error("The edf file is closed");
+  if (channels.size() != signals_.size() || strides.size() != signals_.size() ||
+      lengths.size() != signals_.size()) {
+    throw std::invalid_argument("Expected samples for every signal");
+  }
+
+  std::size_t spr0 = signals_[0].samples_per_record;
+  std::size_t n = (lengths[0] + spr0 - 1) / spr0;
+  if (n == 0) return;
+  buffer_.resize(n * record_bytes_);
+
+  for (std::size_t r = 0; r < n; ++r) {
+    char* out = buffer_.data() + r * record_bytes_;
+    for (std::size_t c = 0; c < signals_.size(); ++c) {
+      EdfSignal const& signal = signals_[c];
+      std::size_t spr = signal.samples_per_record;
+      std::size_t first = r * spr;
+      std::size_t available =
+          lengths[c] > first ? std::min(spr, lengths[c] - first) : 0;
+      std::ptrdiff_t stride = strides[c];
+      std::ptrdiff_t offset_index = static_cast<std::ptrdiff_t>(first) * stride;
+      double gain = digital ? 1.0 : gains_[c];
+      double offset = digital ? 0.0 : offsets_[c];
+      for (std::size_t i = 0; i < spr; ++i) {
+        std::ptrdiff_t index =
+            offset_index + static_cast<std::ptrdiff_t>(i) * stride;
+        double value =
+            i < available ? static_cast<double>(channels[c][index]) : 0.0;
+        double scaled = std::nearbyint(value * gain + offset);
+        int clamped = static_cast<int>(
+            std::clamp(scaled, static_cast<double>(signal.digital_min),
+                       static_cast<double>(signal.digital_max)));
+        write_sample(out, clamped);
+        out += sample_bytes_;
+      }
+    }
+    encode_annotations(out, n_records_ + r);
+  }
+
+  write_bytes(file_, buffer_.data(), buffer_.size());
+  n_records_ += n;
+}
+
+template void EdfEncoder::write<double>(std::vector<double const*> const&,
+                                        std::vector<std::ptrdiff_t> const&,
+                                        std::vector<std::size_t> const&, bool);
+template void EdfEncoder::write<std::int16_t>(
+    std::vector<std::int16_t const*> const&, std::vector<std::ptrdiff_t> const&,
+    std::vector<std::size_t> const&, bool);
+template void EdfEncoder::write<std::int32_t>(
+    std::vector<std::int32_t const*> const&, std::vector<std::ptrdiff_t> const&,
+    std::vector<std::size_t> const&, bool);
+
+bool EdfEncoder::bdf(void) const { return bdf_; }
+
+std::size_t EdfEncoder::n_dropped_annotations(void) const {
+  return n_dropped_annotations_;
+}
+
+std::size_t EdfEncoder::n_records(void) const { return n_records_; }
+
+std::size_t EdfEncoder::record_bytes(void) const { return record_bytes_; }
+
+void EdfEncoder::encode_annotations(char* slot, std::size_t record) {
+  std::memset(slot, 0, annotation_bytes_);
+  // The time-keeping annotation of the first record carries the fraction of a
+  // second at which the recording started
+  std::string tal =
+      tal_seconds(start_subsecond_ + record * record_duration_) + "\x14\x14";
+  tal += '\0';
+  std::memcpy(slot, tal.data(), tal.size());
+  std::size_t used = tal.size();
+
+  std::lock_guard<std::mutex> lock(pending_mutex_);
+  while (!pending_.empty()) {
+    std::string text = annotation_tal(pending_.front(), start_subsecond_);
+    if (used + text.size() > static_cast<std::size_t>(annotation_bytes_)) break;
+    std::memcpy(slot + used, text.data(), text.size());
+    used += text.size();
+    pending_.pop_front();
+  }
+  annotation_used_.push_back(static_cast<std::uint16_t>(used));
+}
+
+void EdfEncoder::set_start_fields(std::tm const& start) {
+  start_[0] = start.tm_year + 1900;
+  start_[1] = start.tm_mon + 1;
+  start_[2] = start.tm_mday;
+  start_[3] = start.tm_hour;
+  start_[4] = start.tm_min;
+  start_[5] = start.tm_sec;
+}
+
+void EdfEncoder::write_header(bool final) {
+  char buf[64];
+  std::string header;
+  header.reserve(header_bytes_);
+  header += field(bdf_ ? std::string("\xff") + "BIOSEMI" : "0", 8);
+  header += field(patient_, 80);
+  std::snprintf(buf, sizeof(buf), "Startdate %02d-%s-%04d ", start_[2],
+                kMonths[start_[1] - 1], start_[0]);
+  header += field(buf + recording_, 80);
+  std::snprintf(buf, sizeof(buf), "%02d.%02d.%02d", start_[2], start_[1],
+                start_[0] % 100);
+  header += field(buf, 8);
+  std::snprintf(buf, sizeof(buf), "%02d.%02d.%02d", start_[3], start_[4],
+                start_[5]);
+  header += field(buf, 8);
+  header += field(std::to_string(header_bytes_), 8);
+  header += field(bdf_ ? "BDF+C" : "EDF+C", 44);
+  header += field(final ? std::to_string(n_records_) : "-1", 8);
+  header += number_field(record_duration_, 8);
+  header += field(std::to_string(signals_.size() + 1), 4);
+
+  std::string annotation_label = bdf_ ? "BDF Annotations" : "EDF Annotations";
+  int annotation_min = bdf_ ? -8388608 : -32768;
+  int annotation_max = bdf_ ? 8388607 : 32767;
+  for (auto const& signal : signals_) header += field(signal.label, 16);
+  header += field(annotation_label, 16);
+  for (std::size_t i = 0; i <= signals_.size(); ++i) header += field("", 80);
+  for (auto const& signal : signals_) header += field(signal.dimension, 8);
+  header += field("", 8);
+  for (auto const& signal : signals_) {
+    header += number_field(signal.physical_min, 8);
+  }
+  header += number_field(-1, 8);
+  for (auto const& signal : signals_) {
+    header += number_field(signal.physical_max, 8);
+  }
+  header += number_field(1, 8);
+  for (auto const& signal : signals_) {
+    header += field(std::to_string(signal.digital_min), 8);
+  }
+  header += field(std::to_string(annotation_min), 8);
+  for (auto const& signal : signals_) {
+    header += field(std::to_string(signal.digital_max), 8);
+  }
+  header += field(std::to_string(annotation_max), 8);
+  for (auto const& signal : signals_) header += field(signal.prefilter, 80);
+  header += field("", 80);
+  for (auto const& signal : signals_) {
+    header += field(std::to_string(signal.samples_per_record), 8);
+  }
+  header += field(std::to_string(annotation_bytes_ / sample_bytes_), 8);
+  for (std::size_t i = 0; i <= signals_.size(); ++i) header += field("", 32);
+
+  seek(file_, 0, SEEK_SET);
+  write_bytes(file_, header.data(), header.size());
+  seek(file_, 0, SEEK_END);
+}
+
+void EdfEncoder::write_sample(char* out, int value) const {
+  out[0] = static_cast<char>(value & 0xff);
+  out[1] = static_cast<char>((value >> 8) & 0xff);
+  if (bdf_) out[2] = static_cast<char>((value >> 16) & 0xff);
+}
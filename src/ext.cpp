@@ -1,18 +1,62 @@
 #include <pybind11/complex.h>
+#include <pybind11/numpy.h>
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
 #include <pybind11/stl/filesystem.h>
 
+#include <cstdint>
 #include <memory>
+#include <vector>
 
 #include "add.hpp"
 #include "dataset.hpp"
+#include "edf_encoder.hpp"
 #include "entity.hpp"
 #include "session.hpp"
 #include "subject.hpp"
 
 namespace py = pybind11;
 
+namespace {
+
+// Write a (channels, time) array, or a list with one array per channel, as
+// samples of type T. The arrays are converted to T only if they are of
+// another type, and the GIL is released while encoding and writing
+template <typename T>
+void write_edf_samples(EdfEncoder& encoder, py::object const& data,
+                       bool digital) {
+  std::vector<py::array_t<T>> arrays;
+  std::vector<T const*> channels;
+  std::vector<std::ptrdiff_t> strides;
+  std::vector<std::size_t> lengths;
+  if (py::isinstance<py::array>(data) && data.cast<py::array>().ndim() == 2) {
+    auto array = py::array_t<T>::ensure(data);
+    if (!array) throw py::error_already_set();
+    for (py::ssize_t c = 0; c < array.shape(0); ++c) {
+      channels.push_back(array.data(c, 0));
+      strides.push_back(array.strides(1) / static_cast<py::ssize_t>(sizeof(T)));
+      lengths.push_back(array.shape(1));
+    }
+    arrays.push_back(array);
+  } else {
+    for (auto item : data) {
+      auto array = py::array_t<T>::ensure(item);
+      if (!array || array.ndim() != 1) {
+        throw py::value_error("Expected one array of samples per channel");
+      }
+      channels.push_back(array.data());
+      strides.push_back(array.strides(0) / static_cast<py::ssize_t>(sizeof(T)));
+      lengths.push_back(array.shape(0));
+      arrays.push_back(array);
+    }
+  }
+
+  py::gil_scoped_release release;
+  encoder.write(channels, strides, lengths, digital);
+}
+
+}  // namespace
+
 PYBIND11_MODULE(clibbids, m) {
   m.doc() = "Brain Imaging Data Structure";
   m.def("add", &add);
@@ -86,4 +130,62 @@ PYBIND11_MODULE(clibbids, m) {
       .def_property_readonly("participants_sidecar_filepath",
                              &Dataset::participants_sidecar_filepath)
       .def_property_readonly("participant_table", &Dataset::participant_table);
+
+  py::class_<EdfSignal>(m, "EdfSignal")
+      .def(py::init([](std::string label, std::string dimension,
+                       std::string prefilter, int samples_per_record,
+                       double physical_min, double physical_max,
+                       int digital_min, int digital_max) {
+             return EdfSignal{label,        dimension,    prefilter,
+                              samples_per_record, physical_min, physical_max,
+                              digital_min,  digital_max};
+           }),
+           py::arg("label"), py::arg("dimension"), py::arg("prefilter"),
+           py::arg("samples_per_record"), py::arg("physical_min"),
+           py::arg("physical_max"), py::arg("digital_min"),
+           py::arg("digital_max"))
+      .def_readwrite("label", &EdfSignal::label)
+      .def_readwrite("dimension", &EdfSignal::dimension)
+      .def_readwrite("prefilter", &EdfSignal::prefilter)
+      .def_readwrite("samples_per_record", &EdfSignal::samples_per_record)
+      .def_readwrite("physical_min", &EdfSignal::physical_min)
+      .def_readwrite("physical_max", &EdfSignal::physical_max)
+      .def_readwrite("digital_min", &EdfSignal::digital_min)
+      .def_readwrite("digital_max", &EdfSignal::digital_max);
+
+  py::class_<EdfEncoder>(m, "EdfEncoder")
+      .def(py::init<std::filesystem::path const&, bool,
+                    std::vector<EdfSignal> const&, double, std::string,
+                    std::string, int>(),
+           py::arg("path"), py::arg("bdf"), py::arg("signals"),
+           py::arg("record_duration"), py::arg("patient") = "X X X X",
+           py::arg("recording") = "X X X", py::arg("annotation_bytes") = 120)
+      .def("annotate", &EdfEncoder::annotate, py::arg("onset"),
+           py::arg("duration"), py::arg("description"))
+      .def("close", &EdfEncoder::close,
+           py::call_guard<py::gil_scoped_release>())
+      .def("set_start", &EdfEncoder::set_start, py::arg("year"),
+           py::arg("month"), py::arg("day"), py::arg("hour"),
+           py::arg("minute"), py::arg("second"), py::arg("microsecond") = 0)
+      .def(
+          "write",
+          [](EdfEncoder& self, py::object const& data, bool digital) {
+            if (!digital) return write_edf_samples<double>(self, data, false);
+            // Digital samples are encoded from int16 if that is what they
+            // are, and from int32 otherwise
+            py::dtype dtype =
+                py::isinstance<py::array>(data)
+                    ? data.cast<py::array>().dtype()
+                    : py::array::ensure(data.cast<py::sequence>()[0]).dtype();
+            if (dtype.kind() == 'i' && dtype.itemsize() == 2) {
+              return write_edf_samples<std::int16_t>(self, data, true);
+            }
+            write_edf_samples<std::int32_t>(self, data, true);
+          },
+          py::arg("data"), py::arg("digital") = false)
+      .def_property_readonly("bdf", &EdfEncoder::bdf)
+      .def_property_readonly("n_dropped_annotations",
+                             &EdfEncoder::n_dropped_annotations)
+      .def_property_readonly("n_records", &EdfEncoder::n_records)
+      .def_property_readonly("record_bytes", &EdfEncoder::record_bytes);
 }
@@ -0,0 +1,29 @@
+import pytest
+import shutil
+import tempfile
+
+from pathlib import Path
+
+from libbids import Dataset
+from libbids.clibbids import Session  # type: ignore
+
+
+@pytest.fixture
+def bids_root():
+    """A dataset directory with a single subject, described in the
+    participants table and its sidecar"""
+    root: Path = Path(tempfile.mkdtemp())
+    root.joinpath("sub-01").mkdir()
+    root.joinpath("participants.tsv").write_text("participant_id\tname\nsub-01\tJohn\n")
+    root.joinpath("participants.json").write_text(
+        '{"name": {"Description": "Name of participant"}}\n'
+    )
+    yield root
+    shutil.rmtree(root)
+
+
+@pytest.fixture
+def session(bids_root: Path) -> Session:
+    """The first session of the dataset's subject"""
+    dataset: Dataset = Dataset(bids_root, True)
+    return Session(dataset.get_subject(1), 1)
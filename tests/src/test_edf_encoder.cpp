@@ -0,0 +1,135 @@
+#include <cstdint>
+#include <filesystem>
+#include <fstream>
+#include <iterator>
+#include <string>
+#include <vector>
+
+#include "edf_encoder.hpp"
+#include "gtest/gtest.h"
+
+namespace {
+
+std::vector<EdfSignal> make_signals(bool bdf) {
+  int digital_min = bdf ? -8388608 : -32768;
+  int digital_max = bdf ? 8388607 : 32767;
+  return {{"Fp1", "uV", "", 4, -1000.0, 1000.0, digital_min, digital_max},
+          {"Fp2", "uV", "", 4, -1000.0, 1000.0, digital_min, digital_max}};
+}
+
+std::string read_file(std::filesystem::path const& path) {
+  std::ifstream file(path, std::ios::binary);
+  return std::string(std::istreambuf_iterator<char>(file), {});
+}
+
+int sample_at(std::string const& data, std::size_t offset, int sample_bytes) {
+  int value = 0;
+  for (int i = 0; i < sample_bytes; ++i) {
+    value |= static_cast<unsigned char>(data[offset + i]) << (8 * i);
+  }
+  // Sign extend
+  int shift = 32 - 8 * sample_bytes;
+  return static_cast<int>(static_cast<unsigned>(value) << shift) >> shift;
+}
+
+}  // namespace
+
+TEST(EdfEncoder, Header) {
+  std::filesystem::path path =
+      std::filesystem::temp_directory_path() / "test_edf_encoder_header.edf";
+  EdfEncoder encoder(path, false, make_signals(false), 0.5);
+  encoder.set_start(2024, 3, 5, 13, 7, 9);
+  std::vector<double> samples(8, 0.0);
+  std::vector<double const*> channels = {samples.data(), samples.data() + 4};
+  encoder.write<double>(channels, {1, 1}, {4, 4}, false);
+  encoder.close();
+  EXPECT_EQ(encoder.n_records(), 1u);
+
+  std::string data = read_file(path);
+  EXPECT_EQ(data.substr(0, 8), "0       ");
+  EXPECT_EQ(data.substr(88, 21), "Startdate 05-MAR-2024");
+  EXPECT_EQ(data.substr(168, 16), "05.03.2413.07.09");
+  EXPECT_EQ(data.substr(184, 8), "1024    ");
+  EXPECT_EQ(data.substr(192, 5), "EDF+C");
+  EXPECT_EQ(data.substr(236, 8), "1       ");
+  EXPECT_EQ(data.substr(244, 8), "0.5     ");
+  EXPECT_EQ(data.substr(256 + 32, 15), "EDF Annotations");
+  EXPECT_EQ(data.size(), 1024 + encoder.record_bytes());
+  std::filesystem::remove(path);
+}
+
+TEST(EdfEncoder, Samples) {
+  for (bool bdf : {false, true}) {
+    std::filesystem::path path = std::filesystem::temp_directory_path() /
+                                 "test_edf_encoder_samples.edf";
+    EdfEncoder encoder(path, bdf, make_signals(bdf), 1.0);
+    int sample_bytes = bdf ? 3 : 2;
+    int digital_max = bdf ? 8388607 : 32767;
+
+    // Digital samples are written as they are, with the trailing partial
+    // record padded
+    std::vector<std::int32_t> samples = {1, 2, 3, 4, 5, -1, -2, -3, -4, -5};
+    std::vector<std::int32_t const*> channels = {samples.data(),
+                                                 samples.data() + 5};
+    encoder.write<std::int32_t>(channels, {1, 1}, {5, 5}, true);
+    // Physical samples are scaled to the digital range
+    std::vector<double> physical = {1000.0, -1000.0, 5000.0, 0.0,
+                                    0.0,    0.0,     0.0,    0.0};
+    std::vector<double const*> rows = {physical.data(), physical.data() + 4};
+    encoder.write<double>(rows, {1, 1}, {4, 4}, false);
+    encoder.annotate(0.25, -1, "stimulus");
+    encoder.close();
+    EXPECT_EQ(encoder.n_records(), 3u);
+
+    std::string data = read_file(path);
+    std::size_t header_bytes = 256 * 4;
+    std::size_t record_bytes = encoder.record_bytes();
+    EXPECT_EQ(sample_at(data, header_bytes, sample_bytes), 1);
+    EXPECT_EQ(sample_at(data, header_bytes + 4 * sample_bytes, sample_bytes),
+              -1);
+    std::size_t second = header_bytes + record_bytes;
+    EXPECT_EQ(sample_at(data, second, sample_bytes), 5);
+    EXPECT_EQ(sample_at(data, second + sample_bytes, sample_bytes), 0);
+    std::size_t third = header_bytes + 2 * record_bytes;
+    EXPECT_EQ(sample_at(data, third, sample_bytes), digital_max);
+    EXPECT_EQ(sample_at(data, third + 2 * sample_bytes, sample_bytes),
+              digital_max);
+
+    // Each record starts its annotations with its onset, and the annotation
+    // queued after the last record is placed in the first with room
+    std::size_t annotations = 2 * 4 * sample_bytes;
+    EXPECT_EQ(data.substr(header_bytes + annotations, 4), "+0\x14\x14");
+    EXPECT_EQ(data.substr(second + annotations, 4), "+1\x14\x14");
+    EXPECT_NE(data.substr(header_bytes + annotations, 40).find("stimulus"),
+              std::string::npos);
+    std::filesystem::remove(path);
+  }
+}
+
+TEST(EdfEncoder, SubsecondStart) {
+  std::filesystem::path path = std::filesystem::temp_directory_path() /
+                               "test_edf_encoder_subsecond.edf";
+  EdfEncoder encoder(path, false, make_signals(false), 1.0);
+  encoder.set_start(2024, 3, 5, 13, 7, 9, 250000);
+  encoder.annotate(0.5, -1, "go");
+  std::vector<double> samples(8, 0.0);
+  std::vector<double const*> channels = {samples.data(), samples.data() + 4};
+  encoder.write<double>(channels, {1, 1}, {4, 4}, false);
+  encoder.write<double>(channels, {1, 1}, {4, 4}, false);
+  encoder.close();
+  EXPECT_THROW(encoder.set_start(2024, 3, 5, 13, 7, 9, 1000000),
+               std::invalid_argument);
+
+  // The header keeps whole seconds, and the time-keeping annotations and
+  // annotation onsets are shifted by the fraction of a second
+  std::string data = read_file(path);
+  std::size_t header_bytes = 256 * 4;
+  std::size_t annotations = 2 * 4 * 2;
+  EXPECT_EQ(data.substr(168, 16), "05.03.2413.07.09");
+  EXPECT_EQ(data.substr(header_bytes + annotations, 7), "+0.25\x14\x14");
+  EXPECT_EQ(data.substr(header_bytes + encoder.record_bytes() + annotations, 7),
+            "+1.25\x14\x14");
+  EXPECT_NE(data.substr(header_bytes + annotations, 40).find("+0.75\x14go"),
+            std::string::npos);
+  std::filesystem::remove(path);
+}
@@ -0,0 +1,113 @@
+import threading
+import time
+
+import numpy as np  # type: ignore
+
+from typing import Any, List, Optional
+
+from libbids.acquisition import AcquisitionEngine
+
+
+class FakeReader:
+    def __init__(self, filename: str, n_blocks: int, block_size: int = 4):
+        self.filename: str = filename
+        self.acquisition: Optional[AcquisitionEngine] = None
+        self.block_size: int = block_size
+        self.n_blocks: int = n_blocks
+        self.n_read: int = 0
+        self.n_calls: int = 0
+        self.wait_strategy: Optional[Any] = None
+        self.stored: List[np.ndarray] = []
+        self.exhausted: threading.Event = threading.Event()
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        if self.n_read >= self.n_blocks:
+            self.exhausted.set()
+
+    def device_read(self) -> np.ndarray:
+        self.n_calls += 1
+        if self.n_read >= self.n_blocks:
+            return np.zeros((1, 0))
+        start: int = self.n_read * self.block_size
+        self.n_read += 1
+        return np.arange(start, start + self.block_size, dtype=float).reshape(1, -1)
+
+    def store(self, block: Any) -> None:
+        self.stored.append(block)
+
+
+class TestAcquisitionEngine:
+    def make_engine(self, readers: List[FakeReader], **kwargs) -> AcquisitionEngine:
+        return AcquisitionEngine(readers, poll_timeout=0.01, **kwargs)  # type: ignore
+
+    def collect_all(self, engine: AcquisitionEngine, ins: FakeReader) -> np.ndarray:
+        return np.hstack(engine.collect(ins))  # type: ignore
+
+    def test_start_drain_collect_stop(self) -> None:
+        primary: FakeReader = FakeReader("primary", 5)
+        engine: AcquisitionEngine = self.make_engine([primary])
+
+        engine.start()
+        assert primary.acquisition is engine
+        assert primary.exhausted.wait(5.0)
+        engine.stop()
+
+        samples: np.ndarray = self.collect_all(engine, primary)
+        assert np.array_equal(samples[0], np.arange(20, dtype=float))
+        assert np.array_equal(np.hstack(primary.stored)[0], np.arange(20, dtype=float))
+        assert primary.acquisition is None
+        stats = engine.stats()["primary"]
+        assert stats["blocks_written"] == stats["blocks_read"]
+        assert stats["overruns"] == 0
+
+    def test_primary_blocks_before_first_collect_are_delivered(self) -> None:
+        primary: FakeReader = FakeReader("primary", 3)
+        other: FakeReader = FakeReader("other", 3)
+        engine: AcquisitionEngine = self.make_engine([primary, other])
+
+        engine.start()
+        assert primary.exhausted.wait(5.0) and other.exhausted.wait(5.0)
+        # Give the writer time to store every block before anything is collected
+        deadline: float = time.perf_counter() + 5.0
+        while time.perf_counter() < deadline and (
+            len(primary.stored) < 3 or len(other.stored) < 3
+        ):
+            time.sleep(0.001)
+        engine.stop()
+
+        # Every block the primary instrument wrote counts toward the run's clock
+        assert self.collect_all(engine, primary).shape[-1] == 12
+        assert np.hstack(other.stored).shape[-1] == 12
+        # The other instrument is only delivered to once it has been collected
+        assert engine.collect(other) == []  # type: ignore
+
+    def test_reader_error_is_raised(self) -> None:
+        class FailingReader(FakeReader):
+            def device_read(self) -> np.ndarray:
+                raise RuntimeError("device lost")
+
+        failing: FailingReader = FailingReader("failing", 1)
+        engine: AcquisitionEngine = self.make_engine([failing])
+        engine.start()
+        try:
+            engine.stop()
+        except RuntimeError as e:
+            assert str(e) == "device lost"
+        else:
+            assert False, "The reader's error should be raised on stop"
+
+    def test_empty_reads_are_not_queued(self) -> None:
+        reader: FakeReader = FakeReader("reader", 2)
+        engine: AcquisitionEngine = self.make_engine([reader], idle_wait=0.01)
+
+        engine.start()
+        assert reader.exhausted.wait(5.0)
+        time.sleep(0.1)
+        engine.stop()
+
+        # The reader backed off between empty reads instead of spinning
+        assert reader.n_calls < 30
+        stats = engine.stats()["reader"]
+        assert stats["blocks_read"] == stats["blocks_written"] == 2
+        assert stats["max_queue_depth"] <= 2 and stats["overruns"] == 0
+        assert len(self.collect_all(engine, reader)[0]) == 8
@@ -0,0 +1,69 @@
+import json
+import numpy as np  # type: ignore
+import pytest
+import shutil
+import tempfile
+
+from pathlib import Path
+from typing import Dict, Optional
+
+from libbids.alignment import ClockFit, ClockTrace, write_alignment
+
+
+def make_trace(
+    sfreq: float, true_sfreq: float, start: float, seconds: float, latency: float
+) -> ClockTrace:
+    rng: np.random.Generator = np.random.default_rng(0)
+    trace: ClockTrace = ClockTrace(sfreq, capacity=4)
+    n: int = 0
+    while n < seconds * sfreq:
+        block: int = int(rng.integers(5, 30))
+        n += block
+        # A block is read some time after its last sample was taken
+        trace.record(start + (n - 1) / true_sfreq + rng.exponential(latency), block)
+    trace.record(start + seconds, 0)
+    return trace
+
+
+class TestAlignment:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.test_dir: Path = Path(tempfile.mkdtemp())
+        yield
+        shutil.rmtree(self.test_dir)
+
+    def test_fit_recovers_drift(self) -> None:
+        trace: ClockTrace = make_trace(1000, 1000 * (1 + 50e-6), 1e5, 60, 1e-4)
+        assert trace.n_blocks > 1000
+        fit: Optional[ClockFit] = trace.fit()
+        assert fit is not None
+        assert abs(fit.drift_ppm - 50) < 2
+        assert abs(fit.start - 1e5) < 1e-5
+        assert fit.latency < 2e-4 < fit.max_latency
+        assert np.allclose(fit.to_index(fit.to_time(np.arange(10))), np.arange(10))
+
+        trace.reset()
+        assert trace.fit() is None
+
+    def test_mapping_to_primary(self) -> None:
+        primary: ClockFit = ClockFit(10.0, 1 / 1000, 1000, 100, 0.0, 0.0)
+        other: ClockFit = ClockFit(10.5, 1 / 250.01, 250, 100, 0.0, 0.0)
+        scale, offset = other.mapping_to(primary)
+        # Sample 250 of the other device was taken 0.5 s after it started
+        indices: np.ndarray = offset + scale * np.array([0, 250.01])
+        assert np.allclose(indices, [500, 1500])
+
+        fits: Dict[str, Optional[ClockFit]] = {
+            "eeg-0": primary,
+            "eeg-1": other,
+            "stim-2": None,
+        }
+        write_alignment(self.test_dir / "clocks.json", fits, "eeg-0", origin=10.0)
+        alignment = json.loads((self.test_dir / "clocks.json").read_text())
+        assert alignment["primary"] == "eeg-0"
+        assert list(alignment["instruments"]) == ["eeg-0", "eeg-1"]
+        assert alignment["instruments"]["eeg-1"]["start"] == 0.5
+        assert alignment["instruments"]["eeg-0"]["to_primary"] == {
+            "scale": 1.0,
+            "offset": 0.0,
+        }
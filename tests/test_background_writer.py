@@ -0,0 +1,88 @@
+import threading
+import numpy as np  # type: ignore
+
+from typing import List
+
+from libbids.enums import BackpressurePolicy
+from libbids.instruments.background_writer import BackgroundWriter
+
+
+class TestBackgroundWriter:
+    def test_spilled_blocks_are_written_in_order(self) -> None:
+        written: List[np.ndarray] = []
+        gate: threading.Event = threading.Event()
+
+        def write(data: np.ndarray) -> None:
+            gate.wait()
+            written.append(data.copy())
+
+        writer: BackgroundWriter = BackgroundWriter(write, 1, BackpressurePolicy.SPILL)
+        buffer: np.ndarray = np.zeros((2, 3))
+        for i in range(5):
+            buffer[:] = i
+            writer.submit(buffer)
+        gate.set()
+        writer.close()
+
+        assert [int(d[0, 0]) for d in written] == [0, 1, 2, 3, 4]
+        assert writer.n_spilled >= 3
+        assert writer.max_backlog >= 4
+
+    def test_drain_waits_for_every_block(self) -> None:
+        written: List[List[np.ndarray]] = []
+        writer: BackgroundWriter = BackgroundWriter(written.append, 2, "GROW")
+        for i in range(10):
+            writer.submit([np.full(4, i), np.full(1, i)])
+
+        writer.drain()
+
+        assert len(written) == 10
+        assert writer.n_written == 10
+        writer.close()
+
+    def test_records_are_counted(self) -> None:
+        written: List[np.ndarray] = []
+        writer: BackgroundWriter = BackgroundWriter(
+            written.append, 2, "GROW", records_fn=lambda data: data.shape[-1] // 10
+        )
+        for _ in range(3):
+            writer.submit(np.zeros((2, 30)))
+
+        writer.drain()
+
+        stats = writer.stats()
+        assert stats["written"] == 3
+        assert stats["queued_records"] == stats["written_records"] == 9
+        assert stats["backlog_records"] == 0
+        assert stats["max_backlog_records"] >= 3
+        writer.close()
+
+    def test_spill_does_not_hold_the_lock(self) -> None:
+        gate: threading.Event = threading.Event()
+        spilling: threading.Event = threading.Event()
+        writer: BackgroundWriter = BackgroundWriter(
+            lambda data: gate.wait(), 1, BackpressurePolicy.SPILL
+        )
+        spill_block = writer._spill_block
+
+        def slow_spill(data: np.ndarray):
+            spilling.set()
+            gate.wait()
+            return spill_block(data)
+
+        writer._spill_block = slow_spill  # type: ignore
+        writer.submit(np.zeros((2, 3)))
+        submitter: threading.Thread = threading.Thread(
+            target=writer.submit, args=(np.ones((2, 3)),), daemon=True
+        )
+        submitter.start()
+        assert spilling.wait(5.0)
+
+        # The writer's lock is free while the block is written to disk
+        assert writer._cond.acquire(timeout=1.0)
+        writer._cond.release()
+
+        gate.set()
+        submitter.join()
+        writer.close()
+        assert writer.n_spilled >= 1
@@ -0,0 +1,74 @@
+import importlib.util
+import json
+import pytest
+import shutil
+import sys
+import tempfile
+
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, List
+
+
+def load_benchmark() -> ModuleType:
+    path: Path = (
+        Path(__file__).parents[1].joinpath("benchmarks", "bench_acquisition.py")
+    )
+    spec = importlib.util.spec_from_file_location("bench_acquisition", path)
+    module: ModuleType = importlib.util.module_from_spec(spec)  # type: ignore
+    spec.loader.exec_module(module)  # type: ignore
+    return module
+
+
+# Smoke test for the acquisition benchmark, so that it does not break unnoticed
+class TestBenchAcquisition:
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch):
+        self.test_dir: Path = Path(tempfile.mkdtemp())
+        self.monkeypatch = monkeypatch
+        yield
+        shutil.rmtree(self.test_dir)
+
+    def run_main(self, *args: str) -> List[Dict[str, Any]]:
+        results: Path = self.test_dir.joinpath("results.json")
+        self.monkeypatch.setattr(
+            sys,
+            "argv",
+            ["bench_acquisition.py", "--json", str(results), *args],
+        )
+        load_benchmark().main()
+        return json.loads(results.read_text())
+
+    def test_main_runs_every_storage(self) -> None:
+        results: List[Dict[str, Any]] = self.run_main(
+            "--channels",
+            "2",
+            "--rates",
+            "100",
+            "--record-durations",
+            "0.25",
+            "--seconds",
+            "0.2",
+            "--storage",
+            "edf",
+            "bdf",
+            "brainvision",
+        )
+        assert [r["storage"] for r in results] == ["edf", "bdf", "brainvision"]
+        assert all(r["samples_per_s"] > 0 for r in results)
+        assert all(r["estimated_bytes_per_sample"] > 0 for r in results)
+
+    def test_main_spools(self) -> None:
+        results: List[Dict[str, Any]] = self.run_main(
+            "--channels",
+            "2",
+            "--rates",
+            "100",
+            "--record-durations",
+            "0.25",
+            "--seconds",
+            "0.2",
+            "--spool-duration",
+            "1",
+        )
+        assert len(results) == 1
@@ -0,0 +1,41 @@
+import threading
+import time
+
+from libbids.clock import MonotonicClock, VirtualClock
+from libbids.devices import SyntheticDevice
+from libbids.wait import AdaptiveSleepWait
+
+
+class TestClock:
+    def test_virtual_clock_sleep(self):
+        clock: VirtualClock = VirtualClock()
+        clock.sleep(5.0)
+        assert clock.now() == 5.0
+        clock.sleep_until(1.0)
+        assert clock.now() == 5.0
+        interrupt: threading.Event = threading.Event()
+        interrupt.set()
+        clock.sleep(1.0, interrupt)
+        assert clock.now() == 5.0
+
+    def test_monotonic_clock_interrupt(self):
+        clock: MonotonicClock = MonotonicClock()
+        interrupt: threading.Event = threading.Event()
+        threading.Timer(0.01, interrupt.set).start()
+        start: float = time.perf_counter()
+        clock.sleep(5.0, interrupt)
+        assert time.perf_counter() - start < 1.0
+
+    def test_device_on_virtual_clock(self):
+        clock: VirtualClock = VirtualClock()
+        device: SyntheticDevice = SyntheticDevice(2, 100, 10)
+        device.clock = clock
+        wait: AdaptiveSleepWait = AdaptiveSleepWait(100, 10, lead=0.0)
+        wait.clock = clock
+        start: float = time.perf_counter()
+        for _ in range(6000):
+            wait.wait()
+            wait.observe(device.read().shape[1])
+        # Ten minutes of samples without waiting in real time
+        assert time.perf_counter() - start < 10.0
+        assert abs(clock.now() - 600.0) < 1e-6
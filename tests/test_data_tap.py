@@ -0,0 +1,74 @@
+import tempfile
+import threading
+import numpy as np  # type: ignore
+
+from pathlib import Path
+from typing import List
+
+from libbids.enums import TapPolicy
+from libbids.instruments.data_tap import DataTap, TapBlock, TapClient
+
+
+class TestDataTap:
+    def test_blocks_carry_sample_index_and_timestamp(self) -> None:
+        tap: DataTap = DataTap()
+        received: List[TapBlock] = []
+        tap.subscribe(received.append)
+        buffer: np.ndarray = np.zeros((2, 5))
+        for i in range(3):
+            buffer[:] = i
+            tap.publish(buffer, float(i))
+        tap.close()
+
+        assert [b.sample_index for b in received] == [0, 5, 10]
+        assert [b.timestamp for b in received] == [0.0, 1.0, 2.0]
+        # Blocks are copies, so reusing the buffer does not change them
+        assert [int(b.samples[0, 0]) for b in received] == [0, 1, 2]
+        assert not received[0].samples.flags.writeable
+
+    def test_slow_subscribers_never_block_publishing(self) -> None:
+        tap: DataTap = DataTap(queue_size=2)
+        gate: threading.Event = threading.Event()
+        fast: List[TapBlock] = []
+        tap.subscribe(fast.append, queue_size=100)
+        dropping = tap.subscribe(lambda b: gate.wait(), policy=TapPolicy.DROP)
+        decimating = tap.subscribe(lambda b: gate.wait(), policy="DECIMATE")
+        disconnected = tap.subscribe(lambda b: gate.wait(), policy=TapPolicy.DISCONNECT)
+        for i in range(50):
+            tap.publish([np.zeros(4), np.zeros(2)], float(i))
+        gate.set()
+        tap.close()
+
+        assert len(fast) == 50
+        assert fast[-1].sample_index == 49 * 4
+        assert dropping.n_dropped >= 47
+        assert decimating.decimation > 1
+        assert decimating.n_skipped > 0
+        assert not disconnected.connected
+        assert disconnected not in tap.subscribers
+
+    def test_socket_subscriber(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path: Path = Path(tmpdir).joinpath("tap.sock")
+            tap: DataTap = DataTap()
+            tap.listen(path)
+            client: TapClient = TapClient(path)
+            while len(tap.subscribers) == 0:
+                threading.Event().wait(0.01)
+
+            data: np.ndarray = np.arange(12, dtype=np.int16).reshape(3, 4)
+            tap.publish(data, 1.5)
+            tap.publish([np.arange(4.0), np.arange(2.0)], 2.5)
+            tap.close()
+            blocks: List[TapBlock] = list(client)
+            client.close()
+
+        assert len(blocks) == 2
+        assert blocks[0].sample_index == 0
+        assert blocks[0].timestamp == 1.5
+        assert np.array_equal(blocks[0].samples, data)
+        assert blocks[0].samples.dtype == np.int16
+        assert blocks[1].sample_index == 4
+        assert isinstance(blocks[1].samples, list)
+        assert np.array_equal(blocks[1].samples[1], np.arange(2.0))
+        assert not path.exists()
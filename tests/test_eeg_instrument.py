@@ -0,0 +1,203 @@
+import numpy as np  # type: ignore
+import pytest
+
+from pathlib import Path
+from pyedflib import EdfReader  # type: ignore
+from typing import Any, Dict, List
+
+from libbids.clibbids import Session  # type: ignore
+from libbids.devices import SyntheticDevice
+from libbids.instruments import EEGInstrument
+from libbids.instruments.data_tap import TapBlock
+from libbids.instruments.pipeline import CommonAverageReference, Pipeline
+from libbids.instruments.preview import PreviewStream
+from libbids.instruments.storage import EDFBackend
+from libbids.wait import AdaptiveSleepWait
+
+
+class TestEEGInstrument:
+    @pytest.fixture(autouse=True)
+    def setup(self, bids_root: Path, session: Session):
+        self.root: Path = bids_root
+        self.session: Session = session
+
+    def make_instrument(self, **kwargs) -> EEGInstrument:
+        device: SyntheticDevice = SyntheticDevice(2, 100, 10, paced=False)
+        return EEGInstrument(
+            self.session,
+            device,
+            100,
+            ["C3", "C4"],
+            init_read_fn=device.start,
+            read_fn=device.read,
+            stop_fn=device.stop,
+            **kwargs,
+        )
+
+    def test_empty_reads_are_observed_as_no_samples(self):
+        reads: List[Any] = [None, [], np.ones((2, 5))]
+        wait: AdaptiveSleepWait = AdaptiveSleepWait(100, 10)
+        instrument: EEGInstrument = EEGInstrument(
+            self.session,
+            None,
+            100,
+            ["C3", "C4"],
+            read_fn=lambda: reads.pop(0),
+            wait_strategy=wait,
+        )
+
+        assert instrument.device_read().shape == (2, 0)
+        assert instrument.device_read().shape == (2, 0)
+        assert wait.block_size == 10.0
+        assert instrument.device_read().shape == (2, 5)
+        assert wait.block_size < 10.0
+
+    @pytest.mark.parametrize("dtype", [np.int16, np.int32])
+    def test_digital_round_trip(self, dtype):
+        # A ramp that runs past both digital limits, read in blocks that do
+        # not line up with the data records
+        data: np.ndarray = np.stack(
+            [np.arange(-1000, 1100, 10), np.arange(1000, -1100, -10)]
+        ).astype(dtype)
+        blocks: List[np.ndarray] = [data[:, i : i + 30] for i in range(0, 210, 30)]
+        instrument: EEGInstrument = EEGInstrument(
+            self.session,
+            None,
+            100,
+            ["C3", "C4"],
+            physical_lim=(-500.0, 500.0),
+            read_fn=lambda: blocks.pop(0),
+            is_digital=True,
+            dtype=dtype,
+            digital_lim=(-1000, 1000),
+            storage=EDFBackend(native=False),
+        )
+        instrument.start("task-test", "run-01")
+        for _ in range(6):
+            instrument.read()
+        instrument.read(remainder=True)
+        path: Path = instrument.filepath
+        instrument.stop()
+
+        # Samples beyond the digital limits are clipped to them
+        expected: np.ndarray = np.clip(data, -1000, 1000)
+        with EdfReader(str(path)) as reader:
+            assert reader.getDigitalMinimum(0) == -1000
+            assert reader.getDigitalMaximum(0) == 1000
+            for ch in range(2):
+                digital: np.ndarray = reader.readSignal(ch, digital=True)
+                physical: np.ndarray = reader.readSignal(ch)
+                assert np.array_equal(digital[:210], expected[ch])
+                assert np.allclose(physical[:210], expected[ch] / 2.0)
+
+    def test_stop_closes_the_pipeline(self):
+        instrument: EEGInstrument = self.make_instrument()
+        pipeline: Pipeline = instrument.set_pipeline(
+            [CommonAverageReference()], threaded=True, queue_size=64
+        )
+        for run in ["run-01", "run-02"]:
+            instrument.start("task-test", run)
+            assert pipeline.worker is not None
+            thread = pipeline.worker._thread
+            for _ in range(20):
+                instrument.read()
+            instrument.stop()
+
+            # Every block read was processed before the thread stopped
+            assert pipeline.worker is None and not thread.is_alive()
+            assert [r[0] for r in pipeline.collect()] == list(range(0, 200, 10))
+
+    def test_flush_does_not_publish(self):
+        instrument: EEGInstrument = self.make_instrument()
+        pipeline: Pipeline = instrument.set_pipeline([CommonAverageReference()])
+        instrument.start("task-test", "run-01")
+        instrument.flush()
+        assert pipeline.collect() == []
+        instrument.read()
+        assert [r[0] for r in pipeline.collect()] == [0]
+        instrument.stop()
+
+    def test_stop_detaches_previews(self):
+        instrument: EEGInstrument = self.make_instrument()
+        preview: PreviewStream = instrument.add_preview(50)
+        received: List[TapBlock] = []
+        subscriber = preview.tap.subscribe(received.append)
+        instrument.start("task-test", "run-01")
+        for _ in range(4):
+            instrument.read()
+        instrument.stop()
+
+        assert instrument.previews == ()
+        assert preview.tap.subscribers == ()
+        assert not subscriber.connected
+        assert sum(block.n_samples for block in received) == 20
+
+        # The next run does not publish to the closed preview
+        instrument.start("task-test", "run-02")
+        instrument.read()
+        instrument.stop()
+        assert preview.tap.n_blocks == len(received)
+
+    def test_quality_measures_the_records_written(self):
+        instrument: EEGInstrument = self.make_instrument(writer_queue_size=4)
+        quality = instrument.monitor_quality()
+        instrument.start("task-test", "run-01")
+        instrument.flush()
+        for _ in range(25):
+            instrument.read()
+        instrument.drain()
+        assert quality.n_records == 2
+        instrument.read(remainder=True)
+        path: Path = instrument.filepath
+        summary: Path = instrument.quality_path
+        instrument.stop()
+
+        # The summary is a derivative, not part of the raw recording
+        assert summary == self.root.joinpath(
+            "derivatives",
+            "quality",
+            "sub-01",
+            "ses-01",
+            "eeg",
+            path.stem + "_quality.tsv",
+        )
+        assert summary.exists() and not list(path.parent.glob("*_quality.tsv"))
+        assert self.root.joinpath(
+            "derivatives", "quality", "dataset_description.json"
+        ).exists()
+        assert quality.n_records == 3
+        with EdfReader(str(path)) as reader:
+            last: np.ndarray = reader.readSignal(0)[200:260]
+        assert np.isclose(quality.live[0, 0], last.std(), rtol=1e-3)
+
+    def test_background_writer_counts_records(self):
+        instrument: EEGInstrument = self.make_instrument(writer_queue_size=4)
+        instrument.start("task-test", "run-01")
+        instrument.flush()
+        for _ in range(25):
+            instrument.read()
+        instrument.drain()
+        stats: Dict[str, float] = instrument.background_writer.stats()  # type: ignore
+        assert stats["written_records"] == 2
+        assert stats["backlog_records"] == 0
+        instrument.stop()
+
+    def test_spool_is_converted_in_the_background(self):
+        instrument: EEGInstrument = self.make_instrument(spool_duration=1.0)
+        paths: List[Path] = []
+        starts: List[Any] = []
+        for run in ["run-01", "run-02"]:
+            instrument.start("task-test", run)
+            starts.append(instrument.spool.info.start)  # type: ignore
+            for _ in range(15):
+                instrument.read()
+            paths.append(instrument.filepath)
+            instrument.stop()
+
+        assert instrument.finish_conversions() == paths
+        assert instrument.conversions == []
+        for path, started in zip(paths, starts):
+            assert not path.with_name(path.name + ".spool").exists()
+            with EdfReader(str(path)) as reader:
+                assert reader.getNSamples()[0] == 200
+                assert reader.getStartdatetime() == started.replace(microsecond=0)
@@ -0,0 +1,81 @@
+import os
+import pytest
+import shutil
+import tempfile
+
+from pathlib import Path
+from typing import List
+
+from libbids.event import Event
+from libbids.event_log import EventLog
+
+
+class TestEventLog:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.path = self.test_dir / "sub-01_task-test_run-01_events.tsv"
+        self.logs: List[EventLog] = []
+
+        yield
+
+        # Release the files of logs left open to simulate a crash
+        for log in self.logs:
+            if log._journal is not None:
+                log._journal.close()
+                os.close(log._journal_fh)
+            if log._fh >= 0:
+                os.close(log._fh)
+        shutil.rmtree(self.test_dir)
+
+    def open_log(self, **kwargs) -> EventLog:
+        log: EventLog = EventLog(self.path, **kwargs)
+        log.open()
+        self.logs.append(log)
+        return log
+
+    def test_rows_are_flushed_in_batches(self) -> None:
+        log: EventLog = self.open_log(flush_every=2)
+
+        log.append(Event(0.0, 0.5, "a"))
+        assert self.path.read_text() == "onset\tduration\ttrial_type\n"
+
+        log.append(Event(0.5, 0.25, "b"))
+        log.append(Event(0.75, None, None))
+        assert self.path.read_text().splitlines()[1:] == ["0.0\t0.5\ta", "0.5\t0.25\tb"]
+
+        log.close()
+        assert self.path.read_text().splitlines()[-1] == "0.75\tNone\tNone"
+        assert not log.journal_path.exists()
+
+    def test_recover_completes_unflushed_rows(self) -> None:
+        log: EventLog = self.open_log(flush_every=2, capacity=1)
+        for i in range(3):
+            log.append(Event(float(i), 1.0, f"t{i}"))
+
+        # Simulate the process dying before the log is closed
+        assert EventLog.recover(self.path) == 1
+        assert self.path.read_text().splitlines()[1:] == [
+            "0.0\t1.0\tt0",
+            "1.0\t1.0\tt1",
+            "2.0\t1.0\tt2",
+        ]
+        assert not log.journal_path.exists()
+
+    def test_recover_after_crash_before_journal_commit(self) -> None:
+        log: EventLog = self.open_log(flush_every=2)
+        for i in range(3):
+            log.append(Event(float(i), 1.0, f"t{i}"))
+
+        # Simulate the process dying after the rows of the first flush were
+        # written but before the journal recorded them as flushed, with the
+        # next row only partly written
+        log.JOURNAL_HEADER.pack_into(log._journal, 0, log._journal_size, 0)
+        os.write(log._fh, b"2.0\t1.")
+
+        assert EventLog.recover(self.path) == 1
+        assert self.path.read_text().splitlines()[1:] == [
+            "0.0\t1.0\tt0",
+            "1.0\t1.0\tt1",
+            "2.0\t1.0\tt2",
+        ]
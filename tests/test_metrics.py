@@ -0,0 +1,40 @@
+import json
+import tempfile
+
+from pathlib import Path
+
+from libbids.metrics import Histogram, RunMetrics
+
+
+class TestMetrics:
+    def test_histogram_quantiles(self):
+        histogram: Histogram = Histogram()
+        for _ in range(99):
+            histogram.record(0.001)
+        histogram.record(1.0)
+        assert histogram.count == 100
+        assert histogram.min == 0.001
+        assert histogram.max == 1.0
+        assert 0.001 <= histogram.quantile(0.5) < 0.0013
+        assert histogram.quantile(1.0) == 1.0
+
+    def test_histogram_out_of_range(self):
+        histogram: Histogram = Histogram(low=1e-3, high=1.0)
+        histogram.record(0.0)
+        histogram.record(1000.0)
+        assert histogram.counts[0] == 1
+        assert histogram.counts[-1] == 1
+
+    def test_run_metrics_write(self):
+        metrics: RunMetrics = RunMetrics(100)
+        metrics.record_iteration(0.0, 0.001, 10)
+        metrics.record_iteration(0.1, 0.102, 10)
+        metrics.extra["start_skew"] = 0.0
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path: Path = Path(tmpdir).joinpath("metrics.json")
+            metrics.write(path)
+            data = json.loads(path.read_text())
+        assert data["task_process"]["count"] == 2
+        assert data["loop_jitter"]["count"] == 1
+        assert abs(data["loop_jitter"]["max"] - 0.001) < 1e-9
+        assert data["start_skew"] == 0.0
@@ -0,0 +1,87 @@
+import numpy as np  # type: ignore
+
+from typing import List, Tuple
+
+from libbids.instruments.pipeline import (
+    BandPower,
+    CommonAverageReference,
+    NotchFilter,
+    Pipeline,
+)
+
+
+def direct_biquad(x: np.ndarray, b: np.ndarray, a: np.ndarray) -> np.ndarray:
+    y: np.ndarray = np.zeros_like(x)
+    for k in range(x.shape[1]):
+        y[:, k] = b[0] * x[:, k] - a[1] * (y[:, k - 1] if k > 0 else 0)
+        if k > 0:
+            y[:, k] += b[1] * x[:, k - 1]
+        if k > 1:
+            y[:, k] += b[2] * x[:, k - 2] - a[2] * y[:, k - 2]
+    return y
+
+
+class TestPipeline:
+    def test_notch_does_not_depend_on_block_sizes(self) -> None:
+        x: np.ndarray = np.random.default_rng(0).normal(size=(4, 2000))
+        notch: NotchFilter = NotchFilter(50, harmonics=3, chunk_size=16)
+        notch.setup(4, 1000, np.dtype(np.float64))
+        expected: np.ndarray = x
+        for b, a in notch.sections:
+            expected = direct_biquad(expected, b, a)
+
+        rng: np.random.Generator = np.random.default_rng(1)
+        blocks: List[np.ndarray] = []
+        start: int = 0
+        while start < 2000:
+            n: int = int(rng.integers(1, 50))
+            blocks.append(notch.process(x[:, start : start + n]).copy())
+            start += n
+        assert np.allclose(np.hstack(blocks), expected, atol=1e-10)
+
+    def test_notch_removes_line_noise(self) -> None:
+        t: np.ndarray = np.arange(5000) / 1000
+        x: np.ndarray = np.vstack(
+            [np.sin(2 * np.pi * 50 * t), np.sin(2 * np.pi * 10 * t)]
+        )
+        notch: NotchFilter = NotchFilter(50)
+        notch.setup(2, 1000, np.dtype(np.float64))
+        y: np.ndarray = notch.process(x)
+        assert np.abs(y[0, 2000:]).max() < 1e-3
+        assert np.abs(y[1, 2000:]).max() > 0.99
+
+    def test_common_average_reference(self) -> None:
+        x: np.ndarray = np.arange(12, dtype=np.int16).reshape(3, 4)
+        car: CommonAverageReference = CommonAverageReference()
+        car.setup(3, 1000, x.dtype)
+        assert np.allclose(car.process(x), x - x.mean(axis=0))
+        car = CommonAverageReference([0])
+        car.setup(3, 1000, x.dtype)
+        assert np.allclose(car.process(x), x - x[0])
+
+    def test_band_power(self) -> None:
+        t: np.ndarray = np.arange(1000) / 1000
+        power: BandPower = BandPower(((8, 13), (13, 30)))
+        power.setup(1, 1000, np.dtype(np.float64))
+        out: np.ndarray = power.process(np.sin(2 * np.pi * 10 * t)[None])
+        # A unit sine has a power of one half
+        assert abs(out[0, 0] - 0.5) < 0.01
+        assert out[0, 1] < 0.01
+
+    def test_threaded_pipeline_keeps_raw_samples(self) -> None:
+        pipeline: Pipeline = Pipeline(
+            [CommonAverageReference(), NotchFilter(50)], 1000, threaded=True
+        )
+        x: np.ndarray = np.random.default_rng(0).normal(size=(3, 1000))
+        raw: np.ndarray = x.copy()
+        for start in range(0, 1000, 100):
+            pipeline.submit(x[:, start : start + 100], start / 1000)
+        pipeline.drain()
+        results: List[Tuple[int, float, np.ndarray]] = pipeline.collect()
+        pipeline.close()
+
+        assert np.array_equal(x, raw)
+        assert [r[0] for r in results] == list(range(0, 1000, 100))
+        assert [r[1] for r in results] == [s / 1000 for s in range(0, 1000, 100)]
+        assert pipeline.stats()["1.notch"]["count"] == 10
+        assert pipeline.collect() == []
@@ -0,0 +1,60 @@
+import numpy as np  # type: ignore
+
+from typing import List
+
+from libbids.instruments.data_tap import TapBlock
+from libbids.instruments.preview import (
+    PolyphaseDecimator,
+    PreviewStream,
+    lowpass_taps,
+)
+
+
+class TestPreview:
+    def test_decimation_does_not_depend_on_block_sizes(self) -> None:
+        taps: np.ndarray = lowpass_taps(8, 4)
+        x: np.ndarray = np.random.default_rng(0).normal(size=(3, 1000))
+        # Filtering the whole signal and keeping every 8th output, aligned with
+        # the end of each frame of 8 samples
+        expected: np.ndarray = np.array([np.convolve(c, taps)[:1000] for c in x])[
+            :, 7::8
+        ]
+
+        decimator: PolyphaseDecimator = PolyphaseDecimator(8, taps)
+        rng: np.random.Generator = np.random.default_rng(1)
+        blocks: List[np.ndarray] = []
+        start: int = 0
+        while start < 1000:
+            n: int = int(rng.integers(0, 30))
+            blocks.append(decimator.process(x[:, start : start + n]))
+            start += n
+        assert np.allclose(np.hstack(blocks), expected)
+
+    def test_lowpass_taps_reject_aliases(self) -> None:
+        taps: np.ndarray = lowpass_taps(10)
+        freqs: np.ndarray = np.fft.rfftfreq(1 << 14)
+        gain: np.ndarray = np.abs(np.fft.rfft(taps, 1 << 14))
+        # Everything that would alias into the decimated band is attenuated
+        assert gain[freqs > 0.06].max() < 1e-3
+        assert abs(gain[0] - 1) < 1e-9
+
+    def test_preview_stream(self) -> None:
+        preview: PreviewStream = PreviewStream(1000, 250, queue_size=100)
+        received: List[TapBlock] = []
+        preview.tap.subscribe(received.append)
+        t: np.ndarray = np.arange(2000) / 1000
+        signal: np.ndarray = np.vstack(
+            [np.sin(2 * np.pi * 10 * t), np.sin(2 * np.pi * 400 * t)]
+        )
+        for start in range(0, 2000, 100):
+            preview.process(signal[:, start : start + 100], start / 1000)
+        preview.close()
+
+        samples: np.ndarray = np.hstack([b.samples for b in received])
+        assert samples.shape == (2, 500)
+        assert samples.dtype == np.float32
+        assert [b.sample_index for b in received][:3] == [0, 25, 50]
+        # The 10 Hz channel passes, and the 400 Hz channel is filtered out
+        # rather than aliased to 100 Hz
+        assert np.abs(samples[0, 100:]).max() > 0.9
+        assert np.abs(samples[1, 100:]).max() < 1e-3
@@ -0,0 +1,66 @@
+import numpy as np  # type: ignore
+import pytest
+import shutil
+import tempfile
+
+from pathlib import Path
+
+from libbids.instruments.quality import SignalQualityMonitor
+
+
+class TestSignalQualityMonitor:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.test_dir: Path = Path(tempfile.mkdtemp())
+        yield
+        shutil.rmtree(self.test_dir)
+
+    def test_measures_each_record(self) -> None:
+        t: np.ndarray = np.arange(4500) / 1000
+        samples: np.ndarray = np.vstack(
+            [
+                100 + 10 * np.sin(2 * np.pi * 10 * t),
+                3 * np.sin(2 * np.pi * 50 * t),
+                np.full_like(t, 7.0),
+                np.clip(2000 * np.sin(2 * np.pi * t), -1000, 1000),
+            ]
+        )
+        monitor: SignalQualityMonitor = SignalQualityMonitor(
+            4, 1000, 1000, (-1000, 1000)
+        )
+        for start in range(0, 4500, 333):
+            monitor.process(samples[:, start : start + 333])
+        assert monitor.n_records == 4
+        monitor.finish()
+        assert monitor.n_records == 5
+
+        rms, clipping, flat, line_50, line_60 = monitor.live.T
+        assert np.allclose(rms[:3], [10 / np.sqrt(2), 3 / np.sqrt(2), 0])
+        assert clipping[3] > 0.6 and np.all(clipping[:3] == 0)
+        assert list(flat) == [0, 0, 1, 0]
+        # A sine of amplitude 3 has a power of 4.5
+        assert abs(line_50[1] - 4.5) < 1e-3
+        assert line_50[0] < 1e-9 and line_60[1] < 1e-6
+
+        monitor.write(self.test_dir / "quality.tsv", ["a", "b", "c", "d"])
+        rows = [
+            r.split("\t")
+            for r in (self.test_dir / "quality.tsv").read_text().splitlines()
+        ]
+        assert rows[0][:3] == ["name", "records", "rms_mean"]
+        assert [r[0] for r in rows[1:]] == ["a", "b", "c", "d"]
+        assert rows[3][rows[0].index("flat")] == "1"
+
+    def test_digital_samples_are_scaled(self) -> None:
+        samples: np.ndarray = np.tile(np.array([-100, 100], dtype=np.int16), (2, 50))
+        samples[1, :10] = 32767
+        monitor: SignalQualityMonitor = SignalQualityMonitor(
+            2, 100, 100, (-32768, 32767), gain=0.5, dtype=np.int16
+        )
+        monitor.process(samples)
+        assert np.allclose(monitor.live[0, 0], 50)
+        assert np.allclose(monitor.live[:, 1], [0, 0.1])
+
+        monitor.reset()
+        assert monitor.n_records == 0
+        assert np.all(np.isnan(monitor.live))
@@ -0,0 +1,73 @@
+import numpy as np  # type: ignore
+import pytest
+import tempfile
+import time
+
+from pathlib import Path
+from pyedflib import EdfWriter  # type: ignore
+from typing import List
+
+from libbids.devices import ReplayDevice
+
+
+class TestReplayDevice:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path: Path = Path(self.tmpdir.name).joinpath("sub-01_eeg.edf")
+        self.data: np.ndarray = np.tile(np.arange(200) % 100 - 50.0, (2, 1))
+        writer: EdfWriter = EdfWriter(str(self.path), 2)
+        for ch in range(2):
+            writer.setSignalHeader(
+                ch,
+                {
+                    "label": f"E{ch}",
+                    "dimension": "uV",
+                    "sample_frequency": 100,
+                    "physical_max": 100.0,
+                    "physical_min": -100.0,
+                    "digital_max": 32767,
+                    "digital_min": -32768,
+                },
+            )
+        writer.writeSamples(self.data)
+        writer.close()
+        yield
+        self.tmpdir.cleanup()
+
+    def test_replay(self):
+        device: ReplayDevice = ReplayDevice(self.path, block_sizes=[7, 13], speed=None)
+        assert device.sfreq == 100
+        assert device.electrodes == ["E0", "E1"]
+        blocks: List[np.ndarray] = []
+        while not device.exhausted:
+            blocks.append(device.read())
+        assert [b.shape[1] for b in blocks[:4]] == [7, 13, 7, 13]
+        assert np.allclose(np.hstack(blocks), self.data, atol=0.01)
+        assert device.read().shape == (2, 0)
+
+    def test_read_into(self):
+        device: ReplayDevice = ReplayDevice(self.path, block_size=64, speed=None)
+        out: np.ndarray = np.zeros((2, 256))
+        n: int = 0
+        while not device.exhausted:
+            n += device.read_into(out[:, n:])
+        assert n == 200
+        assert np.allclose(out[:, :n], self.data, atol=0.01)
+        assert device.read_into(out) == 0
+
+    def test_loop(self):
+        device: ReplayDevice = ReplayDevice(
+            self.path, block_size=150, speed=None, loop=True
+        )
+        data: np.ndarray = np.hstack([device.read(), device.read()])
+        assert np.allclose(data, np.hstack([self.data, self.data[:, :100]]), atol=0.01)
+
+    def test_speed(self):
+        device: ReplayDevice = ReplayDevice(self.path, block_size=50, speed=10.0)
+        device.start()
+        start: float = time.perf_counter()
+        for _ in range(4):
+            device.read()
+        # Two seconds of data at ten times real time
+        assert 0.2 <= time.perf_counter() - start < 1.0
@@ -0,0 +1,91 @@
+import numpy as np  # type: ignore
+
+from typing import List
+
+from libbids.instruments.ring_buffer import MultiRateRingBuffer, RingBuffer
+
+
+class TestRingBuffer:
+    def test_pop_returns_only_complete_records(self) -> None:
+        ring: RingBuffer = RingBuffer(2, 4, 3)
+        samples: np.ndarray = np.arange(20, dtype=float).reshape(2, 10)
+
+        assert ring.write(samples) == 10
+        views = ring.pop()
+
+        assert len(views) == 1
+        assert views[0].shape == (2, 8)
+        assert np.array_equal(views[0], samples[:, :8])
+        assert ring.size == 2
+
+    def test_write_wraps_and_pop_splits_at_boundary(self) -> None:
+        ring: RingBuffer = RingBuffer(2, 4, 3)
+        samples: np.ndarray = np.arange(40, dtype=float).reshape(2, 20)
+
+        ring.write(samples[:, :10])
+        ring.pop()
+        assert ring.write(samples[:, 10:20]) == 10
+        views = ring.pop()
+
+        assert [v.shape[1] for v in views] == [4, 8]
+        assert np.array_equal(np.hstack(views), samples[:, 8:20])
+
+    def test_write_stops_when_full(self) -> None:
+        ring: RingBuffer = RingBuffer(1, 2, 2)
+        samples: np.ndarray = np.arange(6, dtype=float).reshape(1, 6)
+
+        assert ring.write(samples) == 4
+        assert ring.free == 0
+        assert ring.pop()[0].shape == (1, 4)
+        assert ring.write(samples[:, 4:]) == 2
+
+    def test_partial_pop_empties_and_realigns(self) -> None:
+        ring: RingBuffer = RingBuffer(1, 4, 2)
+        samples: np.ndarray = np.arange(6, dtype=float).reshape(1, 6)
+
+        ring.write(samples)
+        views = ring.pop(partial=True)
+
+        assert np.array_equal(np.hstack(views), samples)
+        assert ring.size == 0
+        assert ring.head == 0
+
+    def test_reserve_and_commit_write_in_place(self) -> None:
+        ring: RingBuffer = RingBuffer(2, 4, 2)
+        ring.write(np.ones((2, 6)))
+        ring.pop()
+
+        # The free space wraps, so only the space up to the end is offered
+        view: np.ndarray = ring.reserve()
+        assert view.shape == (2, 2)
+        view[:] = 7.0
+        ring.commit(2)
+        assert ring.reserve().shape == (2, 4)
+        assert ring.n_complete == 1
+        assert np.array_equal(ring.pop()[0], np.array([[1.0, 1, 7, 7]] * 2))
+
+    def test_multirate_pops_matching_records_in_channel_order(self) -> None:
+        buffers: MultiRateRingBuffer = MultiRateRingBuffer([8, 2, 8], 0.5, 2)
+        ch_samples: List[np.ndarray] = [
+            np.arange(6, dtype=float),
+            np.arange(2, dtype=float) + 100,
+            np.arange(6, dtype=float) + 200,
+        ]
+
+        assert list(buffers.write(ch_samples)) == [2, 6]
+        chunks = buffers.pop()
+
+        assert len(chunks) == 1
+        assert [c.shape[0] for c in chunks[0]] == [4, 1, 4]
+        assert np.array_equal(chunks[0][0], ch_samples[0][:4])
+        assert np.array_equal(chunks[0][1], ch_samples[1][:1])
+        assert np.array_equal(chunks[0][2], ch_samples[2][:4])
+        assert list(buffers.sizes) == [1, 2]
+
+    def test_multirate_waits_for_every_rate(self) -> None:
+        buffers: MultiRateRingBuffer = MultiRateRingBuffer([8, 2], 0.5, 2)
+
+        buffers.write([np.zeros(8), np.zeros(0)])
+
+        assert buffers.pop() == []
+        assert [c.shape[0] for c in buffers.pop(partial=True)[0]] == [8, 0]
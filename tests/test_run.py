@@ -0,0 +1,291 @@
+import numpy as np  # type: ignore
+import pytest
+import threading
+import time
+
+from datetime import timedelta
+from pathlib import Path
+from pyedflib import EdfReader  # type: ignore
+from typing import List, Optional
+
+from libbids.clibbids import Session  # type: ignore
+from libbids.event import Event
+from libbids.clock import VirtualClock
+from libbids.devices import SyntheticDevice
+from libbids.instruments import EEGInstrument, Instrument, ReadInstrument
+from libbids.metrics import RunMetrics
+from libbids.run import Run
+from libbids.scheduler import EventScheduler
+from libbids.task import Task
+
+
+class FakeInstrument(Instrument):
+    def __init__(self, session: Session, setup: float = 0.0, fail: bool = False):
+        super(FakeInstrument, self).__init__(session, "EEG")
+        self.sfreqs: List[int] = [100]
+        self.setup: float = setup
+        self.fail: bool = fail
+
+    def start(self, task_id: str, run_id: str):
+        super(FakeInstrument, self).start(task_id, run_id)
+        time.sleep(self.setup)
+        if self.fail:
+            raise RuntimeError("device failed to start")
+        with self.synchronized_start():
+            pass
+
+    def stop(self):
+        super(FakeInstrument, self).stop()
+
+
+class FakeReadInstrument(ReadInstrument):
+    def __init__(self, session: Session, sfreqs: Optional[List[int]] = None):
+        super(FakeReadInstrument, self).__init__(session, "EEG")
+        if sfreqs is not None:
+            self.sfreqs = sfreqs
+
+    def flush(self) -> None:
+        pass
+
+    def start(self, task_id: str, run_id: str):
+        super(FakeReadInstrument, self).start(task_id, run_id)
+
+    def stop(self):
+        super(FakeReadInstrument, self).stop()
+
+    def read(self, remainder: bool = False) -> np.ndarray:
+        return np.zeros((1, 0))
+
+
+class FakeTask(Task):
+    def on_event_start(self, event: Event):
+        pass
+
+    def on_event_end(self, event: Event):
+        pass
+
+    def on_new_run(self, run: Run) -> None:
+        pass
+
+    def process(self, remainder: bool = False) -> np.ndarray:
+        return np.zeros((1, 0))
+
+
+class ReadingTask(FakeTask):
+    def process(self, remainder: bool = False) -> np.ndarray:
+        return self.primary_instrument.read(remainder)
+
+
+class TestRun:
+    @pytest.fixture(autouse=True)
+    def setup(self, bids_root: Path, session: Session):
+        self.root: Path = bids_root
+        self.session: Session = session
+        self.session.path.joinpath("eeg").mkdir(parents=True)
+
+    def make_run(
+        self,
+        instruments: List[Instrument],
+        events: Optional[List[Event]] = None,
+        **kwargs,
+    ) -> Run:
+        task: FakeTask = FakeTask(
+            self.session, "test", instruments, events or [], timedelta(seconds=1)
+        )
+        return task.add_run(**kwargs)
+
+    def start_events(self, run: Run) -> None:
+        run.initialize_event_file()
+        run.n_samples = 0
+        run.scheduler = EventScheduler(run.task.events, run.sfreq)
+        run.start_triggers()
+
+    def test_barrier_aligns_starts(self):
+        slow: FakeInstrument = FakeInstrument(self.session, setup=0.2)
+        fast: FakeInstrument = FakeInstrument(self.session)
+        run: Run = self.make_run([slow, fast], concurrent_lifecycle=True)
+
+        run.start_instruments()
+
+        assert slow.started_at is not None and fast.started_at is not None
+        assert run.start_skew < 0.1
+        assert slow.start_barrier is None and fast.start_barrier is None
+
+    def test_sequential_starts_are_skewed(self):
+        slow: FakeInstrument = FakeInstrument(self.session, setup=0.2)
+        fast: FakeInstrument = FakeInstrument(self.session)
+        run: Run = self.make_run([fast, slow])
+
+        run.start_instruments()
+
+        assert run.start_skew >= 0.2
+
+    def test_abort_releases_waiting_instruments(self):
+        waiting: FakeInstrument = FakeInstrument(self.session)
+        failing: FakeInstrument = FakeInstrument(self.session, setup=0.05, fail=True)
+        run: Run = self.make_run([waiting, failing], concurrent_lifecycle=True)
+
+        with pytest.raises(RuntimeError, match="failed to start"):
+            run.start_instruments()
+
+        assert waiting.started_at is None
+        assert waiting.start_barrier is None and failing.start_barrier is None
+        assert run.start_skew == 0.0
+
+    def test_started_at_is_reset_across_runs(self):
+        first: FakeInstrument = FakeInstrument(self.session)
+        second: FakeInstrument = FakeInstrument(self.session)
+        run: Run = self.make_run([first, second], concurrent_lifecycle=True)
+        run.start_instruments()
+        previous: float = first.started_at  # type: ignore
+
+        # While the next run waits at the barrier, the previous start time is
+        # no longer reported
+        second.setup = 0.1
+        seen: List[object] = []
+        checker: threading.Timer = threading.Timer(
+            0.05, lambda: seen.append(first.started_at)
+        )
+        checker.start()
+        self.make_run([first, second], concurrent_lifecycle=True).start_instruments()
+        checker.join()
+
+        assert seen == [None]
+        assert first.started_at is not None and first.started_at > previous
+
+    def test_trigger_begins_the_waiting_event(self):
+        waiting: Event = Event(None, None, "go", triggerable=True)
+        run: Run = self.make_run([FakeInstrument(self.session)], [waiting])
+        self.start_events(run)
+
+        run.n_samples = 30
+        trigger = run.trigger()
+        run.n_samples = 50
+        run.handle_triggers()
+
+        assert run.scheduler.current is waiting and waiting.trigger is trigger
+        assert waiting.onset == timedelta(seconds=0.3)
+        assert len(run.triggers.triggers) == 1
+        run.event_log.close()
+
+    def test_events_can_be_assigned(self):
+        first: Event = Event(0, 0.1, "rest")
+        run: Run = self.make_run([FakeInstrument(self.session)], [first])
+        self.start_events(run)
+        run.start_next_event()
+
+        later: Event = Event(0.5, 0.2, "go")
+        run.remaining_events = [later]
+        assert run.remaining_events == [later] and run.next_event is later
+        assert not run.is_next_event_ready()
+        run.n_samples = 50
+        assert run.is_next_event_ready()
+
+        inserted: Event = Event(None, 0.1, "cue")
+        run.n_samples = 20
+        run.current_event = inserted
+        assert run.current_event is inserted
+        assert inserted.onset == timedelta(seconds=0.2)
+        run.n_samples = 30
+        assert run.is_current_event_finished()
+
+        run.current_event = None
+        assert run.current_event is None and not run.is_current_event_finished()
+        run.event_log.close()
+
+    def test_onset_lag_is_measured_from_the_trigger(self):
+        first: Event = Event(0, 0.1, "rest")
+        second: Event = Event(0.2, None, "go", triggerable=True)
+        run: Run = self.make_run([FakeInstrument(self.session)], [first, second])
+        run.metrics = RunMetrics(run.sfreq)
+        self.start_events(run)
+        run.start_next_event()
+
+        run.n_samples = 30
+        second.set()
+        run.n_samples = 50
+        run.handle_triggers()
+
+        assert run.scheduler.current is second
+        assert len(run.triggers.triggers) == 1
+        lag = run.metrics.event_onset_lag
+        # The first event began on time
+        assert lag.count == 2 and abs(lag.max - 0.1) < 1e-9
+        run.event_log.close()
+
+    def test_clock_traces_skip_instruments_without_rates(self):
+        clocked: FakeReadInstrument = FakeReadInstrument(self.session, [100])
+        unclocked: FakeReadInstrument = FakeReadInstrument(self.session)
+        run: Run = self.make_run([clocked, unclocked], trace_clocks=True)
+
+        run.start_clock_traces()
+
+        assert clocked.clock_trace is not None
+        assert clocked.clock_trace.sfreq == 100
+        assert unclocked.clock_trace is None
+
+    def make_eeg(self, **kwargs) -> EEGInstrument:
+        device: SyntheticDevice = SyntheticDevice(2, 100, 10)
+        return EEGInstrument(
+            self.session,
+            device,
+            100,
+            ["C3", "C4"],
+            record_duration=0.5,
+            init_read_fn=device.start,
+            read_fn=device.read,
+            stop_fn=device.stop,
+            **kwargs,
+        )
+
+    def test_events_are_annotated_in_the_recording(self):
+        instrument: EEGInstrument = self.make_eeg()
+        events: List[Event] = [
+            Event(0, 0.5, "rest"),
+            Event(0.5, 0.25, "go"),
+            Event(0.75, 0.25, "stop"),
+        ]
+        task: ReadingTask = ReadingTask(
+            self.session, "test", [instrument], events, timedelta(seconds=1)
+        )
+        run: Run = task.add_run(clock=VirtualClock(), annotate_events=True)
+
+        run.start()
+
+        (path,) = self.session.path.joinpath("eeg").glob("*_eeg.edf")
+        with EdfReader(str(path)) as reader:
+            onsets, durations, descriptions = reader.readAnnotations()
+            assert reader.getNSamples()[0] >= 100
+        # The annotations match the events as they were recorded, which begin
+        # with the first block read at or after their onset
+        assert list(descriptions) == ["rest", "go", "stop"]
+        assert np.allclose(onsets, [0, 0.5, 0.8])
+        assert np.allclose(onsets, [e.onset.total_seconds() for e in events])
+        assert np.allclose(durations, [e.duration.total_seconds() for e in events])
+
+    @pytest.mark.parametrize(
+        "storage, spool_duration",
+        [("edf", None), ("bdf", None), ("brainvision", None), ("edf", 1.0)],
+    )
+    def test_runs_are_numbered_for_each_storage(self, storage, spool_duration):
+        instrument: EEGInstrument = self.make_eeg(
+            storage=storage, spool_duration=spool_duration
+        )
+        task: ReadingTask = ReadingTask(
+            self.session, "test", [instrument], [], timedelta(seconds=0.5)
+        )
+        for run_id in ["run-01", "run-02"]:
+            run: Run = task.add_run(clock=VirtualClock())
+            assert run.id == run_id
+            run.start()
+        instrument.finish_conversions()
+
+        ext: str = instrument.file_ext
+        files: List[str] = sorted(
+            f.name for f in self.session.path.joinpath("eeg").glob(f"*.{ext}")
+        )
+        assert files == [
+            f"sub-01_ses-01_task-test_{run_id}_eeg.{ext}"
+            for run_id in ["run-01", "run-02"]
+        ]
+        assert task.n_runs == 2
@@ -0,0 +1,40 @@
+from datetime import timedelta
+from typing import List
+
+from libbids.event import Event
+from libbids.scheduler import EventScheduler
+
+
+class TestEventScheduler:
+    def test_onsets_and_durations_round_up_to_samples(self) -> None:
+        events: List[Event] = [Event(0.1, 0.25, "a"), Event(None, None, "b")]
+
+        scheduler: EventScheduler = EventScheduler(events, 3)
+
+        assert scheduler.onsets == [1, -1]
+        assert scheduler.durations == [1, -1]
+
+    def test_timed_event_lifecycle(self) -> None:
+        events: List[Event] = [Event(0.5, 1.0, "a")]
+        scheduler: EventScheduler = EventScheduler(events, 100)
+
+        assert not scheduler.is_next_ready(49)
+        assert scheduler.is_next_ready(50)
+
+        event: Event = scheduler.start_next(52)
+        assert event.onset == timedelta(seconds=0.52)
+        assert not scheduler.has_next
+        assert not scheduler.is_current_finished(151)
+        assert scheduler.is_current_finished(152)
+
+        scheduler.end_current(160)
+        assert event.duration == timedelta(seconds=1.08)
+        assert scheduler.current is None
+
+    def test_untimed_event_waits_for_trigger(self) -> None:
+        events: List[Event] = [Event(None, None, "a", triggerable=True)]
+        scheduler: EventScheduler = EventScheduler(events, 100)
+
+        assert not scheduler.is_next_ready(1000)
+        events[0].set()
+        assert scheduler.is_next_ready(0)
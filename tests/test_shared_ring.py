@@ -0,0 +1,85 @@
+import multiprocessing
+import numpy as np  # type: ignore
+import pytest
+
+from libbids.instruments.shared_ring import SharedRing, SharedRingReader
+
+
+def read_latest(name: str, n: int, results: multiprocessing.Queue) -> None:
+    reader: SharedRingReader = SharedRingReader(name)
+    samples, start = reader.read(n)
+    results.put((samples, start))
+    reader.close()
+
+
+class TestSharedRing:
+    def test_windows_wrap_around_the_ring(self) -> None:
+        ring: SharedRing = SharedRing(2, 10, 100.0, np.int32)
+        data: np.ndarray = np.arange(2 * 37, dtype=np.int32).reshape(37, 2).T
+        for start in range(0, 37, 4):
+            ring.write(data[:, start : start + 4])
+
+        # The window crosses the end of the ring but is still a single view
+        window, start = ring.window(8)
+        assert start == 29
+        assert np.array_equal(window, data[:, 29:])
+        assert np.shares_memory(window, ring.data)
+        assert not window.flags.writeable
+
+        window, start = ring.window(3, end=30)
+        assert np.array_equal(window, data[:, 27:30])
+        assert ring.is_valid(27)
+        assert not ring.is_valid(26)
+        with pytest.raises(Exception):
+            ring.window(10, end=30)
+
+        ring.start_run()
+        ring.write(data[:, :15])
+        assert ring.run_start == 37
+        assert ring.head == 52
+        assert np.array_equal(ring.window(10)[0], data[:, 5:15])
+        ring.unlink()
+
+    def test_windows_must_hold_written_samples(self) -> None:
+        ring: SharedRing = SharedRing(2, 10, 100.0, np.int32)
+        data: np.ndarray = np.arange(2 * 6, dtype=np.int32).reshape(2, 6)
+        ring.write(data)
+
+        # Samples before the first are never read, however large the window
+        with pytest.raises(Exception, match="before the first sample"):
+            ring.window(8)
+        with pytest.raises(Exception, match="before the first sample"):
+            ring.window(3, end=2)
+        window, start = ring.last(1.0)
+        assert start == 0
+        assert np.array_equal(window, data)
+
+        ring.write(data)
+        ring.write(data)
+        with pytest.raises(Exception, match="overwritten"):
+            ring.window(3, end=7)
+        ring.unlink()
+
+    def test_write_rejects_mismatched_channels(self) -> None:
+        ring: SharedRing = SharedRing(2, 10, 100.0)
+        with pytest.raises(Exception, match="different numbers of samples"):
+            ring.write([np.zeros(4), np.zeros(2)])  # type: ignore
+        with pytest.raises(Exception, match="Expected 2 channels"):
+            ring.write(np.zeros((3, 4)))
+        ring.write([np.ones(4), np.ones(4)])  # type: ignore
+        assert np.array_equal(ring.window(4)[0], np.ones((2, 4)))
+        ring.unlink()
+
+    def test_reader_in_another_process(self) -> None:
+        ring: SharedRing = SharedRing(3, 100, 100.0)
+        data: np.ndarray = np.random.default_rng(0).normal(size=(3, 250))
+        ring.write(data)
+        context = multiprocessing.get_context("fork")
+        results: multiprocessing.Queue = context.Queue()
+        reader = context.Process(target=read_latest, args=(ring.shm.name, 50, results))
+        reader.start()
+        samples, start = results.get(timeout=10)
+        reader.join()
+        assert start == 200
+        assert np.array_equal(samples, data[:, -50:])
+        ring.unlink()
@@ -0,0 +1,149 @@
+import json
+import numpy as np  # type: ignore
+import pytest
+import tempfile
+
+from datetime import datetime
+from pathlib import Path
+from pyedflib import EdfReader  # type: ignore
+
+from libbids.enums import StorageFormat
+from libbids.instruments.spool import (
+    Spool,
+    SpoolInfo,
+    convert_spool,
+    recover_spools,
+)
+
+
+class TestSpool:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root: Path = Path(self.tmpdir.name)
+        self.metadata = {
+            "technician": "",
+            "recording_additional": "",
+            "patientname": "",
+            "patient_additional": "",
+            "patientcode": "",
+            "equipment": "",
+            "admincode": "",
+            "sex": "",
+            "startdate": datetime(2020, 1, 1),
+            "birthdate": "",
+        }
+        yield
+        self.tmpdir.cleanup()
+
+    def make_info(self, storage: StorageFormat, target: str) -> SpoolInfo:
+        return SpoolInfo(
+            self.root.joinpath(target),
+            storage,
+            ["Fp1", "Fp2", "Cz"],
+            100,
+            np.dtype(np.float64),
+            1.0,
+            False,
+            "uV",
+            (-1000.0, 1000.0),
+            (-32768, 32767),
+            "",
+            self.metadata,
+        )
+
+    def test_info_round_trip(self):
+        info: SpoolInfo = self.make_info(StorageFormat.BDF, "sub-01_eeg.bdf")
+        info.start = datetime(2020, 1, 1, 12, 30)
+        copy: SpoolInfo = SpoolInfo.from_dict(info.to_dict())
+        assert copy.storage == StorageFormat.BDF
+        assert copy.target == info.target
+        assert copy.start == info.start
+        assert copy.metadata["startdate"] == datetime(2020, 1, 1)
+
+    def test_start_is_written_with_the_info(self):
+        info: SpoolInfo = self.make_info(StorageFormat.EDF, "sub-01_eeg.edf")
+        self.metadata["equipment"] = np.str_("amp")
+        self.metadata["gain"] = np.float32(0.5)
+        self.metadata["calibrated"] = {"at": datetime(2020, 1, 1, 9)}
+        spool: Spool = Spool(self.root.joinpath("a.spool"), info)
+        info_path: Path = spool.path.joinpath("info.json")
+
+        spool.set_start(datetime(2020, 1, 1, 12, 30))
+        assert SpoolInfo.from_dict(json.loads(info_path.read_text())).start is None
+        spool.write_info()
+        copy: SpoolInfo = SpoolInfo.from_dict(json.loads(info_path.read_text()))
+        assert copy.start == datetime(2020, 1, 1, 12, 30)
+        assert copy.metadata["gain"] == 0.5
+        assert copy.metadata["calibrated"] == {"at": "2020-01-01T09:00:00"}
+        spool.close()
+
+    def test_append_and_reserve(self):
+        info: SpoolInfo = self.make_info(StorageFormat.EDF, "sub-01_eeg.edf")
+        spool: Spool = Spool(self.root.joinpath("a.spool"), info, chunk_duration=0.5)
+        data: np.ndarray = np.arange(3 * 170, dtype=np.float64).reshape(3, 170)
+        spool.append(data[:, :40], 0.0)
+        # Reserved space beyond the samples committed is reused by the next block
+        out: np.ndarray = spool.reserve(100)
+        out[:, :30] = data[:, 40:70]
+        spool.commit(30, 0.1)
+        spool.append(data[:, 70:], 0.2)
+        assert spool.n_samples == 170
+        assert spool.capacity >= 170
+        spool.close()
+
+        raw: np.ndarray = np.fromfile(self.root.joinpath("a.spool", "data.raw"))
+        assert np.array_equal(raw.reshape(-1, 3).T, data)
+        index: np.ndarray = np.fromfile(
+            self.root.joinpath("a.spool", "index.bin"), dtype=Spool.index_dtype
+        )
+        assert list(index["start"]) == [0, 40, 70]
+        assert list(index["n"]) == [40, 30, 100]
+
+    def test_convert_brainvision(self):
+        info: SpoolInfo = self.make_info(StorageFormat.BRAINVISION, "sub-01_eeg.vhdr")
+        spool: Spool = Spool(self.root.joinpath("a.spool"), info)
+        spool.set_start(datetime(2020, 1, 1, 12, 30))
+        data: np.ndarray = np.random.default_rng(0).normal(size=(3, 250))
+        for start in range(0, 250, 37):
+            spool.append(data[:, start : start + 37])
+        spool.annotate(1.5, 0.0, "stimulus")
+        spool.close()
+
+        assert convert_spool(spool.path) == info.target
+        assert not spool.path.exists()
+        samples: np.ndarray = np.fromfile(
+            info.target.with_suffix(".eeg"), dtype=np.float32
+        )
+        assert np.allclose(samples.reshape(-1, 3).T, data, atol=1e-6)
+        markers: str = info.target.with_suffix(".vmrk").read_text()
+        assert "Mk1=New Segment,,1,1,0,20200101123000000000" in markers
+        assert "Mk2=Comment,stimulus,151,1,0" in markers
+
+    def test_annotate_many(self):
+        info: SpoolInfo = self.make_info(StorageFormat.EDF, "sub-01_eeg.edf")
+        spool: Spool = Spool(self.root.joinpath("a.spool"), info)
+        spool.append(np.zeros((3, 200)))
+        spool.annotate_many([(0.5, 0.25, "go"), (1.5, 0.0, "stop")])
+        spool.close()
+
+        convert_spool(spool.path)
+        with EdfReader(str(info.target)) as reader:
+            onsets, _, descriptions = reader.readAnnotations()
+        assert list(onsets) == [0.5, 1.5]
+        assert list(descriptions) == ["go", "stop"]
+
+    def test_recover(self):
+        # A spool that is never closed, as if the process died mid-run, still
+        # holds every block it indexed
+        info: SpoolInfo = self.make_info(StorageFormat.EDF, "sub-01_eeg.edf")
+        spool: Spool = Spool(self.root.joinpath("a.spool"), info)
+        data: np.ndarray = np.linspace(-500, 500, 3 * 300).reshape(3, 300)
+        spool.append(data[:, :200])
+        spool.reserve(100)[...] = data[:, 200:]
+        spool.data.flush()
+
+        assert recover_spools(self.root) == [info.target]
+        with EdfReader(str(info.target)) as reader:
+            assert reader.getNSamples()[0] == 200
+            assert np.allclose(reader.readSignal(0), data[0, :200], atol=0.05)
@@ -0,0 +1,222 @@
+import numpy as np  # type: ignore
+import pytest
+import tempfile
+
+from datetime import datetime
+from pathlib import Path
+from pyedflib import EdfReader  # type: ignore
+from types import SimpleNamespace
+
+from libbids.enums import StorageFormat
+from libbids.instruments.storage import (
+    BDFBackend,
+    BrainVisionBackend,
+    EDFBackend,
+    EdfEncoder,
+    edf_plus_identification,
+    storage_backend,
+)
+
+
+class TestStorage:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.root: Path = Path(self.tmpdir.name)
+        self.instrument = SimpleNamespace(
+            sfreqs=[100],
+            record_duration=1.0,
+            electrodes=["Fp1", "Fp2", "Cz"],
+            physical_dimension="uV",
+            physical_lim=(-1000.0, 1000.0),
+            preamp_filter="",
+            is_digital=False,
+            dtype=np.dtype(np.float64),
+            metadata={
+                "technician": "",
+                "recording_additional": "",
+                "patientname": "",
+                "patient_additional": "",
+                "patientcode": "",
+                "equipment": "",
+                "admincode": "",
+                "sex": "",
+                "startdate": datetime(2020, 1, 1),
+                "birthdate": "",
+            },
+        )
+        yield
+        self.tmpdir.cleanup()
+
+    def test_storage_backend(self):
+        assert isinstance(storage_backend(StorageFormat.EDF), EDFBackend)
+        assert isinstance(storage_backend("bdf"), BDFBackend)
+        assert isinstance(storage_backend("BrainVision"), BrainVisionBackend)
+        backend: BrainVisionBackend = BrainVisionBackend()
+        assert storage_backend(backend) is backend
+
+    def test_edf_plus_identification(self):
+        self.instrument.metadata.update(
+            {"patientname": "Jane Doe", "sex": 0, "birthdate": datetime(1990, 2, 3)}
+        )
+        patient, recording = edf_plus_identification(self.instrument.metadata)
+        assert patient == "X F 03-FEB-1990 Jane_Doe"
+        assert recording == "X X X"
+
+    def test_bdf_digital(self):
+        backend: BDFBackend = BDFBackend(native=False)
+        self.instrument.is_digital = True
+        self.instrument.dtype = np.dtype(np.int32)
+        self.instrument.digital_lim = backend.default_digital_lim(np.dtype(np.int32))
+        data: np.ndarray = np.tile(np.arange(-100000, 100000, 1000), (3, 1))
+        path: Path = self.root.joinpath("sub-01_eeg.bdf")
+        backend.open(path, self.instrument)
+        backend.set_start(datetime(2020, 1, 1))
+        backend.write(data)
+        backend.close()
+        with EdfReader(str(path)) as reader:
+            assert reader.getDigitalMaximum(0) == 8388607
+            assert np.array_equal(reader.readSignal(2, digital=True), data[2])
+
+    def test_brainvision_physical(self):
+        backend: BrainVisionBackend = BrainVisionBackend()
+        self.instrument.digital_lim = (-32768, 32767)
+        path: Path = self.root.joinpath("sub-01_eeg.vhdr")
+        backend.open(path, self.instrument)
+        backend.set_start(datetime(2020, 1, 1, 12, 30))
+        data: np.ndarray = np.random.default_rng(0).normal(size=(3, 250))
+        # Blocks of any size may be written
+        for start in range(0, 250, 37):
+            backend.write(data[:, start : start + 37])
+        backend.annotate(1.5, 0.0, "stimulus")
+        backend.close()
+
+        header: str = path.read_text()
+        assert "DataFile=sub-01_eeg.eeg" in header
+        assert "SamplingInterval=10000" in header
+        assert "BinaryFormat=IEEE_FLOAT_32" in header
+        assert "Ch2=Fp2,,1,uV" in header
+        samples: np.ndarray = np.fromfile(path.with_suffix(".eeg"), dtype=np.float32)
+        assert np.allclose(samples.reshape(-1, 3).T, data, atol=1e-6)
+        markers: str = path.with_suffix(".vmrk").read_text()
+        assert "Mk1=New Segment,,1,1,0,20200101123000000000" in markers
+        assert "Mk2=Comment,stimulus,151,1,0" in markers
+
+    def test_brainvision_digital(self):
+        backend: BrainVisionBackend = BrainVisionBackend()
+        self.instrument.is_digital = True
+        self.instrument.dtype = np.dtype(np.int16)
+        self.instrument.digital_lim = backend.default_digital_lim(np.dtype(np.int16))
+        path: Path = self.root.joinpath("sub-01_eeg.vhdr")
+        backend.open(path, self.instrument)
+        data: np.ndarray = np.tile(np.arange(-500, 500, dtype=np.int16), (3, 1))
+        backend.write(data)
+        backend.close()
+
+        header: str = path.read_text()
+        assert "BinaryFormat=INT_16" in header
+        assert f"Ch1=Fp1,,{2000 / 65535:.10g},uV" in header
+        samples: np.ndarray = np.fromfile(path.with_suffix(".eeg"), dtype=np.int16)
+        assert np.array_equal(samples.reshape(-1, 3).T, data)
+
+    def test_edf_annotate_many(self):
+        backend: EDFBackend = EDFBackend(native=False)
+        self.instrument.digital_lim = (-32768, 32767)
+        path: Path = self.root.joinpath("sub-01_eeg.edf")
+        backend.open(path, self.instrument)
+        backend.set_start(datetime(2020, 1, 1))
+        backend.annotate_many([(0.5, 0.25, "go"), (1.5, 0.0, "stop")])
+        backend.write(np.zeros((3, 200)))
+        backend.close()
+        with EdfReader(str(path)) as reader:
+            onsets, durations, descriptions = reader.readAnnotations()
+        assert list(onsets) == [0.5, 1.5]
+        assert list(durations) == [0.25, 0.0]
+        assert list(descriptions) == ["go", "stop"]
+
+    def test_edf_requires_an_open_file(self):
+        backend: EDFBackend = EDFBackend(native=False)
+        assert backend.writer is None and backend.encoder is None
+        with pytest.raises(Exception, match="No edf file is open"):
+            backend.write(np.zeros((3, 100)))
+        with pytest.raises(Exception, match="No edf file is open"):
+            backend.close()
+
+        # Nor may the file be written to once it is closed
+        self.instrument.digital_lim = (-32768, 32767)
+        backend.open(self.root.joinpath("sub-01_eeg.edf"), self.instrument)
+        backend.write(np.zeros((3, 100)))
+        backend.close()
+        with pytest.raises(Exception, match="No edf file is open"):
+            backend.write(np.zeros((3, 100)))
+
+    def test_edf_subsecond_start_keeps_annotations(self):
+        backend: EDFBackend = EDFBackend(native=False)
+        self.instrument.digital_lim = (-32768, 32767)
+        self.instrument.metadata["startdate"] = datetime(2020, 1, 1, 12, 29, 0, 7)
+        path: Path = self.root.joinpath("sub-01_eeg.edf")
+        backend.open(path, self.instrument)
+        backend.set_start(datetime(2020, 1, 1, 12, 30, 0, 40))
+        backend.annotate(0.5, 0.25, "go")
+        backend.write(np.zeros((3, 100)))
+        backend.close()
+        with EdfReader(str(path)) as reader:
+            assert reader.getStartdatetime() == datetime(2020, 1, 1, 12, 30)
+            assert list(reader.readAnnotations()[0]) == [0.5]
+
+    def test_edf_native_is_opt_in(self):
+        assert not EDFBackend().native
+        assert not BDFBackend().native
+
+    @pytest.mark.skipif(EdfEncoder is None, reason="No native edf encoder")
+    @pytest.mark.parametrize("backend_type", [EDFBackend, BDFBackend])
+    def test_native_matches_pyedflib(self, backend_type):
+        self.instrument.digital_lim = backend_type().default_digital_lim(
+            np.dtype(np.float64)
+        )
+        data: np.ndarray = np.random.default_rng(0).uniform(-900, 900, (3, 250))
+        paths = []
+        for native in [False, True]:
+            backend: EDFBackend = backend_type(native=native)
+            path: Path = self.root.joinpath(f"native-{native}.{backend.file_ext}")
+            backend.open(path, self.instrument)
+            backend.set_start(datetime(2020, 1, 1, 12, 30, 5))
+            backend.annotate(0.5, 0.25, "go")
+            backend.write(data[:, :200])
+            backend.write(data[:, 200:])
+            backend.close()
+            paths.append(path)
+
+        with EdfReader(str(paths[0])) as expected, EdfReader(str(paths[1])) as actual:
+            assert actual.getStartdatetime() == expected.getStartdatetime()
+            assert actual.getSignalLabels() == expected.getSignalLabels()
+            assert actual.getNSamples().tolist() == expected.getNSamples().tolist()
+            for ch in range(3):
+                # The encoders may round physical values to opposite sides
+                difference: np.ndarray = actual.readSignal(
+                    ch, digital=True
+                ) - expected.readSignal(ch, digital=True)
+                assert np.abs(difference).max() <= 1
+                assert np.allclose(actual.readSignal(ch)[:250], data[ch], atol=0.1)
+            for a, e in zip(actual.readAnnotations(), expected.readAnnotations()):
+                assert list(a) == list(e)
+
+    @pytest.mark.skipif(EdfEncoder is None, reason="No native edf encoder")
+    def test_native_subsecond_start(self):
+        backend: EDFBackend = EDFBackend(native=True)
+        self.instrument.digital_lim = (-32768, 32767)
+        path: Path = self.root.joinpath("sub-01_eeg.edf")
+        backend.open(path, self.instrument)
+        backend.set_start(datetime(2020, 1, 1, 12, 30, 5, 250000))
+        backend.annotate(0.5, 0.0, "go")
+        backend.write(np.zeros((3, 200)))
+        backend.close()
+        with EdfReader(str(path)) as reader:
+            assert reader.getStartdatetime().replace(microsecond=0) == datetime(
+                2020, 1, 1, 12, 30, 5
+            )
+            # The fraction of a second, in units of 100 ns
+            assert reader.starttime_subsecond == 2500000
+            onsets, _, descriptions = reader.readAnnotations()
+        assert list(onsets) == [0.5]
+        assert list(descriptions) == ["go"]
@@ -0,0 +1,39 @@
+import numpy as np  # type: ignore
+import time
+
+from libbids.devices import SyntheticDevice
+
+
+class TestSyntheticDevice:
+    def test_read_blocks(self):
+        device: SyntheticDevice = SyntheticDevice(4, 256, 16, paced=False)
+        blocks = [device.read() for _ in range(32)]
+        assert all(block.shape == (4, 16) for block in blocks)
+        # The signal continues across blocks and repeats every second
+        data: np.ndarray = np.hstack(blocks)
+        assert np.allclose(data[:, :256], data[:, 256:])
+
+    def test_read_into(self):
+        device: SyntheticDevice = SyntheticDevice(4, 256, 16, paced=False)
+        reference: SyntheticDevice = SyntheticDevice(4, 256, 16, paced=False)
+        out: np.ndarray = np.zeros((4, 40))
+        assert device.read_into(out) == 16
+        assert device.read_into(out[:, 16:26]) == 10
+        assert np.array_equal(
+            out[:, :26], np.hstack([reference.read(), reference.read()])[:, :26]
+        )
+
+    def test_multirate_block_lengths(self):
+        device: SyntheticDevice = SyntheticDevice(2, [100, 30], 10, paced=False)
+        blocks = [device.read() for _ in range(10)]
+        assert all(len(block[0]) == 10 for block in blocks)
+        assert sum(len(block[1]) for block in blocks) == 30
+
+    def test_paced_read(self):
+        device: SyntheticDevice = SyntheticDevice(2, 1000, 50, jitter=0.001, seed=0)
+        device.start()
+        start: float = time.perf_counter()
+        for _ in range(4):
+            device.read()
+        assert time.perf_counter() - start >= 0.2
+        assert not device.ready(0.0)
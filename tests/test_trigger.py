@@ -0,0 +1,82 @@
+import pytest
+import threading
+
+from typing import List
+
+from libbids.clock import VirtualClock
+from libbids.event import Event
+from libbids.trigger import Trigger, TriggerChannel
+
+
+class RecordingStim:
+    def __init__(self, clock: VirtualClock):
+        self.clock: VirtualClock = clock
+        self.written: List[str] = []
+
+    def write(self, command: str) -> None:
+        self.clock.advance(0.002)
+        self.written.append(command)
+
+
+class TestTriggerChannel:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.clock: VirtualClock = VirtualClock()
+        self.n_samples: int = 0
+        self.channel: TriggerChannel = TriggerChannel(
+            self.clock, lambda: self.n_samples
+        )
+
+    def test_fire_stamps_wakes_and_forwards(self) -> None:
+        self.clock.advance(10.0)
+        self.n_samples = 120
+        wake: threading.Event = threading.Event()
+        self.channel.wake = [wake.set]
+        stim: RecordingStim = RecordingStim(self.clock)
+        self.channel.forward(stim, "T1")  # type: ignore
+        self.channel.forward(stim)  # type: ignore
+
+        trigger: Trigger = self.channel.fire("go")
+        assert wake.is_set()
+        assert (trigger.time, trigger.sample) == (10.0, 120)
+        assert stim.written == ["T1", "go"]
+        assert abs(trigger.forward_latency - 0.004) < 1e-9  # type: ignore
+        assert trigger.latency is None
+
+        assert self.channel.take() is trigger
+        assert self.channel.take() is None
+        self.clock.advance(0.001)
+        self.channel.record_onset(trigger, 130)
+        assert abs(trigger.latency - 0.005) < 1e-9  # type: ignore
+        assert self.channel.stats()["triggers"][0]["onset_sample"] == 130
+
+        self.channel.reset()
+        assert self.channel.triggers == [] and self.channel.onset_latency.count == 0
+
+    def test_event_set_fires_before_it_is_set(self) -> None:
+        event: Event = Event(None, None, "go", triggerable=True)
+        seen: List[bool] = []
+        event.on_set = lambda e: seen.append(e.is_set())
+        event.set()
+        assert seen == [False] and event.is_set()
+
+        untriggerable: Event = Event(None, None, "rest")
+        untriggerable.on_set = lambda e: seen.append(True)
+        untriggerable.set()
+        assert seen == [False] and not untriggerable.is_set()
+
+    def test_unlabeled_trigger_writes_the_default(self) -> None:
+        silent: RecordingStim = RecordingStim(self.clock)
+        coded: RecordingStim = RecordingStim(self.clock)
+        self.channel.forward(silent)  # type: ignore
+        self.channel.forward(coded, default="255")  # type: ignore
+
+        unlabeled: Trigger = self.channel.fire()
+        labeled: Trigger = self.channel.fire("go")
+        assert silent.written == ["go"]
+        assert coded.written == ["255", "go"]
+        assert unlabeled.forwarded_time is not None
+
+        self.channel.targets = [(silent, None, None)]  # type: ignore
+        assert self.channel.fire().forward_latency is None
+        assert labeled.forward_latency is not None
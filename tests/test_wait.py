@@ -0,0 +1,101 @@
+import pytest
+import socket
+import threading
+
+from typing import List, Optional
+
+from libbids.clock import VirtualClock
+from libbids.wait import AdaptiveSleepWait, BusyWait, CallbackWait, FileDescriptorWait
+
+
+class TestWaitStrategy:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.clock: VirtualClock = VirtualClock()
+        self.reader, self.writer = socket.socketpair()
+        yield
+        self.reader.close()
+        self.writer.close()
+
+    def test_adaptive_learns_block_size_and_wakes_early(self):
+        wait: AdaptiveSleepWait = AdaptiveSleepWait(100, lead=0.1, smoothing=0.5)
+        wait.clock = self.clock
+
+        wait.observe(10)
+        assert wait.block_size == 10.0
+        assert abs(wait.due - 0.09) < 1e-9
+        wait.wait()
+        assert abs(self.clock.now() - 0.09) < 1e-9
+
+        wait.observe(20)
+        assert wait.block_size == 15.0
+        assert abs(wait.period - 0.15) < 1e-9
+        assert abs(wait.due - (0.09 + 0.9 * 0.15)) < 1e-9
+
+    def test_adaptive_rechecks_after_an_empty_read(self):
+        wait: AdaptiveSleepWait = AdaptiveSleepWait(100, 10, lead=0.2)
+        wait.clock = self.clock
+        self.clock.advance(1.0)
+
+        wait.observe(0)
+        assert wait.block_size == 10.0
+        assert abs(wait.due - 1.02) < 1e-9
+
+    def test_adaptive_wait_is_bounded_by_timeout(self):
+        wait: AdaptiveSleepWait = AdaptiveSleepWait(100, 50)
+        wait.clock = self.clock
+
+        wait.observe(50)
+        wait.wait(0.1)
+        assert abs(self.clock.now() - 0.1) < 1e-9
+        wait.wait()
+        assert abs(self.clock.now() - 0.45) < 1e-9
+        metrics = wait.metrics()
+        assert metrics["waits"] == 2
+        assert abs(metrics["wait_time"] - 0.45) < 1e-9
+
+    def test_busy_wait_never_waits(self):
+        wait: BusyWait = BusyWait()
+        wait.clock = self.clock
+        wait.observe(10)
+        wait.wait(1.0)
+        assert self.clock.now() == 0.0
+        assert wait.metrics()["waits"] == 1
+
+    def test_callback_wait_passes_timeout(self):
+        timeouts: List[Optional[float]] = []
+        wait: CallbackWait = CallbackWait(timeouts.append)
+        wait.wait(0.5)
+        wait.wait()
+        assert timeouts == [0.5, None]
+
+    def test_file_descriptor_wait_returns_when_readable(self):
+        wait: FileDescriptorWait = FileDescriptorWait(self.reader)
+        self.writer.send(b"x")
+        wait.wait(5.0)
+        assert wait.wait_time < 5.0
+        wait.close()
+
+    def test_callback_wait_is_interrupted(self):
+        ready: threading.Event = threading.Event()
+        wait: CallbackWait = CallbackWait(ready.wait)
+        assert wait.event is ready
+        timer: threading.Timer = threading.Timer(0.05, wait.interrupt)
+        timer.start()
+        wait.wait(5.0)
+        timer.join()
+        assert ready.is_set()
+        assert wait.wait_time < 5.0
+
+    def test_file_descriptor_wait_is_interrupted(self):
+        wait: FileDescriptorWait = FileDescriptorWait(self.reader)
+        timer: threading.Timer = threading.Timer(0.05, wait.interrupt)
+        timer.start()
+        wait.wait(5.0)
+        timer.join()
+        assert wait.wait_time < 5.0
+
+        # The interrupt is consumed, so the next wait blocks again
+        wait.wait(0.05)
+        assert wait.wait_time >= 0.09
+        wait.close()